@@ -0,0 +1,248 @@
+import os
+import glob
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import threading
+from openai import AsyncOpenAI
+from generate import MODEL, openai_api_key, response_cache, spec_system_prompt
+from llm_cache import ResponseCache
+from lucid_api import default_client, default_index
+from script import document_hash, package_document
+from spec import build_from_spec, parse_spec
+from validation import validate_diagram, DiagramError
+
+# Workers per pipeline stage, so slow uploads never hold up generation
+DEFAULT_CONCURRENCY = {"generate": 4, "build": 2, "package": 2, "upload": 4}
+
+# Items allowed to wait between two stages
+DEFAULT_QUEUE_SIZE = 16
+
+
+def find_problem_files(pattern):
+    """Problem files from a directory (its `*.txt` files) or a glob pattern, sorted."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.txt")
+    return sorted(glob.glob(pattern))
+
+
+### 🚀 Batch Manifest ###
+class BatchManifest:
+    """
+    Per-file results of a batch, saved as JSON after every finished item.
+
+    An item is skipped on resume when it completed before and its problem text is
+    unchanged (by content hash).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.items = {}
+        self._lock = threading.Lock()  # Records are written from worker threads
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.items = json.load(f)
+
+    def is_done(self, problem_path, content_hash):
+        entry = self.items.get(problem_path)
+        return entry is not None and entry["status"] == "done" and entry["hash"] == content_hash
+
+    def record(self, problem_path, entry):
+        with self._lock:
+            self.items[problem_path] = entry
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self.items, f, indent=2)
+            os.replace(temp_path, self.path)  # Never leave a half-written manifest behind
+
+
+### 🚀 Pipeline Stages ###
+# Cache, index and manifest reads and writes run in threads, so disk I/O never blocks the event loop
+async def _discard_completion(item, cache):
+    """Drop an item's cached completion once it proved unusable, so a resumed batch asks again."""
+    if cache is not None and "cache_key" in item:
+        await asyncio.to_thread(cache.discard, item.pop("cache_key"))
+
+
+async def generate_stage(item, llm_client, cache):
+    system_prompt = spec_system_prompt()
+    key = ResponseCache.key(MODEL, system_prompt, item["text"])
+    content = await asyncio.to_thread(cache.get, key) if cache is not None else None
+
+    if content is None:
+        response = await llm_client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": item["text"]}
+            ],
+            response_format={"type": "json_object"}
+        )
+        content = response.choices[0].message.content
+        if cache is not None:
+            await asyncio.to_thread(cache.put, key, content, model=MODEL)
+    item["cache_key"] = key
+
+    try:
+        item["spec"] = parse_spec(content)
+    except Exception:
+        await _discard_completion(item, cache)
+        raise
+
+
+async def build_stage(item, cache):
+    try:
+        item["diagram"], ids = await asyncio.to_thread(build_from_spec, item.pop("spec"))
+        errors = await asyncio.to_thread(
+            validate_diagram, item["diagram"], {builder_id: spec_id for spec_id, builder_id in ids.items()}
+        )
+        if errors:
+            raise DiagramError(errors)  # Don't upload a diagram Lucid would reject or render broken
+    except Exception:
+        await _discard_completion(item, cache)
+        raise
+
+
+def _read_text(path):
+    with open(path, "r") as f:
+        return f.read()
+
+
+def _title(item):
+    return os.path.splitext(os.path.basename(item["path"]))[0]
+
+
+async def package_stage(item):
+    document = await asyncio.to_thread(item.pop("diagram").to_json)
+    item["content_hash"] = await asyncio.to_thread(document_hash, document, _title(item))
+    index = await asyncio.to_thread(default_index)  # Loads the index file on first use
+    item["document_id"] = await asyncio.to_thread(index.get, item["content_hash"])
+    if item["document_id"] is None:
+        item["archive"] = await asyncio.to_thread(package_document, document)
+
+
+async def upload_stage(item, lucid_client):
+    if "archive" not in item:
+        return  # Identical document already imported
+
+    with item.pop("archive") as archive:
+        response = await asyncio.to_thread(lucid_client.import_document, archive, _title(item))
+
+    if response.status_code != 201:
+        raise RuntimeError(f"Lucid import failed with {response.status_code}: {response.text}")
+    item["document_id"] = response.json()["documentId"]
+    index = await asyncio.to_thread(default_index)
+    await asyncio.to_thread(index.put, item["content_hash"], item["document_id"])
+
+
+async def _run_stage(name, handler, workers, inbox, outbox, finish):
+    async def worker():
+        while True:
+            item = await inbox.get()
+            start = time.perf_counter()
+            try:
+                await handler(item)
+            except Exception as e:
+                item.pop("archive", None)
+                await finish(item, error=f"{name}: {e}")
+            else:
+                item["timings"][name] = round(time.perf_counter() - start, 3)
+                if outbox is not None:
+                    await outbox.put(item)
+                else:
+                    await finish(item)
+            finally:
+                inbox.task_done()
+
+    return [asyncio.create_task(worker()) for _ in range(workers)]
+
+
+async def run_batch(problem_paths, manifest_path="batch_manifest.json", concurrency=None,
+                    queue_size=DEFAULT_QUEUE_SIZE, llm_client=None, lucid_client=None, cache=response_cache):
+    """
+    Turn many problem files into Lucid documents through a staged asyncio pipeline:
+    generate (AsyncOpenAI) → build → package → upload.
+
+    Stages are connected by bounded queues and each has its own worker count
+    (`concurrency`, defaults in `DEFAULT_CONCURRENCY`). Results and failures go to
+    the manifest at `manifest_path`; items already completed there are skipped.
+    Returns the manifest entries for this run's items.
+    """
+    concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+    llm_client = llm_client or AsyncOpenAI(api_key=openai_api_key())
+    lucid_client = lucid_client or default_client()
+    manifest = BatchManifest(manifest_path)
+
+    stages = [
+        ("generate", lambda item: generate_stage(item, llm_client, cache)),
+        ("build", lambda item: build_stage(item, cache)),
+        ("package", package_stage),
+        ("upload", lambda item: upload_stage(item, lucid_client))
+    ]
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+    results = {}
+
+    async def finish(item, error=None):
+        entry = {
+            "status": "failed" if error else "done",
+            "hash": item["hash"],
+            "document_id": item.get("document_id"),
+            "error": error,
+            "timings": item["timings"]
+        }
+        results[item["path"]] = entry
+        await asyncio.to_thread(manifest.record, item["path"], entry)
+        print(f"{'❌' if error else '✅'} {item['path']}: {error or entry['document_id']}")
+
+    workers = []
+    for i, (name, handler) in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        workers += await _run_stage(name, handler, concurrency[name], queues[i], outbox, finish)
+
+    try:
+        for path in problem_paths:
+            text = await asyncio.to_thread(_read_text, path)
+            content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+            if manifest.is_done(path, content_hash):
+                print(f"⏭️ {path}: already imported as {manifest.items[path]['document_id']}")
+                continue
+            await queues[0].put({"path": path, "text": text, "hash": content_hash, "timings": {}})
+
+        # Each stage hands items on before marking them done, so draining in order drains everything
+        for queue in queues:
+            await queue.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Lucidchart diagrams for a directory or glob of problem files.")
+    parser.add_argument("problems", help="Directory of *.txt problem files, or a glob pattern")
+    parser.add_argument("--manifest", default="batch_manifest.json", help="Where per-file results are recorded")
+    for stage, workers in DEFAULT_CONCURRENCY.items():
+        parser.add_argument(f"--{stage}-workers", type=int, default=workers, help=f"Concurrent {stage} workers")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the OpenAI response cache")
+    args = parser.parse_args()
+
+    paths = find_problem_files(args.problems)
+    print(f"📂 {len(paths)} problem files")
+    results = asyncio.run(run_batch(
+        paths,
+        manifest_path=args.manifest,
+        concurrency={stage: getattr(args, f"{stage}_workers") for stage in DEFAULT_CONCURRENCY},
+        cache=None if args.no_cache else response_cache
+    ))
+
+    failed = sum(entry["status"] == "failed" for entry in results.values())
+    print(f"🏁 {len(results) - failed} imported, {failed} failed. Results in {args.manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Compare the columnar bulk builders (`create_flowchart_elements`, `create_entities`,
+`create_lines`) with the per-call loop they replace, and check that both give the
+same Lucid JSON (byte for byte, with deterministic IDs). The bulk builders run
+with garbage collection left on and with `pause_gc=True`.
+
+    python -m benchmarks.bulk [--count 100000]
+"""
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from script import Diagram, canonical_json
+
+FLOWCHART_TYPES = np.array(["process", "decision", "terminator", "database", "document"])
+LINE_TYPES = np.array(["one-to-one", "one-to-many", "many-to-many"])
+ATTRIBUTES = [("Name", False, "TEXT"), ("Status", False, "TEXT"), ("CreatedAt", False, "DATETIME")]
+
+
+def columns(count):
+    """Synthetic element, line and entity columns, as a caller loading a DataFrame would have them."""
+    rng = np.random.default_rng(0)
+    elements = pd.DataFrame({
+        "name": [f"Process {i}" for i in range(count)],
+        "x": rng.integers(0, 100_000, count),
+        "y": rng.integers(0, 100_000, count),
+        "flowchart_type": FLOWCHART_TYPES[rng.integers(0, len(FLOWCHART_TYPES), count)]
+    })
+    entities = [f"Entity{i}" for i in range(count // 10)]
+    attributes = pd.DataFrame(
+        [(name, f"{name}ID", True, "INTEGER") for name in entities]
+        + [(name, attribute, key, data_type) for name in entities for attribute, key, data_type in ATTRIBUTES],
+        columns=["entity", "attribute", "is_primary_key", "data_type"]
+    ).sort_values("entity", kind="stable")
+    line_types = LINE_TYPES[rng.integers(0, len(LINE_TYPES), count)]
+    return elements, entities, attributes, line_types
+
+
+def per_call(diagram, elements, entities, line_types):
+    ids = [
+        diagram.create_flowchart_element(name, x=x, y=y, flowchart_type=flowchart_type)
+        for name, x, y, flowchart_type in zip(
+            elements["name"].tolist(), elements["x"].tolist(), elements["y"].tolist(), elements["flowchart_type"].tolist()
+        )
+    ]
+    for i, name in enumerate(entities):
+        diagram.create_entity(name, [(f"{name}ID", True, "INTEGER"), *ATTRIBUTES], x=i * 350, y=0)
+    for i, line_type in enumerate(line_types.tolist()):
+        diagram.create_line(ids[i - 1], ids[i], f"flow {i}", line_type)
+
+
+def bulk(diagram, elements, entities, attributes, line_types, pause_gc=False):
+    ids = diagram.create_flowchart_elements(elements, pause_gc=pause_gc)
+    diagram.create_entities(entities, attributes, x=np.arange(len(entities)) * 350, y=0, pause_gc=pause_gc)
+    diagram.create_lines(
+        np.roll(ids, 1), ids, [f"flow {i}" for i in range(len(ids))], line_types, pause_gc=pause_gc
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000, help="Flowchart elements and lines (entities: a tenth)")
+    args = parser.parse_args()
+
+    elements, entities, attributes, line_types = columns(args.count)
+    print(f"{args.count:,} elements, {args.count:,} lines, {len(entities):,} entities")
+    print(f"{'IDs':>14} {'per-call s':>11} {'bulk s':>8} {'speedup':>8} {'GC paused s':>12} {'speedup':>8}")
+    for deterministic in (False, True):
+        looped, batched, paused = (Diagram(deterministic_ids=deterministic) for _ in range(3))
+
+        start = time.perf_counter()
+        per_call(looped, elements, entities, line_types)
+        looped_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bulk(batched, elements, entities, attributes, line_types)
+        bulk_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bulk(paused, elements, entities, attributes, line_types, pause_gc=True)
+        paused_seconds = time.perf_counter() - start
+
+        label = "deterministic" if deterministic else "random"
+        print(f"{label:>14} {looped_seconds:>11.3f} {bulk_seconds:>8.3f} {looped_seconds / bulk_seconds:>7.1f}x"
+              f" {paused_seconds:>12.3f} {looped_seconds / paused_seconds:>7.1f}x")
+        if deterministic and not canonical_json(looped.to_json()) == canonical_json(batched.to_json()) == canonical_json(paused.to_json()):
+            raise SystemExit("❌ Bulk and per-call builds produced different JSON")
+    print("✅ Identical JSON with deterministic IDs")
+
+
+if __name__ == "__main__":
+    main()
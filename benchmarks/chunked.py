@@ -0,0 +1,108 @@
+"""
+Measure map-reduce generation of long descriptions against a single request, with a
+local fake OpenAI client (no network).
+
+The synthetic document has one section per group of entities, and each section also
+mentions an entity from the previous one. The fake client "extracts" the entities,
+processes and flows a prompt mentions and answers after a fixed latency plus time
+proportional to its output, like a model generating tokens at a fixed rate.
+
+    python -m benchmarks.chunked [--sections 24] [--entities-per-section 5] [--tokens-per-second 2000] [--chunk-chars 4000]
+"""
+import re
+import json
+import time
+import argparse
+from types import SimpleNamespace
+
+import generate
+
+LATENCY = 0.3  # Seconds before the first token
+CHARS_PER_TOKEN = 4
+
+ENTITY = re.compile(r"The (\w+) entity stores (\w+) \(key\), ([\w, ]+)\.")
+PROCESS = re.compile(r"The (.+?) process updates (\w+)\.")
+
+
+def synthetic_document(sections, entities_per_section):
+    """Markdown requirements: per section, a few entities and one process updating each."""
+    parts = ["# Requirements", "An operations platform for a mid-sized retailer."]
+    for section in range(sections):
+        parts.append(f"## Area {section + 1}")
+        first = section * entities_per_section
+        names = [f"Record{i}" for i in range(first, first + entities_per_section)]
+        if section:
+            names.append(f"Record{first - 1}")  # Mentioned again, so the merge has to deduplicate it
+        for name in names:
+            parts.append(
+                f"The {name} entity stores {name}ID (key), Name, Status, CreatedAt. "
+                f"The Maintain {name} process updates {name}."
+            )
+    return "\n\n".join(parts)
+
+
+class FakeExtractingClient:
+    """Stand-in for `OpenAI()` that answers with the spec of what the prompt mentions."""
+
+    def __init__(self, tokens_per_second):
+        self.tokens_per_second = tokens_per_second
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        text = messages[-1]["content"]
+        entities, shapes, lines = {}, {}, []  # Each thing once per reply, as a model would list it
+        for name, key, rest in ENTITY.findall(text):
+            attributes = [[key, True]] + [[attribute.strip(), False] for attribute in rest.split(",")]
+            entities[name] = {"id": name.lower(), "name": name, "attributes": attributes}
+        for process, name in PROCESS.findall(text):
+            if process not in shapes:
+                shapes[process] = {"id": f"p{len(shapes)}", "name": process, "flowchart_type": "process"}
+                lines.append({"shape1_id": shapes[process]["id"], "shape2_id": name.lower(), "relationship": "updates"})
+
+        content = json.dumps({
+            "title": "Operations Platform", "shapes": list(shapes.values()), "entities": list(entities.values()), "lines": lines
+        })
+        time.sleep(LATENCY + len(content) / CHARS_PER_TOKEN / self.tokens_per_second)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def single_request(document, client):
+    diagram, _ = generate.generate_valid_diagram(document, llm_client=client, cache=None, candidates=1)
+    return diagram
+
+
+def chunked(document, client, chunk_chars):
+    diagram, _, problems = generate.generate_chunked_diagram(document, llm_client=client, cache=None, chunk_chars=chunk_chars)
+    if problems:
+        raise RuntimeError(f"❌ Chunked generation skipped records: {problems}")
+    return diagram
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sections", type=int, default=24)
+    parser.add_argument("--entities-per-section", type=int, default=5)
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    parser.add_argument("--chunk-chars", type=int, default=4_000)
+    args = parser.parse_args()
+
+    document = synthetic_document(args.sections, args.entities_per_section)
+    client = FakeExtractingClient(args.tokens_per_second)
+    expected = args.sections * args.entities_per_section
+
+    results = {}
+    for name, run in (("single", lambda: single_request(document, client)),
+                      ("chunked", lambda: chunked(document, client, args.chunk_chars))):
+        start = time.perf_counter()
+        diagram = run()
+        results[name] = (time.perf_counter() - start, len(diagram.entities), len(diagram.shapes), len(diagram.lines))
+
+    print(f"\n{len(document):,} characters, {expected} distinct entities")
+    print(f"{'mode':>8} {'seconds':>8} {'entities':>9} {'shapes':>7} {'lines':>6}")
+    for name, (seconds, entities, shapes, lines) in results.items():
+        print(f"{name:>8} {seconds:>8.2f} {entities:>9} {shapes:>7} {lines:>6}")
+    print(f"✅ {results['single'][0] / results['chunked'][0]:.1f}x faster with chunking")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark memory use and throughput of the compact shape model against the
+previous dict model, where every shape, line and table cell owned freshly
+allocated nested `style`/`fill`/`stroke` dicts.
+
+Builds ERDs of wide entities and reports build time, memory retained by the
+diagram, serialization time and peak memory while serializing.
+
+    python -m benchmarks.memory
+"""
+import json
+import time
+import tracemalloc
+
+from script import Diagram
+
+ATTRIBUTES_PER_ENTITY = 50
+
+# Total table cells per run (two cells per attribute row)
+CELL_COUNTS = (1_000, 10_000, 100_000)
+
+
+class DictModelDiagram(Diagram):
+    """A `Diagram` whose tables and lines use the previous per-item dicts."""
+
+    def create_table(self, name, x=0, y=0, rows=3, cols=2, width=300, height=200, color="#FFFFFF", cell_data=None, compact=False):
+        cells_by_position = {}
+        for cell in cell_data or ():
+            cells_by_position.setdefault((cell["x"], cell["y"]), cell)
+
+        table = {
+            "id": None,
+            "type": "table",
+            "boundingBox": {"x": x, "y": y, "w": width, "h": height},
+            "style": {
+                "fill": {"type": "color", "color": color},
+                "stroke": {"color": "#000000", "width": 1, "style": "solid"}
+            },
+            "rowCount": rows,
+            "colCount": cols,
+            "cells": [],
+            "verticalBorder": True,
+            "horizontalBorder": True
+        }
+        for c, r in sorted(cells_by_position, key=lambda position: (position[1], position[0])):
+            cell = cells_by_position[c, r]
+            table["cells"].append({
+                "xPosition": c,
+                "yPosition": r,
+                "mergeCellsRight": cell.get("merge_right", 0),
+                "mergeCellsDown": cell.get("merge_down", 0),
+                "text": cell.get("text", ""),
+                "style": {"fill": {"type": "color", "color": cell.get("color", "#FFFFFF")}}
+            })
+        return self._add_shape("table", table)
+
+
+def build(diagram, entities):
+    previous = None
+    for i in range(entities):
+        attributes = [(f"Attribute{j}", j == 0) for j in range(ATTRIBUTES_PER_ENTITY)]
+        entity = diagram.create_entity(f"Entity{i}", attributes, x=(i % 20) * 350, y=(i // 20) * 1400)
+        if previous:
+            diagram.create_line(previous, entity, "relates", "one-to-many")
+        previous = entity
+
+
+def measure(diagram_class, entities):
+    # Timings are taken without tracemalloc, which slows allocation-heavy code severalfold
+    start = time.perf_counter()
+    diagram = diagram_class()
+    build(diagram, entities)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = json.dumps(diagram.to_json())
+    serialize_time = time.perf_counter() - start
+    del diagram
+
+    tracemalloc.start()
+    diagram = diagram_class()
+    build(diagram, entities)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    json.dumps(diagram.to_json())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"build": build_time, "retained": retained, "serialize": serialize_time, "peak": peak, "json": text}
+
+
+def main():
+    print(f"{'cells':>8} {'model':>8} {'build ms':>10} {'retained MB':>12} {'serialize ms':>13} {'peak MB':>9}")
+    for cells in CELL_COUNTS:
+        entities = max(1, cells // (2 * (ATTRIBUTES_PER_ENTITY + 1)))
+        results = {"dict": measure(DictModelDiagram, entities), "compact": measure(Diagram, entities)}
+
+        for model, result in results.items():
+            print(
+                f"{cells:>8,} {model:>8} {result['build'] * 1000:>10.1f} {result['retained'] / 1e6:>12.2f}"
+                f" {result['serialize'] * 1000:>13.1f} {result['peak'] / 1e6:>9.2f}"
+            )
+        if len(results["dict"]["json"]) != len(results["compact"]["json"]):
+            print("⚠️ The models produced JSON of different sizes")  # IDs are random, so only sizes compare
+
+
+if __name__ == "__main__":
+    main()
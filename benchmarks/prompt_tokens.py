@@ -0,0 +1,43 @@
+"""
+Compare prompt sizes for the code-generation system prompt: embedding all of
+script.py (as generate.py used to) versus the introspected API manifest.
+
+    python -m benchmarks.prompt_tokens
+
+Token counts use tiktoken's gpt-4o encoding when it is installed and fall back to
+an estimate of 4 characters per token otherwise.
+"""
+import inspect
+
+import script
+from manifest import api_manifest
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+def count_tokens(text):
+    if tiktoken is None:
+        return round(len(text) / 4)
+    return len(tiktoken.encoding_for_model("gpt-4o").encode(text))
+
+
+def main():
+    prompts = {
+        "full script.py": inspect.getsource(script),
+        "API manifest": api_manifest()
+    }
+
+    method = "tiktoken gpt-4o" if tiktoken else "estimated, 4 chars/token"
+    print(f"{'prompt':>16} {'chars':>8} {'tokens':>8}   ({method})")
+    for name, text in prompts.items():
+        print(f"{name:>16} {len(text):>8,} {count_tokens(text):>8,}")
+
+    before, after = (count_tokens(text) for text in prompts.values())
+    print(f"\nInput tokens per generation call: -{before - after:,} ({1 - after / before:.0%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
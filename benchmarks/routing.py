@@ -0,0 +1,92 @@
+"""
+Benchmark `routing.route_lines`, which resolves "auto" endpoint sides.
+
+- length: lines of growing length across grids of growing shape count. The time per
+  line should follow its length and stay flat as shapes are added.
+- erd: a grid ERD whose inferred relationships use auto sides, timing the first
+  `to_json` (routes every line) and a second one (reuses the resolved sides).
+
+    python -m benchmarks.routing
+"""
+import time
+import random
+
+from script import Diagram
+from routing import route_lines
+
+SHAPE = 100  # Shape width and height
+GAP = 100  # Space between grid shapes
+
+
+def shape_grid(columns, rows):
+    """A diagram with a `columns` x `rows` grid of shapes; returns it and the shape IDs by (column, row)."""
+    diagram = Diagram()
+    ids = {}
+    for row in range(rows):
+        for column in range(columns):
+            x, y = column * (SHAPE + GAP), row * (SHAPE + GAP)
+            ids[column, row] = diagram.create_shape(f"S{column}-{row}", x, y, width=SHAPE, height=SHAPE)
+    return diagram, ids
+
+
+def time_routing(diagram, pending, repeat=3):
+    """Best-of-`repeat` seconds to route the `pending` auto lines of `diagram` from scratch."""
+    best = float("inf")
+    for _ in range(repeat):
+        diagram._routes = {}
+        start = time.perf_counter()
+        route_lines(diagram, pending)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def length_benchmark(count=500):
+    print(f"{'shapes':>8} {'span':>6} {'setup ms':>9} {'us/line':>8}")
+    for columns in (100, 300):
+        rows = columns // 2
+        diagram, ids = shape_grid(columns, rows)
+        for span in (1, 8, 64):
+            diagram.lines.clear()
+            diagram._auto_sides.clear()
+            rng = random.Random(span)
+            for _ in range(count):
+                # Horizontal lines `span` shapes long, diagonally offset so they cross other shapes
+                column, row = rng.randrange(columns - span), rng.randrange(rows - 1)
+                diagram.create_line(ids[column, row], ids[column + span, row + 1], start_side="auto", end_side="auto")
+            pending = dict(diagram._auto_sides)
+            # Indexing the shapes is paid once per call; the rest is the per-line cost
+            setup = time_routing(diagram, dict([next(iter(pending.items()))]))
+            per_line = (time_routing(diagram, pending) - setup) / (count - 1)
+            print(f"{columns * rows:>8,} {span:>6} {setup * 1000:>9.1f} {per_line * 1e6:>8.1f}")
+
+
+def erd_benchmark(entities=3000):
+    diagram = Diagram()
+    names = [f"Table{i}" for i in range(entities)]
+    rng = random.Random(0)
+    for i, name in enumerate(names):
+        attributes = [(f"{name}ID", True), ("Name", False)]
+        # Two foreign keys to earlier tables, so `infer_relationships` adds ~2 auto lines per table
+        if i:
+            attributes += [(f"{names[j]}ID", False) for j in sorted({rng.randrange(i) for _ in range(2)})]
+        diagram.create_entity(name, attributes)
+    relationships = diagram.infer_relationships()
+    diagram.auto_layout()
+
+    start = time.perf_counter()
+    diagram.to_json()
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    diagram.to_json()
+    second = time.perf_counter() - start
+    print(f"{entities:,} entities, {len(relationships):,} auto lines: "
+          f"first to_json {first:.2f} s, second {second:.2f} s")
+
+
+def main():
+    length_benchmark()
+    erd_benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Measure interpreter start-up: cold import times of the entry modules, and the
+per-job latency of a fresh process against a warm `worker.py`.
+
+- imports: `python -X importtime -c "import <module>"`, cumulative time of the module itself
+- process: wall time of `python -c "import <module>"` (interpreter start-up included)
+- jobs: one spec job per fresh worker process ("cold") vs. the same jobs sent to
+  one long-running worker over its stdin ("warm"). Nothing is uploaded.
+
+    python -m benchmarks.startup [--jobs 20] [--repeat 5]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+MODULES = ("script", "generate", "lucid_api")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+JOB = {
+    "spec": {
+        "title": "Startup Benchmark",
+        "shapes": [
+            {"kind": "flowchart", "id": "p1", "name": "Place Order"},
+            {"kind": "flowchart", "id": "p2", "name": "Ship Order"},
+            {"kind": "entity", "id": "e1", "name": "Order", "attributes": [["OrderID", True], ["CustomerID", False]]}
+        ],
+        "lines": [{"shape1_id": "p1", "shape2_id": "p2", "relationship": "ships"}]
+    },
+    "upload": False
+}
+
+
+def python(*args, **kwargs):
+    """Run the current interpreter from the repository root."""
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True, **kwargs)
+
+
+### 🚀 Imports ###
+def import_seconds(module):
+    """Cumulative `-X importtime` seconds for `module`, as imported by a fresh interpreter."""
+    stderr = python("-X", "importtime", "-c", f"import {module}").stderr
+    for line in stderr.splitlines():
+        # "import time:      self [us] | cumulative | imported package"
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1e6
+    raise RuntimeError(f"❌ `{module}` not found in the -X importtime output")
+
+
+def process_seconds(module):
+    """Wall time for a fresh interpreter to start and import `module`."""
+    start = time.perf_counter()
+    python("-c", f"import {module}")
+    return time.perf_counter() - start
+
+
+### 🚀 Jobs ###
+def start_worker():
+    return subprocess.Popen(
+        [sys.executable, "worker.py", "--no-openai"], cwd=ROOT, text=True,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+
+
+def send(worker, job):
+    """Write one job to the worker's stdin and wait for its result line."""
+    worker.stdin.write(json.dumps(job) + "\n")
+    worker.stdin.flush()
+    result = json.loads(worker.stdout.readline())
+    if not result["ok"]:
+        raise RuntimeError(f"❌ Worker job failed: {result['error']}")
+    return result
+
+
+def cold_job_seconds():
+    """Spawn a worker, run one job and stop it: the latency of a one-shot CLI run."""
+    start = time.perf_counter()
+    worker = start_worker()
+    try:
+        send(worker, JOB)
+        return time.perf_counter() - start
+    finally:
+        worker.stdin.close()
+        worker.wait()
+
+
+def warm_job_seconds(jobs):
+    """Per-job latencies of `jobs` jobs sent one after another to one running worker."""
+    worker = start_worker()
+    try:
+        send(worker, JOB)  # Wait until the worker is up
+        latencies = []
+        for _ in range(jobs):
+            start = time.perf_counter()
+            send(worker, JOB)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+    finally:
+        worker.stdin.close()
+        worker.wait()
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def measure(jobs=20, repeat=5):
+    """Best-of-`repeat` import and process times per module, and median cold/warm job latency."""
+    results = {"imports": {}, "jobs": {}}
+    for module in MODULES:
+        results["imports"][module] = {
+            "seconds": round(min(import_seconds(module) for _ in range(repeat)), 6),
+            "process_seconds": round(min(process_seconds(module) for _ in range(repeat)), 6)
+        }
+    cold = median([cold_job_seconds() for _ in range(repeat)])
+    warm = median(warm_job_seconds(jobs))
+    results["jobs"] = {"cold_seconds": round(cold, 6), "warm_seconds": round(warm, 6)}
+    return results
+
+
+def report(results):
+    print(f"{'module':>10} {'import ms':>10} {'process ms':>11}")
+    for module, timings in results["imports"].items():
+        print(f"{module:>10} {timings['seconds'] * 1e3:>10.1f} {timings['process_seconds'] * 1e3:>11.1f}")
+    jobs = results["jobs"]
+    print(f"Per job: cold process {jobs['cold_seconds'] * 1e3:.1f} ms, "
+          f"warm worker {jobs['warm_seconds'] * 1e3:.2f} ms "
+          f"({jobs['cold_seconds'] / jobs['warm_seconds']:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold imports and cold vs. warm worker job latency.")
+    parser.add_argument("--jobs", type=int, default=20, help="Jobs sent to the warm worker")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+    report(measure(args.jobs, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
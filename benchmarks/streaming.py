@@ -0,0 +1,99 @@
+"""
+Measure the latency win of streaming diagram construction with a local fake
+streaming OpenAI client (no network).
+
+The fake client emits a JSON Lines spec in token-sized chunks at a fixed rate.
+"Buffered" waits for the full response before building, as the non-streaming path
+does; "streaming" builds every record as its line completes.
+
+    python -m benchmarks.streaming [--records 600] [--tokens-per-second 2000]
+"""
+import json
+import time
+import argparse
+from types import SimpleNamespace
+
+import generate
+from script import Diagram
+from spec import StreamingSpecBuilder
+
+CHUNK_CHARS = 4  # Roughly one token
+
+
+def synthetic_spec_lines(records):
+    """JSON Lines for a DFD + ERD with one line per shape."""
+    lines = []
+    for i in range(records // 4):
+        lines.append({"kind": "flowchart", "id": f"p{i}", "name": f"Process {i}"})
+        lines.append({"kind": "entity", "id": f"e{i}", "name": f"Entity{i}", "attributes": [[f"Entity{i}ID", True], ["Name", False], ["CreatedAt", False]]})
+        if i:
+            lines.append({"kind": "line", "shape1_id": f"p{i - 1}", "shape2_id": f"p{i}", "relationship": "flows to"})
+            lines.append({"kind": "line", "shape1_id": f"e{i - 1}", "shape2_id": f"e{i}", "line_type": "one-to-many"})
+    return "\n".join(json.dumps(line) for line in lines) + "\n"
+
+
+class FakeStreamingClient:
+    """Stand-in for `OpenAI()` whose completions stream `text` at `tokens_per_second`."""
+
+    def __init__(self, text, tokens_per_second):
+        self.text = text
+        self.delay = 1 / tokens_per_second
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        chunks = (self.text[i:i + CHUNK_CHARS] for i in range(0, len(self.text), CHUNK_CHARS))
+        for chunk in chunks:
+            time.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))])
+
+
+class TimedDiagram(Diagram):
+    """Records when the first shape is built."""
+
+    def __init__(self, start):
+        super().__init__()
+        self.start = start
+        self.first_shape = None
+
+    def _add_shape(self, prefix, shape):
+        if self.first_shape is None:
+            self.first_shape = time.perf_counter() - self.start
+        return super()._add_shape(prefix, shape)
+
+
+def buffered(client):
+    start = time.perf_counter()
+    diagram = TimedDiagram(start)
+    text = "".join(chunk.choices[0].delta.content for chunk in client.create(stream=True))
+    builder = StreamingSpecBuilder(diagram)
+    builder.feed(text)
+    builder.close()
+    diagram.auto_layout()
+    return diagram.first_shape, time.perf_counter() - start
+
+
+def streaming(client):
+    start = time.perf_counter()
+    diagram = TimedDiagram(start)
+    generate.stream_diagram("benchmark", llm_client=client, cache=None, diagram=diagram)
+    diagram.auto_layout()
+    return diagram.first_shape, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=600)
+    parser.add_argument("--tokens-per-second", type=float, default=2000)
+    args = parser.parse_args()
+
+    text = synthetic_spec_lines(args.records)
+    client = FakeStreamingClient(text, args.tokens_per_second)
+    print(f"{len(text) // CHUNK_CHARS:,} chunks at {args.tokens_per_second:,.0f} tokens/s")
+    print(f"{'mode':>10} {'first shape s':>14} {'diagram ready s':>16}")
+    for name, run in (("buffered", buffered), ("streaming", streaming)):
+        first_shape, total = run(client)
+        print(f"{name:>10} {first_shape:>14.3f} {total:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
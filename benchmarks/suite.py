@@ -0,0 +1,261 @@
+"""
+Benchmark the diagram pipeline stages at scale and check for regressions.
+
+Builds synthetic DFD/ERD diagrams through the `script.py` API and, for each size,
+times and memory-profiles every stage:
+
+- build: `create_flowchart_element`, `create_entity` and `create_line` calls
+- serialize: `generate_lucidchart_json` encoded to canonical JSON text
+- package: `package_lucidchart_file` (the `.lucid` zip uploads stream from)
+- upload: `import_to_lucidchart` against a local stub Lucid endpoint
+
+It also records start-up costs (`benchmarks/startup.py`): cold import times of the
+entry modules and the per-job latency of a fresh process vs. a warm worker.
+
+Results are written as JSON; pass a previous results file as `--baseline` to fail
+the run (exit code 1) when a stage got slower or bigger than the thresholds allow.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --sizes 10 1000 --baseline results.json
+"""
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import threading
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from script import (
+    Diagram, use_diagram, create_flowchart_element, create_entity, create_line,
+    generate_lucidchart_json, canonical_json, package_lucidchart_file, import_to_lucidchart
+)
+from lucid_api import LucidClient
+from benchmarks import startup
+
+SIZES = (10, 1_000, 10_000, 100_000)
+
+STAGES = ("build", "serialize", "package", "upload")
+
+# Allowed growth over the baseline before a stage counts as a regression
+THRESHOLDS = {"seconds": 0.25, "peak_bytes": 0.10}
+
+# Import times swing more run to run than stage timings
+IMPORT_THRESHOLD = 0.5
+
+# Timings below this are too noisy to compare
+MIN_SECONDS = 0.005
+
+# Fraction of shapes that are entity tables; the rest are flowchart elements
+ENTITY_SHARE = 0.25
+ATTRIBUTES_PER_ENTITY = 5
+
+
+### 🚀 Stub Lucid Endpoint ###
+class StubLucidHandler(BaseHTTPRequestHandler):
+    """Accepts every document import, like `POST /documents` on the Lucid API."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.imports += 1
+        body = json.dumps({"documentId": f"stub{self.server.imports}"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub_server():
+    """Serve the stub endpoint from a background thread on a free local port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLucidHandler)
+    server.imports = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+### 🚀 Synthetic Diagrams ###
+def build_synthetic(count, seed=0):
+    """
+    Build `count` shapes and about as many lines into the active diagram: a chain of
+    data flows between flowchart elements plus random extra flows, and entities
+    related one-to-many to random earlier entities. Shapes are placed on a grid.
+    """
+    rng = random.Random(seed)
+    entities = int(count * ENTITY_SHARE)
+    elements = count - entities
+    columns = max(1, int(count ** 0.5))
+
+    def position(i):
+        return (i % columns) * 300, (i // columns) * 250
+
+    flowchart_ids = []
+    for i in range(elements):
+        x, y = position(i)
+        flowchart_ids.append(create_flowchart_element(f"Process {i}", x=x, y=y))
+        if i:
+            create_line(flowchart_ids[i - 1], flowchart_ids[i], f"flow {i}")
+            create_line(flowchart_ids[rng.randrange(i)], flowchart_ids[i], "feeds", start_side="bottom", end_side="top")
+
+    entity_ids = []
+    for i in range(entities):
+        x, y = position(elements + i)
+        attributes = [(f"Entity{i}ID", True)] + [(f"Field{j}", False) for j in range(ATTRIBUTES_PER_ENTITY - 1)]
+        entity_ids.append(create_entity(f"Entity{i}", attributes, x=x, y=y))
+        if i:
+            create_line(entity_ids[rng.randrange(i)], entity_ids[i], "has", "one-to-many")
+
+
+### 🚀 Stages ###
+def run_stages(count, client, traced=False):
+    """
+    Run every stage once. Returns {stage: {"seconds": ..., "peak_bytes": ...}} and the
+    diagram's sizes. Peaks include memory still held from earlier stages (the diagram).
+    """
+    results, state = {}, {}
+
+    def build():
+        state["diagram"] = Diagram(deterministic_ids=True)
+        with use_diagram(state["diagram"]):
+            build_synthetic(count)
+
+    def serialize():
+        state["json_bytes"] = len(canonical_json(generate_lucidchart_json(state["diagram"])).encode("utf-8"))
+
+    def package():
+        with package_lucidchart_file(state["diagram"]) as archive:
+            archive.seek(0, 2)
+            state["archive_bytes"] = archive.tell()
+
+    def upload():
+        with redirect_stdout(io.StringIO()):  # Skip the per-import message
+            document_id = import_to_lucidchart(state["diagram"], dedup=False, client=client)
+        if document_id is None:
+            raise RuntimeError("❌ Upload to the stub endpoint failed")
+
+    for stage, run in zip(STAGES, (build, serialize, package, upload)):
+        if traced:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        run()
+        results[stage] = {"seconds": time.perf_counter() - start}
+        if traced:
+            results[stage]["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+
+    with state["diagram"]._lock:
+        counts = {"shapes": len(state["diagram"].shapes), "lines": len(state["diagram"].lines)}
+    return results, {**counts, "json_bytes": state["json_bytes"], "archive_bytes": state["archive_bytes"]}
+
+
+def benchmark(count, client, repeat):
+    """Best-of-`repeat` stage timings, then peak memory per stage from one traced run."""
+    timings = [run_stages(count, client)[0] for _ in range(repeat)]
+
+    tracemalloc.start()  # Traced separately, since tracemalloc slows allocation-heavy code severalfold
+    try:
+        traced, sizes = run_stages(count, client, traced=True)
+    finally:
+        tracemalloc.stop()
+
+    stages = {
+        stage: {
+            "seconds": round(min(run[stage]["seconds"] for run in timings), 6),
+            "peak_bytes": traced[stage]["peak_bytes"]
+        }
+        for stage in STAGES
+    }
+    return {"sizes": sizes, "stages": stages}
+
+
+### 🚀 Regression Checks ###
+def compare(results, baseline, thresholds=THRESHOLDS):
+    """Return a message for every stage that grew past its threshold over the baseline."""
+    regressions = []
+    for count, result in results["results"].items():
+        previous = baseline["results"].get(count)
+        if previous is None:
+            continue
+        for stage, metrics in result["stages"].items():
+            for metric, allowed in thresholds.items():
+                old, new = previous["stages"].get(stage, {}).get(metric), metrics.get(metric)
+                if not old or new is None or (metric == "seconds" and new < MIN_SECONDS):
+                    continue
+                if new > old * (1 + allowed):
+                    regressions.append(
+                        f"{count} shapes, {stage} {metric}: {old:,.4g} → {new:,.4g} (+{new / old - 1:.0%}, allowed +{allowed:.0%})"
+                    )
+
+    allowed = IMPORT_THRESHOLD
+    for module, timings in results.get("startup", {}).get("imports", {}).items():
+        old = baseline.get("startup", {}).get("imports", {}).get(module, {}).get("seconds")
+        new = timings["seconds"]
+        if old and new >= MIN_SECONDS and new > old * (1 + allowed):
+            regressions.append(f"import {module}: {old:.4g}s → {new:.4g}s (+{new / old - 1:.0%}, allowed +{allowed:.0%})")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark build, serialize, package and upload at scale.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Shape counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per size (the fastest is kept)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Previous results to check for regressions")
+    parser.add_argument("--skip-startup", action="store_true", help="Don't measure import times and worker latency")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = start_stub_server()
+    client = LucidClient(
+        api_key="benchmark",
+        base_url=f"http://127.0.0.1:{server.server_port}",
+        rate_limits={"import": (1_000_000, 1.0)}  # Measure our own overhead, not Lucid's limits
+    )
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": {}
+    }
+
+    print(f"{'shapes':>8} {'stage':>10} {'seconds':>9} {'peak MB':>9}")
+    try:
+        for count in args.sizes:
+            result = results["results"][str(count)] = benchmark(count, client, args.repeat)
+            for stage, metrics in result["stages"].items():
+                print(f"{count:>8,} {stage:>10} {metrics['seconds']:>9.3f} {metrics['peak_bytes'] / 1e6:>9.2f}")
+    finally:
+        client.close()
+        server.shutdown()
+
+    if not args.skip_startup:
+        results["startup"] = startup.measure(repeat=args.repeat)
+        startup.report(results["startup"])
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f))
+        for regression in regressions:
+            print(f"❌ {regression}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark `create_entity` build time and serialized size for wide entities.
+
+Compares the current table builder against the previous one, which scanned
+`cell_data` for every cell and forced tables to be square.
+
+    python -m benchmarks.tables
+"""
+import json
+import time
+import uuid
+
+from script import Diagram
+
+# The legacy builder is cubic; beyond this it takes minutes
+LEGACY_MAX_ATTRIBUTES = 100
+
+
+def legacy_create_table(diagram, name, x, y, rows, cols, cell_data):
+    """The pre-indexing `create_table`: square tables with a linear scan per cell."""
+    rows = cols = max(rows, cols)
+    table = {
+        "id": f"table_{uuid.uuid4().hex[:8]}",
+        "type": "table",
+        "boundingBox": {"x": x, "y": y, "w": 300, "h": 200},
+        "style": {
+            "fill": {"type": "color", "color": "#FFFFFF"},
+            "stroke": {"color": "#000000", "width": 1, "style": "solid"}
+        },
+        "rowCount": rows,
+        "colCount": cols,
+        "cells": [],
+        "verticalBorder": True,
+        "horizontalBorder": True
+    }
+    for r in range(rows):
+        for c in range(cols):
+            cell_text, cell_color, merge_right, merge_down = "", "#FFFFFF", 0, 0
+            for cell in cell_data:
+                if cell["x"] == c and cell["y"] == r:
+                    cell_text = cell.get("text", "")
+                    cell_color = cell.get("color", "#FFFFFF")
+                    merge_right = cell.get("merge_right", 0)
+                    merge_down = cell.get("merge_down", 0)
+                    break
+            table["cells"].append({
+                "xPosition": c,
+                "yPosition": r,
+                "mergeCellsRight": merge_right,
+                "mergeCellsDown": merge_down,
+                "text": cell_text,
+                "style": {"fill": {"type": "color", "color": cell_color}}
+            })
+    diagram.shapes.append(table)
+    return table["id"]
+
+
+def entity_cell_data(name, attributes):
+    cell_data = [
+        {"x": 0, "y": 0, "text": name, "color": "#4682B4"},
+        {"x": 1, "y": 0, "text": "PK?", "color": "#4682B4"}
+    ]
+    for row, (attr_name, is_primary_key) in enumerate(attributes, start=1):
+        cell_data.append({"x": 0, "y": row, "text": attr_name})
+        cell_data.append({"x": 1, "y": row, "text": "✔" if is_primary_key else ""})
+    return cell_data
+
+
+def measure(build):
+    diagram = Diagram()
+    start = time.perf_counter()
+    build(diagram)
+    elapsed = time.perf_counter() - start
+    size = len(json.dumps(diagram.to_json()).encode())
+    return elapsed, size
+
+
+def main():
+    print(f"{'attributes':>10} {'builder':>8} {'build ms':>10} {'JSON bytes':>12}")
+    for count in (10, 100, 1000):
+        attributes = [(f"Attribute{i}", i == 0) for i in range(count)]
+        cell_data = entity_cell_data("Wide", attributes)
+
+        results = {}
+        if count <= LEGACY_MAX_ATTRIBUTES:
+            results["legacy"] = measure(lambda d: legacy_create_table(d, "Wide", 0, 0, count + 1, 2, cell_data))
+        results["current"] = measure(lambda d: d.create_entity("Wide", attributes, 0, 0))
+
+        for builder, (elapsed, size) in results.items():
+            print(f"{count:>10} {builder:>8} {elapsed * 1000:>10.2f} {size:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import os
+import gc
+import json
+import hashlib
+import numpy as np
+from math import isfinite
+from array import array
+from operator import methodcaller
+from itertools import count as counter, repeat
+from contextlib import contextmanager
+from json.encoder import encode_basestring_ascii
+import metrics
+from script import (
+    FLOWCHART_TYPES, LINE_ENDPOINT_STYLES, TableCells, fill_style, shape_style, stroke_style,
+    get_endpoint_position, _jsonable
+)
+
+HEADER_COLOR = "#4682B4"  # Entity header cells, as in `create_entity`
+CELL_COLOR = "#FFFFFF"
+
+# Canonical JSON of one item, as `Diagram._mint_id` hashes it (`json.dumps([sequence, item], sort_keys=True)`).
+# `%` formatting, which is faster than `str.format`
+FLOWCHART_TEMPLATE = (
+    '[%d, {"boundingBox": {"h": %r, "w": %r, "x": %r, "y": %r}, "id": null, '
+    '"style": %s, "text": %s, "type": "%s"}]'
+)
+LINE_TEMPLATE = (
+    '[%d, {"endpoint1": {"position": %s, "shapeId": %s, "style": "%s", "type": "shapeEndpoint"}, '
+    '"endpoint2": {"position": %s, "shapeId": %s, "style": "%s", "type": "shapeEndpoint"}, '
+    '"id": null, "lineType": "straight", "stroke": %s, "text": [{"position": %r, "side": %s, "text": %s}]}]'
+)
+TABLE_TEMPLATE = (
+    '[%d, {"boundingBox": {"h": 200, "w": 300, "x": %r, "y": %r}, "cells": [%s], "colCount": %d, '
+    '"horizontalBorder": true, "id": null, "rowCount": %d, "style": %s, "type": "table", "verticalBorder": true}]'
+)
+CELL_TEMPLATE = '{"mergeCellsDown": 0, "mergeCellsRight": 0, "style": %s, "text": %s, "xPosition": %d, "yPosition": %d}'
+
+
+### 🚀 Columns ###
+def _column(values, count):
+    """A column as a list of plain Python values (NumPy and pandas via `tolist`); a scalar is repeated `count` times."""
+    if isinstance(values, (str, bytes, dict)) or not hasattr(values, "__len__"):
+        return [values] * count
+    tolist = getattr(values, "tolist", None)
+    return tolist() if tolist is not None else list(values)
+
+
+def _gather(data, first, options):
+    """
+    Resolve a bulk call's arguments to equal-length lists, keyed by parameter name.
+    `data` is the `first` column, or a pandas DataFrame whose columns (named like the
+    parameters) replace the matching `options`.
+    """
+    if hasattr(data, "columns"):
+        options = {**options, **{name: data[name] for name in options if name in data.columns}}
+        data = data[first]
+    columns = {first: _column(data, None)}
+    count = len(columns[first])
+    for name, value in options.items():
+        columns[name] = _column(value, count)
+
+    mismatched = [name for name, column in columns.items() if len(column) != count]
+    if mismatched:
+        raise ValueError(f"❌ Columns {mismatched} don't have {count} values like `{first}`.")
+    return count, columns
+
+
+def _plain_numbers(*columns):
+    """Whether every value is a finite int or float, which `repr` writes exactly like `json`."""
+    for column in columns:
+        types = set(map(type, column))
+        if not types <= {int, float} or (float in types and not all(map(isfinite, column))):
+            return False
+    return True
+
+
+def _plain_strings(*columns):
+    return all(set(map(type, column)) <= {str} for column in columns)
+
+
+@contextmanager
+def _paused_gc(pause):
+    """
+    With `pause`, turn off cyclic garbage collection while a batch is allocated. The new
+    dicts can't form cycles, and every collection the allocations trigger would rescan
+    the whole diagram. It is process-wide, so builders only do it when the caller opts in.
+    """
+    if not pause or not gc.isenabled():  # Never re-enable collection a caller turned off
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+### 🚀 IDs ###
+def _mint_ids(diagram, prefix, items, canonical=None):
+    """
+    IDs for `items` exactly as `Diagram._mint_id` would give them one by one, advancing
+    the diagram's sequence. Random IDs come from one `os.urandom` call. Deterministic
+    IDs hash `canonical(sequences)` when given: the items' canonical JSON texts, built
+    column by column from templates with no per-item dicts. Otherwise each item goes
+    through `json.dumps`. Call with the lock held.
+    """
+    start = diagram._sequence
+    diagram._sequence += len(items)
+    if not diagram.deterministic_ids:
+        digits = os.urandom(4 * len(items)).hex()
+        return [f"{prefix}_{digits[i:i + 8]}" for i in range(0, len(digits), 8)]
+
+    sequences = counter(start + 1)
+    if canonical is None:
+        texts = (json.dumps([sequence, item], sort_keys=True, default=_jsonable) for sequence, item in zip(sequences, items))
+    else:
+        texts = canonical(sequences)
+    # Chained `map`s keep the per-item work in C
+    digests = map(methodcaller("hexdigest"), map(hashlib.sha256, map(methodcaller("encode", "utf-8"), texts)))
+    return [f"{prefix}_{digest[:8]}" for digest in digests]
+
+
+def _store_shapes(diagram, prefix, items, canonical):
+    with diagram._lock:
+        ids = _mint_ids(diagram, prefix, items, canonical)
+        for item, item_id in zip(items, ids):
+            item["id"] = item_id
+        diagram.shapes.extend(items)
+    return ids
+
+
+### 🚀 Flowchart Elements ###
+def create_flowchart_elements(diagram, name, x=0, y=0, flowchart_type="process", width=200, height=100, color="#ADD8E6",
+                              pause_gc=False):
+    """
+    Create one flowchart element per row, with the same shapes and IDs as calling
+    `create_flowchart_element` row by row. Types are validated once per distinct
+    value and styles interned once per color. Returns the IDs.
+    """
+    count, columns = _gather(name, "name", {
+        "x": x, "y": y, "flowchart_type": flowchart_type, "width": width, "height": height, "color": color
+    })
+    names, xs, ys, types, widths, heights, colors = columns.values()
+
+    with metrics.span("create_flowchart_elements", count=count), _paused_gc(pause_gc):
+        invalid = next((value for value in types if value not in FLOWCHART_TYPES), None)
+        if count and invalid is not None:
+            raise ValueError(f"❌ Invalid flowchart type: {invalid}. Must be one of {FLOWCHART_TYPES}.")
+        styles = {value: shape_style(value, styles=diagram._styles) for value in dict.fromkeys(colors)}  # Colors as given, like `create_flowchart_element`
+
+        items = [
+            {
+                "id": None,  # Assigned when stored
+                "type": shape_type,
+                "boundingBox": {"x": x, "y": y, "w": w, "h": h},
+                "style": style,
+                "text": text
+            }
+            for text, x, y, shape_type, w, h, style in zip(names, xs, ys, types, widths, heights, map(styles.__getitem__, colors))
+        ]
+        if "braceNote" in types:
+            for item in items:
+                if item["type"] == "braceNote":
+                    item["rightFacing"] = False
+                    item["braceWidth"] = 60
+
+        canonical = None
+        if diagram.deterministic_ids and _plain_numbers(xs, ys, widths, heights) and _plain_strings(names) and "braceNote" not in types:
+            style_json = {value: json.dumps(style, sort_keys=True) for value, style in styles.items()}
+
+            def canonical(sequences):
+                return map(FLOWCHART_TEMPLATE.__mod__, zip(
+                    sequences, heights, widths, xs, ys, map(style_json.__getitem__, colors),
+                    map(encode_basestring_ascii, names), types
+                ))
+
+        return _store_shapes(diagram, "flowchart", items, canonical)
+
+
+### 🚀 Entities ###
+def _attribute_lists(attributes, names):
+    """
+    One attribute list per entity: `attributes` is either a column of attribute lists,
+    or a long pandas DataFrame with one row per attribute and columns `entity`,
+    `attribute`, `is_primary_key` and optionally `data_type` (missing types are left out).
+    """
+    if not hasattr(attributes, "columns"):
+        return _column(attributes, None)
+
+    keys = list(map(bool, attributes["is_primary_key"].tolist()))
+    if "data_type" in attributes.columns:
+        rows = [
+            (attribute, key, data_type) if isinstance(data_type, str) else (attribute, key)
+            for attribute, key, data_type in zip(attributes["attribute"].tolist(), keys, attributes["data_type"].tolist())
+        ]
+    else:
+        rows = list(zip(attributes["attribute"].tolist(), keys))
+
+    # Group the rows by entity in one stable sort, keeping each entity's attribute order
+    codes, entities = attributes["entity"].factorize()
+    ends = np.bincount(codes, minlength=len(entities)).cumsum().tolist()
+    ordered = list(map(rows.__getitem__, np.argsort(codes, kind="stable").tolist()))
+    by_entity = {entity: ordered[start:end] for entity, start, end in zip(entities.tolist(), [0, *ends], ends)}
+    return [by_entity.get(entity, []) for entity in names]
+
+
+def _entity_cells(name, attributes):
+    """The cell texts `create_entity` gives an entity table, in storage order, and the table's column count."""
+    cols = 3 if attributes and max(map(len, attributes)) > 2 else 2
+    texts = [name, "Type", "PK?"] if cols == 3 else [name, "PK?"]
+    texts += [""] * (cols * len(attributes))
+    texts[cols::cols] = [attribute[0] for attribute in attributes]
+    texts[cols + cols - 1::cols] = ["✔" if attribute[1] else "" for attribute in attributes]
+    if cols == 3:
+        texts[4::3] = [attribute[2] if len(attribute) > 2 else "" for attribute in attributes]
+    return texts, cols
+
+
+def _cell_layout(rows, cols, layouts):
+    """Cell positions, merges and colors of a `rows` x `cols` entity table, built once per size."""
+    layout = layouts.get((rows, cols))
+    if layout is None:
+        zeros = array("l", [0]) * (rows * cols)
+        layout = layouts[rows, cols] = (
+            array("l", range(cols)) * rows,
+            array("l", [r for r in range(rows) for _ in range(cols)]),
+            zeros,
+            [HEADER_COLOR] * cols + [CELL_COLOR] * (cols * (rows - 1))
+        )
+    return layout
+
+
+def _cell_json(texts, layout, cell_styles):
+    """Canonical JSON of an entity table's cells, in `Diagram._mint_id` form."""
+    cell_x, cell_y, _, colors = layout
+    return ", ".join(map(CELL_TEMPLATE.__mod__, zip(
+        map(cell_styles.__getitem__, colors), map(encode_basestring_ascii, texts), cell_x, cell_y
+    )))
+
+
+def create_entities(diagram, name, attributes, x=0, y=0, pause_gc=False):
+    """
+    Create one entity table per row, with the same tables and IDs as calling
+    `create_entity` row by row. `attributes` is a column of attribute lists or a long
+    DataFrame (see `_attribute_lists`). Returns the IDs.
+    """
+    count, columns = _gather(name, "name", {"x": x, "y": y})
+    names, xs, ys = columns.values()
+    attribute_lists = _attribute_lists(attributes, names)
+    if len(attribute_lists) != count:
+        raise ValueError(f"❌ Got {len(attribute_lists)} attribute lists for {count} entities.")
+
+    with metrics.span("create_entities", count=count), _paused_gc(pause_gc):
+        style = shape_style(CELL_COLOR, styles=diagram._styles)
+        items, tables, layouts = [], [], {}
+        for text, x, y, entity_attributes in zip(names, xs, ys, attribute_lists):
+            texts, cols = _entity_cells(text, entity_attributes)
+            rows = len(entity_attributes) + 1
+            cell_x, cell_y, zeros, colors = layout = _cell_layout(rows, cols, layouts)
+            cells = TableCells()  # Its own copies of the shared layout, since tables can be appended to
+            cells.x, cells.y, cells.merge_right, cells.merge_down = cell_x[:], cell_y[:], zeros[:], zeros[:]
+            cells.text, cells.color = texts, colors[:]
+            items.append({
+                "id": None,  # Assigned when stored
+                "type": "table",
+                "boundingBox": {"x": x, "y": y, "w": 300, "h": 200},
+                "style": style,
+                "rowCount": rows,
+                "colCount": cols,
+                "cells": cells,  # Expanded to cell dicts in `to_json`
+                "verticalBorder": True,
+                "horizontalBorder": True
+            })
+            tables.append((texts, layout))
+
+        canonical = None
+        if diagram.deterministic_ids and _plain_numbers(xs, ys) and _plain_strings(*(texts for texts, _ in tables)):
+            style_json = json.dumps(style, sort_keys=True)
+            cell_styles = {
+                color: json.dumps({"fill": fill_style(color)}, sort_keys=True) for color in (HEADER_COLOR, CELL_COLOR)
+            }
+
+            def canonical(sequences):
+                return (
+                    TABLE_TEMPLATE % (
+                        sequence, x, y, _cell_json(texts, layout, cell_styles), item["colCount"], item["rowCount"], style_json
+                    )
+                    for sequence, x, y, (texts, layout), item in zip(sequences, xs, ys, tables, items)
+                )
+
+        ids = _store_shapes(diagram, "table", items, canonical)
+        with diagram._lock:
+            for table_id, text, entity_attributes in zip(ids, names, attribute_lists):
+                diagram.entities[table_id] = {"name": text, "attributes": list(entity_attributes)}  # For `infer_relationships`
+        return ids
+
+
+### 🚀 Lines ###
+def create_lines(diagram, shape1_id, shape2_id=None, relationship="relationship", line_type="one-to-one",
+                 start_side="right", end_side="left", text_position=0.5, text_side="top", pause_gc=False):
+    """
+    Create one line per row, with the same lines and IDs as calling `create_line` row
+    by row. `shape1_id` can be a DataFrame with `shape1_id`/`shape2_id` (and the other
+    parameters) as columns. Returns the IDs.
+    """
+    count, columns = _gather(shape1_id, "shape1_id", {
+        "shape2_id": shape2_id, "relationship": relationship, "line_type": line_type, "start_side": start_side,
+        "end_side": end_side, "text_position": text_position, "text_side": text_side
+    })
+    sources, targets, labels, types, starts, ends, text_positions, text_sides = columns.values()
+    if count and targets[0] is None:
+        raise ValueError("❌ `create_lines` needs a `shape2_id` column.")
+
+    with metrics.span("create_lines", count=count), _paused_gc(pause_gc):
+        stroke = stroke_style(width=2, styles=diagram._styles)
+        endpoint_styles = {value: LINE_ENDPOINT_STYLES.get(value, ("none", "none")) for value in dict.fromkeys(types)}
+        # Shared per side like interned styles: routing replaces an endpoint's position, never edits it
+        positions = {side: get_endpoint_position(side) for side in dict.fromkeys(starts + ends)}
+
+        start_styles = [endpoint_styles[kind][0] for kind in types]
+        end_styles = [endpoint_styles[kind][1] for kind in types]
+
+        items = [
+            {
+                "id": None,  # Assigned when stored
+                "lineType": "straight",
+                "endpoint1": {"type": "shapeEndpoint", "style": start_style, "shapeId": source, "position": start},
+                "endpoint2": {"type": "shapeEndpoint", "style": end_style, "shapeId": target, "position": end},
+                "stroke": stroke,
+                "text": [{"text": label, "position": position, "side": side}]
+            }
+            for source, target, label, start_style, end_style, start, end, position, side in zip(
+                sources, targets, labels, start_styles, end_styles,
+                map(positions.__getitem__, starts), map(positions.__getitem__, ends), text_positions, text_sides
+            )
+        ]
+
+        canonical = None
+        if diagram.deterministic_ids and _plain_numbers(text_positions) and _plain_strings(sources, targets, labels, text_sides):
+            position_json = {side: json.dumps(position, sort_keys=True) for side, position in positions.items()}
+            stroke_json = json.dumps(stroke, sort_keys=True)
+
+            def canonical(sequences):
+                return map(LINE_TEMPLATE.__mod__, zip(
+                    sequences,
+                    map(position_json.__getitem__, starts), map(encode_basestring_ascii, sources), start_styles,
+                    map(position_json.__getitem__, ends), map(encode_basestring_ascii, targets), end_styles,
+                    repeat(stroke_json), text_positions, map(encode_basestring_ascii, text_sides),
+                    map(encode_basestring_ascii, labels)
+                ))
+
+        with diagram._lock:
+            ids = _mint_ids(diagram, "line", items, canonical)
+            for item, line_id in zip(items, ids):
+                item["id"] = line_id
+            if "auto" in positions:
+                for line_id, start, end in zip(ids, starts, ends):
+                    if start == "auto" or end == "auto":
+                        diagram._auto_sides[line_id] = (start, end)
+            diagram.lines.extend(items)
+        return ids
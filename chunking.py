@@ -0,0 +1,204 @@
+import re
+from collections import Counter
+import metrics
+from spec import SECTIONS, LAYOUT_KINDS, spec_records, validate_record
+from relationships import normalize, name_variants
+
+# Characters per chunk (about 2.5k tokens), well inside what the model handles reliably
+CHUNK_CHARS = 10_000
+
+# Markdown headings, numbered headings ("2.1 Orders") and all-caps title lines
+HEADING = re.compile(r"^(#{1,6}\s+\S.*|\d+(\.\d+)*[.)]?\s+[A-Z][^.!?:]{0,60}|[A-Z][A-Z0-9 ,/&()-]{3,80})$")
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+### 🚀 Splitting ###
+def _sections(text):
+    """Split text into (heading, body) sections at heading lines; the preamble has no heading."""
+    sections, heading, body = [], None, []
+    for line in text.splitlines():
+        if HEADING.match(line.strip()):
+            if heading is not None or any(part.strip() for part in body):
+                sections.append((heading, "\n".join(body).strip()))
+            heading, body = line.strip(), []
+        else:
+            body.append(line)
+    sections.append((heading, "\n".join(body).strip()))
+    return [(heading, body) for heading, body in sections if heading or body]
+
+
+def _pieces(text, limit):
+    """Split text into pieces of at most `limit` characters at paragraph, then sentence, then hard boundaries."""
+    if len(text) <= limit:
+        return [text]
+    for separator, parts in (("\n\n", re.split(r"\n\s*\n", text)), (" ", SENTENCE_END.split(text))):
+        if len(parts) > 1:
+            pieces, current = [], ""
+            for part in parts:
+                for small in _pieces(part, limit):
+                    if current and len(current) + len(separator) + len(small) > limit:
+                        pieces.append(current)
+                        current = small
+                    else:
+                        current = f"{current}{separator}{small}" if current else small
+            return pieces + [current] if current else pieces
+    return [text[i:i + limit] for i in range(0, len(text), limit)]
+
+
+def split_description(text, chunk_chars=CHUNK_CHARS):
+    """
+    Split a long problem description into chunks of at most about `chunk_chars`
+    characters, at section headings where possible. Consecutive short sections share a
+    chunk; a long section is split at paragraphs (then sentences), and every piece
+    after the first repeats its heading, so each chunk says which section it is from.
+    """
+    if chunk_chars < 1:
+        raise ValueError(f"❌ chunk_chars must be at least 1, got {chunk_chars}.")
+
+    chunks, current = [], ""
+    for heading, body in _sections(text):
+        prefix = f"{heading}\n\n" if heading else ""
+        limit = max(chunk_chars - len(prefix) - len(" (continued)"), chunk_chars // 2)
+        for i, piece in enumerate(_pieces(body, limit) if body else [""]):
+            section = (prefix if i == 0 else f"{heading} (continued)\n\n" if heading else "") + piece
+            if current and len(current) + 2 + len(section) > chunk_chars:
+                chunks.append(current)
+                current = section
+            else:
+                current = f"{current}\n\n{section}" if current else section
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+### 🚀 Merging ###
+def record_key(kind, record):
+    """
+    What makes two records from different chunks the same thing: entities match on
+    singular/plural-insensitive names (`Orders` = `Order`), everything else on the
+    normalized name within its kind.
+    """
+    name = record.get("name", record.get("shape_type", ""))
+    if kind == "entity":
+        return kind, min(name_variants(name))
+    return kind, normalize(name)
+
+
+def _merge_attributes(attribute_lists, entity_name):
+    """
+    Union of attribute lists in first-seen order, matched on normalized names. An
+    attribute is a primary key if any chunk marks it so; when that makes several,
+    only `<Entity>ID`/`id` stays a key if it is among them. The first data type given wins.
+    """
+    merged = {}
+    for attributes in attribute_lists:
+        for attribute in attributes:
+            name, is_key, data_type = attribute[0], attribute[1], attribute[2] if len(attribute) > 2 else None
+            entry = merged.setdefault(normalize(name), [name, False, None])
+            entry[1] = entry[1] or is_key
+            entry[2] = entry[2] or data_type
+
+    keys = [key for key, entry in merged.items() if entry[1]]
+    if len(keys) > 1:
+        own_keys = {"id"} | {f"{variant}id" for variant in name_variants(entity_name)}
+        preferred = [key for key in keys if key in own_keys]
+        if preferred:
+            for key in keys:
+                merged[key][1] = key == preferred[0]
+    return [entry if entry[2] else entry[:2] for entry in merged.values()]
+
+
+def _reversed_line_type(line_type):
+    """The same cardinality read from the other end: `one-to-many` <-> `many-to-one`."""
+    start, _, end = line_type.partition("-to-")
+    return f"{end}-to-{start}" if end else line_type
+
+
+def _vote(values):
+    """Most common value, ties going to the one seen first."""
+    counts = Counter(values)
+    return max(values, key=lambda value: (counts[value], -values.index(value)))
+
+
+def merge_specs(specs, title=None, layout=True):
+    """
+    Merge the partial diagram specs extracted from the chunks of one description into
+    one spec. The result only depends on the specs and their order.
+
+    - Records naming the same thing (`record_key`) become one record with a fresh id;
+      entities get the union of their attributes (see `_merge_attributes`) and
+      flowchart elements the `flowchart_type` most chunks chose
+    - Lines are remapped onto the merged records. Duplicate flows (same endpoints and
+      label) and duplicate entity relationships (same pair, either direction) are
+      dropped; a relationship keeps the direction it was first given and the `line_type`
+      most chunks gave it, read in that direction
+    - Invalid records and lines whose endpoints aren't in their own chunk are skipped
+    - With `layout` (the merged spec will be auto-laid out), container records are
+      skipped and x/y coordinates dropped: chunks don't share a coordinate frame, and
+      `build_from_spec` only lays out specs without coordinates or containers
+
+    Returns the merged spec and a list of the records that were skipped.
+    """
+    with metrics.span("merge_specs", specs=len(specs)) as current:
+        records, ids, problems = {}, {}, []  # key -> [kind, section, [records]]; (chunk, id) -> key
+        lines = []
+        for chunk, spec in enumerate(specs, 1):
+            if not isinstance(spec, dict):
+                problems.append(f"chunk {chunk}: the spec must be an object")
+                continue
+            for location, kind, record in spec_records(spec):
+                errors = validate_record(f"chunk {chunk} {location}", kind, record)
+                if errors:
+                    problems.extend(errors)
+                elif layout and kind not in LAYOUT_KINDS:
+                    problems.append(f"chunk {chunk} {location}: containers aren't placed by automatic layout")
+                elif kind == "line":
+                    lines.append((chunk, location, record))
+                else:
+                    if layout:
+                        record = {name: value for name, value in record.items() if name not in ("x", "y")}
+                    key = record_key(kind, record)
+                    section = location.split("[")[0]
+                    records.setdefault(key, [kind, section, []])[2].append(record)
+                    if "id" in record:
+                        ids[chunk, record["id"]] = key
+
+        merged_ids = {}
+        sections = {section: [] for section in SECTIONS}
+        for key, (kind, section, group) in records.items():
+            merged_ids[key] = f"{kind}{len(merged_ids) + 1}"
+            record = {**group[0], "id": merged_ids[key]}
+            if kind == "entity":
+                record["attributes"] = _merge_attributes([each["attributes"] for each in group], record["name"])
+            elif kind == "flowchart" and any("flowchart_type" in each for each in group):
+                record["flowchart_type"] = _vote([each.get("flowchart_type", "process") for each in group])
+            sections[section].append(record)
+
+        entity_ids = {merged_ids[key] for key, (kind, _, _) in records.items() if kind == "entity"}
+        merged_lines, line_types = {}, {}
+        for chunk, location, line in lines:
+            endpoints = [ids.get((chunk, line[side])) for side in ("shape1_id", "shape2_id")]
+            if None in endpoints:
+                problems.append(f"chunk {chunk} {location}: references a record that isn't in its chunk")
+                continue
+            source, target = (merged_ids[key] for key in endpoints)
+            if source in entity_ids and target in entity_ids:
+                key = frozenset((source, target))
+            else:
+                key = (source, target, normalize(line.get("relationship", "")))
+            if key not in merged_lines:
+                merged_lines[key] = {**line, "id": f"line{len(merged_lines) + 1}", "shape1_id": source, "shape2_id": target}
+            if "line_type" in line:
+                reversed_pair = merged_lines[key]["shape1_id"] != source
+                line_type = _reversed_line_type(line["line_type"]) if reversed_pair else line["line_type"]
+                line_types.setdefault(key, []).append(line_type)
+
+        for key, types in line_types.items():
+            merged_lines[key]["line_type"] = _vote(types)
+        sections["lines"] = list(merged_lines.values())
+
+        first_title = next((spec["title"] for spec in specs if isinstance(spec, dict) and spec.get("title")), None)
+        merged = {"title": title or first_title or "Dynamic Diagram", **{key: value for key, value in sections.items() if value}}
+        current.set(records=len(records), lines=len(merged_lines), skipped=len(problems))
+        return merged, problems
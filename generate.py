@@ -1,74 +1,623 @@
 import os
+import io
+import functools
 import json
-from openai import OpenAI
-from dotenv import load_dotenv
+import time
+import argparse
+import builtins
+import threading
+import traceback
+import contextvars
+from types import ModuleType, SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from script import *  # Import all functions from script.py
+from llm_cache import ResponseCache
+from spec import spec_schema, record_schema, spec_records, build_from_spec, parse_spec, LAYOUT_KINDS, StreamingSpecBuilder, SpecError
+from validation import validate_diagram, DiagramError
+from manifest import api_manifest
+from chunking import CHUNK_CHARS, split_description, merge_specs
+import metrics
 
-# Load API key
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+_client = None
+_client_lock = threading.Lock()
 
-# Read the `script.py` file so OpenAI can "see" available functions
-with open("script.py", "r") as f:
-    script_code = f.read()
+MODEL = "gpt-4o"
+response_cache = ResponseCache()
+
+# Times a spec's validation errors are sent back to the model for correction
+MAX_REPAIRS = 2
+
+# Completions requested in parallel for a problem; the first one that builds and validates is used
+CANDIDATES = 3
+
+# Frames of generated code kept from a traceback for the repair prompt
+TRACEBACK_FRAMES = 3
+
+# Chunks of a long description extracted at once in chunked mode
+CHUNK_WORKERS = 8
+
+# Filename generated main() code is compiled under, so tracebacks point into it
+GENERATED_MAIN = "generated_main.py"
+_dry_run_modules = {}  # Module stand-ins for dry runs, built on first use
+
+def openai_api_key():
+    """The OpenAI API key, from the environment or `.env` (loaded on first use)."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return os.getenv("OPENAI_API_KEY")
+
+def openai_client():
+    """Return the process-wide OpenAI client, importing `openai` on first use (it takes most of a second)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            from openai import OpenAI
+
+            _client = OpenAI(api_key=openai_api_key())
+        return _client
 
 def read_problem_description(file_path):
     """Read the problem description from a text file."""
     with open(file_path, 'r') as file:
         return file.read()
 
-def generate_main_function(description):
-    """Ask OpenAI to generate a main function that builds an ERD/DFD using functions from script.py."""
-    system_prompt = f"""
+def completion_key(system_prompt, user_prompt, model=MODEL, candidate=0):
+    """Cache key of a completion; parallel samples (`candidate` > 0) of the same prompts get their own keys."""
+    return ResponseCache.key(model, system_prompt, [user_prompt, candidate] if candidate else user_prompt)
+
+def chat_completion(system_prompt, user_prompt, model=MODEL, llm_client=None, cache=response_cache, refresh=False, json_mode=False, candidate=0, usage=None):
+    """
+    Return the model's reply to `user_prompt`, served from `cache` when the same model
+    and prompts were seen before. Pass `cache=None` to skip the cache entirely, or
+    `refresh=True` to ignore cached entries and store the fresh reply. `json_mode`
+    asks the model for a JSON object. `candidate` numbers parallel samples of the same
+    prompts so each is cached separately, and `usage` (a dict) receives the token counts.
+    """
+    with metrics.span("chat_completion", model=model) as current:
+        key = completion_key(system_prompt, user_prompt, model, candidate)
+        if cache is not None and not refresh:
+            cached = cache.get(key)
+            if cached is not None:
+                current.set(cached=True)
+                print("♻️ Using cached OpenAI response.")
+                return cached
+
+        response = (llm_client or openai_client()).chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            **({"response_format": {"type": "json_object"}} if json_mode else {})
+        )
+        content = response.choices[0].message.content
+        tokens = record_usage(current, response)
+        if usage is not None:
+            usage.update(tokens)
+
+        if cache is not None:
+            cache.put(key, content, model=model)
+        return content
+
+def record_usage(current, response):
+    """Attach the response's token usage (when reported) to a metrics span and return it."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    tokens = {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens
+    }
+    current.set(cached=False, **tokens)
+    return tokens
+
+def first_valid(system_prompt, user_prompt, check, candidates=CANDIDATES, **options):
+    """
+    Request `candidates` completions of the same prompts in parallel and `check` each
+    one as it arrives. The first that passes wins; requests still in flight are not
+    waited for.
+
+    - `check`: Called with a completion, returns `(result, errors)`; passes when `errors` is empty.
+      If it raises, the candidate fails with the exception as its error and `(None, completion)` as its result
+    - `options`: Passed on to `chat_completion` (`llm_client`, `cache`, `refresh`, `json_mode`, `model`)
+
+    Rejected completions are removed from the cache, so the next run asks again
+    instead of replaying them. Returns `(result, errors, stats)`: the winner with no
+    errors, or the first failed candidate and its errors. `stats` holds the seconds until the decision, each
+    completed candidate's latency, and the tokens spent on candidates that weren't used.
+    """
+    if candidates < 1:
+        raise ValueError(f"❌ candidates must be at least 1, got {candidates}.")
+    start = time.perf_counter()
+    usages = [{} for _ in range(candidates)]
+    cache = options.get("cache", response_cache)
+
+    def request(candidate):
+        content = chat_completion(system_prompt, user_prompt, candidate=candidate, usage=usages[candidate], **options)
+        return candidate, content, time.perf_counter() - start
+
+    with metrics.span("first_valid", candidates=candidates) as current:
+        executor = ThreadPoolExecutor(max_workers=candidates)
+        futures = [executor.submit(contextvars.copy_context().run, request, i) for i in range(candidates)]
+        winner, failure, latencies, request_errors = None, None, [], []
+        try:
+            for future in as_completed(futures):
+                try:
+                    candidate, content, seconds = future.result()
+                except Exception as e:  # A failed request leaves the other candidates
+                    request_errors.append(e)
+                    continue
+                latencies.append(round(seconds, 3))
+                try:
+                    result, errors = check(content)
+                except Exception as e:  # One broken candidate leaves the others (and the repairs)
+                    result, errors = (None, content), [f"❌ {type(e).__name__}: {e}"]
+                if not errors:
+                    winner = (candidate, result)
+                    break
+                failure = failure or (result, errors)
+                if cache is not None:
+                    cache.discard(completion_key(system_prompt, user_prompt, options.get("model", MODEL), candidate))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if len(request_errors) == candidates:
+            raise request_errors[-1]
+        tokens = [usage.get("total_tokens", 0) for usage in usages]
+        stats = {
+            "seconds": round(time.perf_counter() - start, 3),
+            "candidate_seconds": latencies,
+            "failed": len(latencies) - (winner is not None) + len(request_errors),
+            "abandoned": sum(not future.done() or future.cancelled() for future in futures),
+            "wasted_tokens": sum(tokens) - (tokens[winner[0]] if winner else 0)
+        }
+        current.set(valid=winner is not None, **stats)
+
+    if winner:
+        return winner[1], [], stats
+    return failure[0], failure[1], stats
+
+def generate_until_valid(name, system_prompt, description, check, repair, candidates=CANDIDATES, max_repairs=MAX_REPAIRS, **options):
+    """
+    Run `first_valid` over `candidates` parallel completions; when all of them fail,
+    ask for a fix with `repair(description, result, errors)` as the user prompt, one
+    completion at a time, up to `max_repairs` times. Returns the valid result or
+    raises `DiagramError` with the remaining problems. The run's time to a valid
+    result, its slowest candidate and its wasted tokens are recorded in the `name` span.
+    """
+    start = time.perf_counter()
+    with metrics.span(name, candidates=candidates) as current:
+        user_prompt, totals = description, {"wasted_tokens": 0, "failed": 0, "slowest_seconds": 0.0}
+        for attempt in range(max_repairs + 1):
+            result, errors, stats = first_valid(system_prompt, user_prompt, check, candidates=candidates if attempt == 0 else 1, **options)
+            totals["wasted_tokens"] += stats["wasted_tokens"]
+            totals["failed"] += stats["failed"]
+            totals["slowest_seconds"] = max([totals["slowest_seconds"], *stats["candidate_seconds"]])
+            if not errors:
+                break
+            if attempt < max_repairs:
+                print(f"🔁 Found {len(errors)} problems in every candidate. Asking the model to fix them...")
+                user_prompt = repair(description, result, errors)
+
+        seconds = time.perf_counter() - start
+        current.set(repairs=attempt, valid=not errors, **totals)
+        print(f"⏱️ {'Valid' if not errors else 'Gave up'} after {seconds:.1f}s "
+              f"({totals['failed']} failed candidates, {totals['wasted_tokens']:,} tokens wasted)")
+    if errors:
+        raise DiagramError(errors)
+    return result
+
+def main_system_prompt():
+    """System prompt asking for a Python `main()` that builds an ERD/DFD using functions from script.py."""
+    # The API manifest leads the prompt and only changes with script.py, so provider-side prompt caching applies
+    return f"""{api_manifest()}
     You are an assistant that generates a Python `main()` function to create an Entity-Relationship Diagram (ERD) and Data Flow Diagram (DFD).
     The problem description may be vague. Ensure to think through all possible entities and flows to create a robust, comprehensive DFD and ERD.
-    
-    You have access to the following functions defined in `script.py`:
 
-    {script_code}
+    You have access to the `script.py` functions described above.
 
     Use these functions correctly to:
     - Add the necessary imports including from script import *
     - Create shapes for entities (use `create_shape`).
-    - Define relationships using `create_line`.
+    - Define relationships using `create_line`. Call `infer_relationships()` after creating the entities instead of
+      writing `create_line` for ERD relationships that follow from foreign keys named after primary keys.
     - Generate the Lucidchart JSON (`generate_lucidchart_json`).
     - Upload the diagram to Lucidchart (`import_to_lucidchart`).
     - At the end, **print the Lucidchart link** using the document ID. The main file should also directly open the link on the browser using the webbrowser module.
-    - The script contains a sample main file that you can use as reference as to how the functions can be called.
+    - The example above shows how the functions can be called.
     - ** Make sure to add the necessary imports including from script import * **
     - * Make sure that all functions you are using from script.py are imported and named correctly *
 
     **Return only valid Python code** for the `main()` function. Do not include explanations. Do not include ``` Python, etc.
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": description}
-        ]
+def dry_run_import(name, *args, **kwargs):
+    """`__import__` for generated code: `script` without uploads and a `webbrowser` that opens nothing."""
+    if name == "script":
+        if "script" not in _dry_run_modules:
+            import script
+
+            module = ModuleType("script")
+            module.__dict__.update(script.__dict__)
+            module.import_to_lucidchart = lambda *args, **kwargs: "dry-run"
+            _dry_run_modules["script"] = module
+        return _dry_run_modules["script"]
+    if name == "webbrowser":
+        return SimpleNamespace(open=lambda *args, **kwargs: True)
+    return builtins.__import__(name, *args, **kwargs)
+
+def compact_traceback(main_code, error):
+    """The last `TRACEBACK_FRAMES` frames of generated code (with their source lines) and the error."""
+    source = main_code.splitlines()
+    frames = [frame for frame in traceback.extract_tb(error.__traceback__) if frame.filename == GENERATED_MAIN]
+    parts = [
+        f"line {frame.lineno}, in {frame.name}: {source[frame.lineno - 1].strip()}"
+        for frame in frames[-TRACEBACK_FRAMES:] if 0 < frame.lineno <= len(source)
+    ]
+    return "\n".join(parts + [f"{type(error).__name__}: {error}"])
+
+def dry_run_main(main_code):
+    """
+    Run generated `main()` code against its own `Diagram`, with uploads and the browser
+    stubbed out and its output discarded. Returns `(diagram, errors)`: the compact
+    traceback when the code fails, else the problems `validate_diagram` finds.
+    """
+    diagram = Diagram(deterministic_ids=True)
+    # ✅ The code's own `print` writes to a buffer; swapping `sys.stdout` would swallow other candidates' output too
+    output = functools.partial(print, file=io.StringIO())
+    namespace = {
+        "__name__": "generated_main",
+        "__builtins__": {**builtins.__dict__, "__import__": dry_run_import, "print": output}
+    }
+    with metrics.span("dry_run_main") as current:
+        try:
+            with use_diagram(diagram):
+                exec(compile(main_code, GENERATED_MAIN, "exec"), namespace)
+                if not callable(namespace.get("main")):
+                    raise NameError("❌ The code defines no main() function")
+                namespace["main"]()
+        except (Exception, SystemExit) as e:  # Generated code can fail in any way, even `sys.exit()`; the traceback goes into the repair prompt
+            current.set(failed=True)
+            return diagram, [compact_traceback(main_code, e)]
+
+        if not diagram.shapes:
+            return diagram, ["❌ main() created no shapes"]
+        return diagram, validate_diagram(diagram, check_overlaps=False)  # Overlaps are a layout issue, not broken code
+
+def main_repair_prompt(description, errors):
+    """User prompt asking for new `main()` code, with only what went wrong in the failed dry run."""
+    problems = "\n\n    ".join(errors)
+    return f"""{description}
+
+    Your previous main() for this description failed when run:
+
+    {problems}
+
+    Return the complete corrected code.
+    """
+
+def generate_valid_main(description, llm_client=None, cache=response_cache, refresh=False, max_repairs=MAX_REPAIRS, candidates=CANDIDATES):
+    """
+    Generate `candidates` `main()` functions in parallel and dry-run each as it arrives
+    (`dry_run_main`); the first that runs and builds a valid diagram is used. When all
+    fail, the compact traceback or validation problems are sent back to the model, up
+    to `max_repairs` times. Returns the built diagram and its code, or raises `DiagramError`.
+    """
+    def check(main_code):
+        diagram, errors = dry_run_main(main_code)
+        return (diagram, main_code), errors
+
+    return generate_until_valid(
+        "generate_valid_main", main_system_prompt(), description, check,
+        lambda description, result, errors: main_repair_prompt(description, errors),
+        candidates=candidates, max_repairs=max_repairs,
+        llm_client=llm_client, cache=cache, refresh=refresh
     )
 
-    return response.choices[0].message.content
+def spec_system_prompt():
+    """System prompt asking for a JSON diagram spec that follows the schema derived from script.py's builder functions."""
+    return f"""
+    You are an assistant that designs an Entity-Relationship Diagram (ERD) and Data Flow Diagram (DFD) as a JSON diagram spec.
+    The problem description may be vague. Ensure to think through all possible entities and flows to create a robust, comprehensive DFD and ERD.
+
+    The spec must be a JSON object matching this JSON Schema:
+
+    {json.dumps(spec_schema(LAYOUT_KINDS))}
 
-def save_and_run_main(main_code):
-    """Save the generated main function to a temporary Python file and execute it."""
-    with open("generated_main.py", "w") as f:
+    - Put DFD external entities, processes and data stores in `shapes` (flowchart elements, choose a fitting `flowchart_type`).
+    - Put ERD tables in `entities`, marking primary keys in `attributes`.
+    - Give every shape and entity a unique `id`, and connect them in `lines` by those ids (`shape1_id` → `shape2_id`).
+      Use `line_type` for ERD cardinality (crow's foot notation) and `relationship` for the label.
+    - Entities whose attribute matches another entity's primary key (e.g. `Orders.UserID` → `Users.UserID`) are connected
+      automatically. Only add `lines` between entities for relationships that don't follow from attribute names.
+    - Leave out x/y coordinates and line sides; the diagram is laid out automatically.
+
+    **Return only the JSON object.** Do not include explanations.
+    """
+
+def repair_prompt(description, diagram_spec, errors):
+    """User prompt asking the model to fix the problems found in its previous spec."""
+    problems = "\n    ".join(f"- {error}" for error in errors)
+    return f"""{description}
+
+    Your previous diagram spec for this description was:
+
+    {json.dumps(diagram_spec)}
+
+    Building and validating it found these problems:
+    {problems}
+
+    Return the complete corrected spec.
+    """
+
+def check_spec(content):
+    """Parse, build and validate a spec completion. Returns `((diagram, spec), errors)`."""
+    try:
+        diagram_spec = parse_spec(content)
+    except ValueError as e:
+        return (None, content), [f"❌ The spec is not valid JSON: {e}"]
+    try:
+        diagram, ids = build_from_spec(diagram_spec)
+    except SpecError as e:
+        return (None, diagram_spec), e.errors
+    return (diagram, diagram_spec), validate_diagram(diagram, labels={builder_id: spec_id for spec_id, builder_id in ids.items()})
+
+def generate_valid_diagram(description, llm_client=None, cache=response_cache, refresh=False, max_repairs=MAX_REPAIRS, candidates=CANDIDATES):
+    """
+    Generate `candidates` diagram specs in parallel, build each as it arrives and
+    validate the result (`validate_diagram`); the first valid one is used. When all
+    fail, the problems are sent back to the model together with a spec, up to
+    `max_repairs` times. Returns the diagram and its spec, or raises `DiagramError`
+    (a `ValueError`) listing the problems that remain.
+    """
+    return generate_until_valid(
+        "generate_valid_diagram", spec_system_prompt(), description, check_spec,
+        lambda description, result, errors: repair_prompt(description, result[1], errors),
+        candidates=candidates, max_repairs=max_repairs,
+        llm_client=llm_client, cache=cache, refresh=refresh, json_mode=True
+    )
+
+def chunk_system_prompt():
+    """System prompt for extracting the part of a diagram spec that one section of a long description covers."""
+    return spec_system_prompt() + """
+    The description is one section of a longer requirements document. The other sections are extracted separately
+    and merged by name, so:
+    - Include only the entities, attributes, processes, data stores and flows this section mentions.
+    - Name each thing the way the document does, so it gets the same name in every section.
+    - Only add `lines` between records you include.
+    """
+
+def _build_records(diagram_spec):
+    """Build each record of a spec on its own, skipping the ones that fail, then infer lines and lay out."""
+    builder = StreamingSpecBuilder(Diagram(diagram_spec.get("title", "Dynamic Diagram"), deterministic_ids=True), kinds=LAYOUT_KINDS)
+    for _, kind, record in spec_records(diagram_spec):
+        builder.feed(json.dumps({**record, "kind": kind}) + "\n")
+    diagram = builder.close()
+    diagram.infer_relationships()
+    diagram.auto_layout()
+    return diagram
+
+def generate_chunked_diagram(description, llm_client=None, cache=response_cache, refresh=False, chunk_chars=CHUNK_CHARS, max_workers=CHUNK_WORKERS):
+    """
+    Map-reduce generation for long descriptions: split the description into sections
+    (`chunking.split_description`), extract a partial spec from each in parallel
+    requests, merge them locally (`chunking.merge_specs`) and build the merged spec.
+    Returns the diagram, the merged spec and the problems found (chunks whose request
+    failed or whose reply couldn't be parsed, records skipped while merging or building).
+    """
+    chunks = split_description(description, chunk_chars)
+    print(f"✂️ Split the description into {len(chunks)} chunks.")
+
+    def extract(chunk):
+        return parse_spec(chat_completion(
+            chunk_system_prompt(), chunk, llm_client=llm_client, cache=cache, refresh=refresh, json_mode=True
+        ))
+
+    with metrics.span("generate_chunked_diagram", chunks=len(chunks)) as current:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, extract, chunk) for chunk in chunks]
+
+        specs, problems = [], []
+        for i, future in enumerate(futures, 1):
+            try:
+                specs.append(future.result())
+            except ValueError as e:  # Unparseable JSON: the chunk's records are missing, the rest still merge
+                problems.append(f"chunk {i}: {e}")
+                specs.append({})
+            except Exception as e:  # A failed request (rate limit, connection error) only loses its chunk too
+                problems.append(f"chunk {i}: {type(e).__name__}: {e}")
+                specs.append({})
+
+        diagram_spec, skipped = merge_specs(specs)
+        problems.extend(skipped)
+        try:
+            diagram, _ = build_from_spec(diagram_spec)
+        except SpecError as e:  # Build the records that work, like a streamed spec, and report the rest
+            problems.extend(e.errors)
+            diagram = _build_records(diagram_spec)
+        current.set(problems=len(problems), shapes=len(diagram.shapes), lines=len(diagram.lines))
+        return diagram, diagram_spec, problems
+
+def save_spec(diagram_spec, path="generated_spec.json"):
+    """Save the generated spec so runs can be inspected and diffed."""
+    with open(path, "w") as f:
+        json.dump(diagram_spec, f, indent=2)
+
+def stream_diagram(description, llm_client=None, cache=response_cache, refresh=False, diagram=None):
+    """
+    Stream a JSON Lines diagram spec from OpenAI and build each shape, entity and line
+    into `diagram` (a new one by default) as soon as its line completes, instead of
+    waiting for the whole response. Returns the diagram and the problems found in the
+    streamed records.
+    """
+    record_kinds = {kind: record_schema(kind) for kind in LAYOUT_KINDS}
+    system_prompt = f"""
+    You are an assistant that designs an Entity-Relationship Diagram (ERD) and Data Flow Diagram (DFD) as a stream of JSON records.
+    The problem description may be vague. Ensure to think through all possible entities and flows to create a robust, comprehensive DFD and ERD.
+
+    Output JSON Lines: exactly one JSON object per line, each a record matching one of these JSON Schemas (keyed by `kind`):
+
+    {json.dumps(record_kinds)}
+
+    - Use `flowchart` records for DFD external entities, processes and data stores, and `entity` records for ERD tables.
+    - Give every shape and entity a unique `id`, and connect them with `line` records by those ids (`shape1_id` → `shape2_id`).
+      Emit each line right after the two records it connects.
+    - Entities whose attribute matches another entity's primary key (e.g. `Orders.UserID` → `Users.UserID`) are connected
+      automatically. Only emit `line` records between entities for relationships that don't follow from attribute names.
+    - Leave out x/y coordinates and line sides; the diagram is laid out automatically.
+
+    **Return only the JSON Lines.** Do not include explanations or code fences.
+    """
+
+    with metrics.span("stream_diagram", model=MODEL) as current:
+        builder = StreamingSpecBuilder(diagram, kinds=LAYOUT_KINDS)
+        key = ResponseCache.key(MODEL, system_prompt, description)
+        cached = cache.get(key) if cache is not None and not refresh else None
+
+        if cached is not None:
+            current.set(cached=True)
+            print("♻️ Using cached OpenAI response.")
+            builder.feed(cached)
+        else:
+            stream = (llm_client or openai_client()).chat.completions.create(
+                model=MODEL,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": description}
+                ],
+                stream=True,
+                stream_options={"include_usage": True}  # Usage arrives in a final chunk without choices
+            )
+            parts = []
+            for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    parts.append(text)
+                    builder.feed(text)
+                if getattr(chunk, "usage", None) is not None:
+                    record_usage(current, chunk)
+
+            if cache is not None:
+                cache.put(key, "".join(parts), model=MODEL)
+
+        diagram = builder.close()
+        current.set(records=builder.records, errors=len(builder.errors))
+        return diagram, builder.errors
+
+def preview(diagram, path):
+    """Render a diagram locally (see `render.py`) instead of uploading it."""
+    from render import save_preview
+
+    save_preview(generate_lucidchart_json(diagram), path)
+    print(f"🖼️ Preview written to {path}")
+
+def import_and_open(diagram):
+    """Upload a diagram and open it in the browser."""
+    document_id = import_to_lucidchart(diagram)
+    if document_id:
+        lucidchart_url = f"https://lucid.app/lucidchart/{document_id}/edit"
+        print(f"🌍 Open the Lucidchart DFD + ERD: {lucidchart_url}")
+        import webbrowser
+
+        webbrowser.open(lucidchart_url)
+    return document_id
+
+def save_main(main_code, path=GENERATED_MAIN):
+    """Save the generated main function so runs can be inspected and rerun by hand."""
+    with open(path, "w") as f:
         f.write(main_code)
 
-    print("🚀 Running generated main function...")
-    os.system("python generated_main.py")  # Run the generated file
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate an ERD/DFD in Lucidchart from a problem description.")
+    parser.add_argument("problem", nargs="?", default="problem.txt", help="Problem description file")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the OpenAI response cache")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached OpenAI responses and store fresh ones")
+    parser.add_argument("--code", action="store_true", help="Generate and run a Python main() instead of a JSON diagram spec")
+    parser.add_argument("--candidates", type=int, default=CANDIDATES, help="Completions to request in parallel (the first valid one is used)")
+    parser.add_argument("--chunked", action="store_true", help="Split a long description into sections, extract each in parallel and merge")
+    parser.add_argument("--chunk-chars", type=int, default=CHUNK_CHARS, help="Maximum characters per chunk with --chunked")
+    parser.add_argument("--stream", action="store_true", help="Stream the spec and build the diagram while it is generated")
+    parser.add_argument("--metrics-jsonl", help="Append a JSON line per timed stage to this file")
+    parser.add_argument("--metrics-prometheus", help="Write aggregated stage metrics to this file in Prometheus text format")
+    parser.add_argument("--max-page-shapes", type=int, help="Split diagrams with more shapes than this onto several pages")
+    parser.add_argument("--preview", help="Render the diagram to this SVG/PNG file instead of importing it into Lucidchart")
+    args = parser.parse_args()
+    if args.candidates < 1:
+        parser.error(f"--candidates must be at least 1, got {args.candidates}")
+    return args
 
 def main():
-    """Main function to read problem description, generate main(), and execute it."""
-    problem_description = read_problem_description("problem.txt")
-    main_code = generate_main_function(problem_description)
+    """Main function to read problem description, generate a diagram spec (or main()), and build it."""
+    args = parse_args()
+    if args.metrics_jsonl or args.metrics_prometheus:
+        metrics.enable(args.metrics_jsonl, args.metrics_prometheus)
+    problem_description = read_problem_description(args.problem)
+    cache = None if args.no_cache else response_cache
+
+    if args.stream:
+        diagram, errors = stream_diagram(problem_description, cache=cache, refresh=args.refresh)
+        for error in errors:
+            print(f"⚠️ Skipped {error}")
+        print(f"🧩 Built {len(diagram.shapes)} shapes and {len(diagram.lines)} lines from the stream.")
+        diagram.max_page_shapes = args.max_page_shapes
+        diagram.infer_relationships()
+        diagram.auto_layout()
+        for problem in validate_diagram(diagram):
+            print(f"⚠️ {problem}")
+        if args.preview:
+            preview(diagram, args.preview)
+        else:
+            import_and_open(diagram)
+        return
+
+    if args.chunked:
+        diagram, diagram_spec, problems = generate_chunked_diagram(
+            problem_description, cache=cache, refresh=args.refresh, chunk_chars=args.chunk_chars
+        )
+        save_spec(diagram_spec)
+        for problem in problems:
+            print(f"⚠️ Skipped {problem}")
+        print(f"🧩 Built {len(diagram.shapes)} shapes and {len(diagram.lines)} lines from the merged spec.")
+        diagram.max_page_shapes = args.max_page_shapes
+        for problem in validate_diagram(diagram):
+            print(f"⚠️ {problem}")
+        if args.preview:
+            preview(diagram, args.preview)
+        else:
+            import_and_open(diagram)
+        return
+
+    if not args.code:
+        try:
+            diagram, diagram_spec = generate_valid_diagram(
+                problem_description, cache=cache, refresh=args.refresh, candidates=args.candidates
+            )
+            save_spec(diagram_spec)
+            diagram.max_page_shapes = args.max_page_shapes
+            print(f"🧩 Built {len(diagram.shapes)} shapes and {len(diagram.lines)} lines from the spec.")
+            if args.preview:
+                preview(diagram, args.preview)
+            else:
+                import_and_open(diagram)
+            return
+        except ValueError as e:  # Unparseable JSON, or problems left after repairs
+            print(f"⚠️ {e}")
+            print("↩️ Falling back to generating a Python main() function...")
+
+    diagram, main_code = generate_valid_main(problem_description, cache=cache, refresh=args.refresh, candidates=args.candidates)
+    save_main(main_code)
 
     print("\n🔹 Generated `main()` Function:\n")
     print(main_code)  # Print the generated function
 
-    save_and_run_main(main_code)
+    diagram.max_page_shapes = args.max_page_shapes
+    print(f"🧩 Built {len(diagram.shapes)} shapes and {len(diagram.lines)} lines from the generated main().")
+    if args.preview:
+        preview(diagram, args.preview)
+    else:
+        import_and_open(diagram)
 
 if __name__ == "__main__":
     main()
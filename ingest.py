@@ -0,0 +1,235 @@
+import os
+import re
+import glob
+import sqlite3
+import argparse
+import pandas as pd
+import metrics
+from script import Diagram, save_lucidchart_file, import_to_lucidchart
+
+# Rows read per pandas chunk, so large files are never loaded whole
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Rows sampled per CSV file for types and key detection (None scans the whole file)
+DEFAULT_MAX_ROWS = 200_000
+
+# Most general type wins when chunks disagree
+TYPE_ORDER = ["BOOLEAN", "INTEGER", "REAL", "DATETIME", "TEXT"]
+
+
+### 🚀 Type Inference ###
+def _chunk_type(series):
+    """Data type of one chunk of a column, or None if the chunk is all nulls."""
+    values = series.dropna()
+    if values.empty:
+        return None
+    if pd.api.types.is_bool_dtype(values):
+        return "BOOLEAN"
+    if pd.api.types.is_integer_dtype(values):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(values):
+        return "INTEGER" if (values % 1 == 0).all() else "REAL"  # Integers with gaps read as floats
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return "DATETIME"
+
+    text = values.astype(str)
+    if text.str.fullmatch(r"(?i)true|false").all():
+        return "BOOLEAN"
+    if pd.to_datetime(text, errors="coerce", format="ISO8601").notna().all():
+        return "DATETIME"
+    return "TEXT"
+
+
+def _widen(current, new):
+    if current is None:
+        return new
+    if new is None:
+        return current
+    if {current, new} == {"INTEGER", "REAL"}:
+        return "REAL"
+    return current if current == new else "TEXT"
+
+
+def _singular(name):
+    name = name.lower()
+    if name.endswith("ies"):
+        return name[:-3] + "y"
+    return name[:-1] if name.endswith("s") and not name.endswith("ss") else name
+
+
+def pick_primary_key(table, columns, candidates):
+    """
+    Choose the primary key among `candidates` (columns that are unique and never null):
+    `id`, then `<table>_id`/`<table>id` (singular), then the first column, then any `...id`.
+    """
+    if not candidates:
+        return None
+    normalized = {column: re.sub(r"[^a-z0-9]", "", column.lower()) for column in columns}
+    preferences = [
+        lambda column: normalized[column] == "id",
+        lambda column: normalized[column] == _singular(table).replace("_", "") + "id",
+        lambda column: column == columns[0],
+        lambda column: normalized[column].endswith("id")
+    ]
+    for preferred in preferences:
+        for column in columns:
+            if column in candidates and preferred(column):
+                return column
+    return None
+
+
+### 🚀 CSV Files ###
+def csv_schema(path, max_rows=DEFAULT_MAX_ROWS, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Infer a table schema from a CSV file's header and rows, read in pandas chunks.
+
+    Returns {"name": ..., "columns": [{"name", "type", "primary_key", "nullable"}, ...]},
+    named after the file. Only the first `max_rows` rows are sampled, so keys and
+    types of very large files are inferred from that sample.
+    """
+    table = os.path.splitext(os.path.basename(path))[0]
+    with metrics.span("csv_schema", path=path) as current:
+        types, nullable, seen, rows = {}, {}, {}, 0
+        columns = None
+
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, nrows=max_rows, low_memory=False):
+            if columns is None:
+                columns = [str(column) for column in chunk.columns]
+                types = dict.fromkeys(columns)
+                nullable = dict.fromkeys(columns, False)
+                seen = {column: set() for column in columns}  # Values of columns still unique and non-null
+            chunk.columns = columns
+            rows += len(chunk)
+
+            for column in columns:
+                series = chunk[column]
+                types[column] = _widen(types[column], _chunk_type(series))
+                if series.isna().any():
+                    nullable[column] = True
+                    seen.pop(column, None)
+                elif column in seen:
+                    values = seen[column]
+                    before = len(values)
+                    values.update(series.tolist())
+                    if len(values) - before != len(series):
+                        del seen[column]
+
+        if columns is None:  # Header only, or an empty file
+            columns = [str(column) for column in pd.read_csv(path, nrows=0).columns]
+            types, nullable, seen = dict.fromkeys(columns), dict.fromkeys(columns, True), {}
+
+        primary_key = pick_primary_key(table, columns, set(seen) if rows else set())
+        current.set(rows=rows, columns=len(columns))
+
+    return {
+        "name": table,
+        "columns": [
+            {"name": column, "type": types[column] or "TEXT", "primary_key": column == primary_key, "nullable": nullable[column]}
+            for column in columns
+        ]
+    }
+
+
+### 🚀 SQLite Databases ###
+def sqlite_schemas(path):
+    """
+    Read every table's schema from a SQLite database, in the format of `csv_schema`.
+    Declared primary keys and types are used as-is; declared foreign keys are listed
+    under "foreign_keys" as {"column", "table", "to"}.
+    """
+    with metrics.span("sqlite_schemas", path=path) as current:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            names = [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            tables = []
+            for name in names:
+                quoted = '"' + name.replace('"', '""') + '"'
+                columns = [
+                    {"name": column, "type": (declared or "TEXT").upper(), "primary_key": pk > 0, "nullable": not notnull and not pk}
+                    for _, column, declared, notnull, _, pk in connection.execute(f"PRAGMA table_info({quoted})")
+                ]
+                foreign_keys = [
+                    {"column": column, "table": target, "to": to}
+                    for _, _, target, column, to, *_ in connection.execute(f"PRAGMA foreign_key_list({quoted})")
+                ]
+                tables.append({"name": name, "columns": columns, "foreign_keys": foreign_keys})
+        finally:
+            connection.close()
+        current.set(tables=len(tables))
+    return tables
+
+
+### 🚀 Build the ERD ###
+def schema_attributes(table):
+    """`create_entity` attributes (name, is_primary_key, data_type) for a table schema."""
+    return [(column["name"], column["primary_key"], column["type"]) for column in table["columns"]]
+
+
+def build_erd(tables, diagram=None, layout=True, infer=True):
+    """
+    Create one entity per table schema in `diagram` (a new `Diagram` with deterministic
+    IDs by default) and connect declared foreign keys. With `infer`, relationships
+    implied by attribute names are added too (`Diagram.infer_relationships`). The
+    diagram is then laid out. Returns the diagram and {table name: entity ID}.
+    """
+    diagram = diagram if diagram is not None else Diagram("Schema ERD", deterministic_ids=True)
+    entity_ids = {}
+    with metrics.span("build_erd", tables=len(tables)):
+        for table in tables:
+            entity_ids[table["name"]] = diagram.create_entity(table["name"], schema_attributes(table))
+
+        for table in tables:
+            keys = [column["name"] for column in table["columns"] if column["primary_key"]]
+            for foreign_key in table.get("foreign_keys", ()):
+                if foreign_key["table"] in entity_ids:
+                    line_type = "one-to-one" if keys == [foreign_key["column"]] else "one-to-many"
+                    diagram.create_line(
+                        entity_ids[foreign_key["table"]], entity_ids[table["name"]], foreign_key["column"], line_type,
+                        start_side="auto", end_side="auto"
+                    )
+
+        if infer:
+            diagram.infer_relationships()
+        if layout:
+            diagram.auto_layout()
+    return diagram, entity_ids
+
+
+def load_schemas(sources, max_rows=DEFAULT_MAX_ROWS):
+    """Table schemas from CSV files, directories of CSV files and SQLite databases (`.db`, `.sqlite`, `.sqlite3`)."""
+    tables = []
+    for source in sources:
+        if os.path.isdir(source):
+            tables += [csv_schema(path, max_rows=max_rows) for path in sorted(glob.glob(os.path.join(source, "*.csv")))]
+        elif source.lower().endswith((".db", ".sqlite", ".sqlite3")):
+            tables += sqlite_schemas(source)
+        else:
+            tables.append(csv_schema(source, max_rows=max_rows))
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an ERD from CSV files or SQLite databases, without an LLM.")
+    parser.add_argument("sources", nargs="+", help="CSV files, directories of CSV files, or SQLite databases")
+    parser.add_argument("--max-rows", type=int, default=DEFAULT_MAX_ROWS, help="Rows sampled per CSV file (0 scans everything)")
+    parser.add_argument("--output", default="schema.lucid", help="Where to save the .lucid file")
+    parser.add_argument("--upload", action="store_true", help="Also import the ERD into Lucidchart")
+    parser.add_argument("--max-page-shapes", type=int, help="Split ERDs with more tables than this onto several pages")
+    args = parser.parse_args()
+
+    tables = load_schemas(args.sources, max_rows=args.max_rows or None)
+    diagram, _ = build_erd(tables)
+    diagram.max_page_shapes = args.max_page_shapes
+    save_lucidchart_file(diagram, args.output)
+    print(f"✅ Built an ERD with {len(tables)} tables: {args.output}")
+
+    if args.upload:
+        document_id = import_to_lucidchart(diagram)
+        if document_id:
+            print(f"🌍 Open the Lucidchart ERD: https://lucid.app/lucidchart/{document_id}/edit")
+
+
+if __name__ == "__main__":
+    main()
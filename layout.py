@@ -0,0 +1,271 @@
+import math
+import numpy as np
+from script import is_container
+
+
+### 🚀 Layered (Sugiyama) Layout for DFDs ###
+def _assign_layers(n, src, dst):
+    """
+    Longest-path layering. Cycles are broken by reversing edges that point backwards
+    in a DFS reverse post-order. Returns (layers, src, dst) with all edges pointing down.
+    """
+    adjacency = [[] for _ in range(n)]
+    for s, d in zip(src.tolist(), dst.tolist()):
+        adjacency[s].append(d)
+
+    # Iterative DFS post-order
+    visited = np.zeros(n, dtype=bool)
+    post_order = []
+    for root in range(n):
+        if visited[root]:
+            continue
+        visited[root] = True
+        stack = [(root, iter(adjacency[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if not visited[child]:
+                    visited[child] = True
+                    stack.append((child, iter(adjacency[child])))
+                    break
+            else:
+                stack.pop()
+                post_order.append(node)
+
+    rank = np.empty(n, dtype=np.int64)
+    rank[np.array(post_order[::-1], dtype=np.int64)] = np.arange(n)
+
+    # Reverse back edges so every edge follows the topological order
+    backwards = rank[src] > rank[dst]
+    src, dst = np.where(backwards, dst, src), np.where(backwards, src, dst)
+
+    layers = np.zeros(n, dtype=np.int64)
+    for e in np.argsort(rank[src], kind="stable").tolist():
+        s, d = src[e], dst[e]
+        if layers[d] <= layers[s]:
+            layers[d] = layers[s] + 1
+
+    return layers, src, dst
+
+
+def _layer_starts(layers, order_by):
+    """Sort nodes by (layer, `order_by`) and return the permutation and each node's rank within its layer."""
+    perm = np.lexsort((order_by, layers))
+    counts = np.bincount(layers)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    rank = np.empty(len(layers), dtype=np.int64)
+    rank[perm] = np.arange(len(layers)) - starts[layers[perm]]
+    return perm, rank
+
+
+def layered_layout(sizes, src, dst, h_gap=120, v_gap=60, sweeps=8):
+    """
+    Lay out nodes left to right in layers following the edge direction.
+
+    - `sizes`: (n, 2) array of shape widths and heights
+    - `src`, `dst`: Edge endpoints as node indexes
+    Returns an (n, 2) array of top-left positions relative to (0, 0).
+    """
+    n = len(sizes)
+    layers, src, dst = _assign_layers(n, src, dst)
+
+    # ✅ Reduce crossings with barycenter sweeps over all layers at once
+    _, order = _layer_starts(layers, np.arange(n))
+    in_degree = np.bincount(dst, minlength=n) + np.bincount(src, minlength=n)
+    for _ in range(sweeps):
+        position = order.astype(np.float64)
+        total = np.bincount(dst, weights=position[src], minlength=n) + np.bincount(src, weights=position[dst], minlength=n)
+        barycenter = np.where(in_degree > 0, total / np.maximum(in_degree, 1), position)
+        _, order = _layer_starts(layers, barycenter)
+
+    # ✅ Column x from the widest shape in each layer
+    layer_count = layers.max() + 1
+    layer_widths = np.zeros(layer_count)
+    np.maximum.at(layer_widths, layers, sizes[:, 0])
+    layer_x = np.concatenate(([0.0], np.cumsum(layer_widths + h_gap)[:-1]))
+
+    # ✅ Stack each layer vertically in crossing-reduced order, centered on the tallest layer
+    perm = np.lexsort((order, layers))
+    heights = sizes[perm, 1] + v_gap
+    stacked = np.cumsum(heights)
+    layer_end = np.cumsum(np.bincount(layers, minlength=layer_count))
+    before_layer = np.concatenate(([0.0], stacked[layer_end[:-1] - 1]))
+    layer_total = stacked[layer_end - 1] - before_layer
+
+    y = np.empty(n)
+    sorted_layers = layers[perm]
+    y[perm] = stacked - heights - before_layer[sorted_layers] + (layer_total.max() - layer_total[sorted_layers]) / 2
+
+    return np.column_stack((layer_x[layers], y))
+
+
+### 🚀 Grid and Force-Directed Layouts for ERDs ###
+def _neighbour_order(n, src, dst):
+    """Breadth-first order over the relationship graph, so related tables end up next to each other."""
+    adjacency = [[] for _ in range(n)]
+    for s, d in zip(src.tolist(), dst.tolist()):
+        adjacency[s].append(d)
+        adjacency[d].append(s)
+
+    seen = np.zeros(n, dtype=bool)
+    order = []
+    for root in np.argsort([-len(a) for a in adjacency], kind="stable").tolist():
+        if seen[root]:
+            continue
+        seen[root] = True
+        queue = [root]
+        for node in queue:
+            order.append(node)
+            for neighbour in adjacency[node]:
+                if not seen[neighbour]:
+                    seen[neighbour] = True
+                    queue.append(neighbour)
+    return np.array(order, dtype=np.int64)
+
+
+def grid_layout(sizes, src, dst, h_gap=120, v_gap=60):
+    """Place nodes on a near-square grid whose columns and rows fit their widest and tallest shapes."""
+    n = len(sizes)
+    cols = math.ceil(math.sqrt(n))
+    slot = np.empty(n, dtype=np.int64)
+    slot[_neighbour_order(n, src, dst)] = np.arange(n)
+    row, col = slot // cols, slot % cols
+
+    col_widths = np.zeros(cols)
+    np.maximum.at(col_widths, col, sizes[:, 0])
+    row_heights = np.zeros(row.max() + 1)
+    np.maximum.at(row_heights, row, sizes[:, 1])
+
+    col_x = np.concatenate(([0.0], np.cumsum(col_widths + h_gap)[:-1]))
+    row_y = np.concatenate(([0.0], np.cumsum(row_heights + v_gap)[:-1]))
+    return np.column_stack((col_x[col], row_y[row]))
+
+
+def _pairwise_blocks(n, block=1024):
+    for start in range(0, n, block):
+        yield start, min(n, start + block)
+
+
+def force_layout(sizes, src, dst, h_gap=120, v_gap=60, iterations=100):
+    """
+    Fruchterman-Reingold layout seeded from the grid layout, followed by overlap removal.
+    Repulsion is all-pairs, so prefer `grid_layout` beyond a few hundred tables.
+    """
+    n = len(sizes)
+    positions = grid_layout(sizes, src, dst, h_gap, v_gap)
+    if n < 2:
+        return positions
+
+    centers = positions + sizes / 2
+    k = float(np.sqrt(np.mean(sizes[:, 0] + h_gap) * np.mean(sizes[:, 1] + v_gap)))
+    temperature = k * 2
+
+    for _ in range(iterations):
+        displacement = np.zeros_like(centers)
+
+        # Repulsion k²/d between all pairs, in row blocks to bound memory
+        x, y = centers[:, 0], centers[:, 1]
+        for start, stop in _pairwise_blocks(n):
+            dx = x[start:stop, None] - x[None, :]
+            dy = y[start:stop, None] - y[None, :]
+            force = k * k / np.maximum(dx * dx + dy * dy, 1e-2)
+            displacement[start:stop, 0] += (dx * force).sum(axis=1)
+            displacement[start:stop, 1] += (dy * force).sum(axis=1)
+
+        # Attraction d²/k along relationships
+        delta = centers[src] - centers[dst]
+        distance = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-2)
+        pull = delta * (distance / k)[:, None]
+        np.add.at(displacement, src, -pull)
+        np.add.at(displacement, dst, pull)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        centers += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= 0.95
+
+    positions = remove_overlaps(centers - sizes / 2, sizes, h_gap / 2, v_gap / 2)
+    return positions - positions.min(axis=0)
+
+
+def remove_overlaps(positions, sizes, h_gap=0, v_gap=0, max_iterations=100):
+    """Push overlapping boxes apart along their axis of least overlap until none overlap."""
+    positions = positions.astype(np.float64, copy=True)
+    n = len(positions)
+    padded = sizes + (h_gap, v_gap)
+
+    for _ in range(max_iterations):
+        centers = positions + sizes / 2
+        push = np.zeros_like(positions)
+        overlapping = False
+
+        for start, stop in _pairwise_blocks(n):
+            delta = centers[start:stop, None, :] - centers[None, :, :]
+            overlap = (padded[start:stop, None, :] + padded[None, :, :]) / 2 - np.abs(delta)
+            hits = (overlap > 0).all(axis=2)
+            hits[np.arange(stop - start), np.arange(start, stop)] = False
+            if not hits.any():
+                continue
+            overlapping = True
+
+            i, j = np.nonzero(hits)
+            i_global = i + start
+            axis = (overlap[i, j, 0] > overlap[i, j, 1]).astype(np.int64)  # Move along the smaller overlap
+            direction = np.sign(delta[i, j, axis])
+            direction[direction == 0] = np.where(i_global[direction == 0] < j[direction == 0], -1, 1)
+            np.add.at(push, (i_global, axis), direction * (overlap[i, j, axis] / 2 + 1))
+
+        if not overlapping:
+            break
+        positions += push
+
+    return positions
+
+
+ERD_LAYOUTS = {"grid": grid_layout, "force": force_layout}
+
+
+### 🚀 Auto Layout ###
+def auto_layout(diagram, origin=(100, 100), h_gap=120, v_gap=60, erd_layout="grid"):
+    """
+    Position every shape of `diagram` from its real `boundingBox` size, replacing the
+    caller's x/y. Flowchart elements and other shapes get a layered left-to-right layout
+    following the lines between them; tables (ERD entities) are placed below using the
+    `erd_layout` strategy ("grid" or "force"). Containers are left where they are.
+    """
+    if erd_layout not in ERD_LAYOUTS:
+        raise ValueError(f"❌ Invalid ERD layout: {erd_layout}. Must be one of {set(ERD_LAYOUTS)}.")
+
+    with diagram._lock:
+        shapes = [shape for shape in diagram.shapes if not is_container(shape)]
+        lines = list(diagram.lines)
+
+    top = float(origin[1])
+    for group in (
+        [shape for shape in shapes if shape["type"] != "table"],
+        [shape for shape in shapes if shape["type"] == "table"]
+    ):
+        if not group:
+            continue
+
+        index = {shape["id"]: i for i, shape in enumerate(group)}
+        edges = np.array([
+            (index[line["endpoint1"]["shapeId"]], index[line["endpoint2"]["shapeId"]])
+            for line in lines
+            if line["endpoint1"].get("shapeId") in index and line["endpoint2"].get("shapeId") in index
+        ], dtype=np.int64).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        sizes = np.array([(shape["boundingBox"]["w"], shape["boundingBox"]["h"]) for shape in group], dtype=np.float64)
+
+        if group[0]["type"] == "table":
+            positions = ERD_LAYOUTS[erd_layout](sizes, edges[:, 0], edges[:, 1], h_gap, v_gap)
+        else:
+            positions = layered_layout(sizes, edges[:, 0], edges[:, 1], h_gap, v_gap)
+
+        positions += (origin[0], top)
+        for shape, (x, y) in zip(group, positions.round().astype(np.int64).tolist()):
+            shape["boundingBox"]["x"] = x
+            shape["boundingBox"]["y"] = y
+
+        top = float((positions[:, 1] + sizes[:, 1]).max()) + v_gap * 2
+
+    return diagram
@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for LLM responses.
+
+    Entries are keyed on a hash of the model and prompts, stored one JSON file per
+    key, and evicted least-recently-used first (by file mtime, bumped on every hit)
+    once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, system_prompt, user_prompt):
+        payload = json.dumps([model, system_prompt, user_prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached response text, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            return None
+        return entry["content"]
+
+    def put(self, key, content, model=None):
+        """Store a response, then evict the least recently used entries above the size cap."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": model, "created": time.time(), "content": content}, f)
+        os.replace(temp_path, path)  # Atomic, so readers never see a partial entry
+
+        self.evict(keep=key)
+
+    def discard(self, key):
+        """Remove an entry, e.g. a response that turned out to be unusable. Missing entries are ignored."""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits in `max_bytes`. The `keep`
+        entry (the one just stored) is never removed: file mtimes are coarse, so it can
+        tie with older entries.
+        """
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if name == f"{keep}.json":
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+                total -= size
+
+    def clear(self):
+        with self._lock:
+            if not os.path.isdir(self.directory):
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,575 @@
+import os
+import re
+import json
+import time
+import random
+import secrets
+import threading
+import email.utils
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import metrics
+from script import (
+    Diagram, document_hash, package_document, LINE_ENDPOINT_STYLES, FLOWCHART_TYPES, CONTAINER_TYPES, STANDARD_SHAPE_TYPES
+)
+
+# Load API key
+load_dotenv()
+LUCIDCHART_API_KEY = os.getenv("LUCIDCHART_API_KEY")
+
+LUCID_API_URL = "https://api.lucid.co"
+
+# Per-account limits as (requests, seconds), see documentation_lucid/documents.md.
+# Document import has no documented limit, so it gets the stricter contents budget.
+RATE_LIMITS = {
+    "search": (300, 5.0),
+    "contents": (100, 5.0),
+    "import": (100, 5.0)
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Local record of imported documents, content hash -> Lucid document ID
+DEFAULT_INDEX_PATH = ".lucid_index.json"
+
+# Fetched document contents, one file per document ID
+DEFAULT_CONTENTS_DIR = ".lucid_contents"
+
+# Documents per search page (the API maximum)
+SEARCH_PAGE_SIZE = 200
+
+# Bytes of an upload read into memory at a time
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+### 🚀 Rate Limiting ###
+class TokenBucket:
+    """Thread-safe token bucket allowing `capacity` requests per `period` seconds."""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a `Retry-After` header (seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+### 🚀 Streaming Multipart Uploads ###
+class MultipartStream:
+    """
+    A `multipart/form-data` body read straight from its parts, so uploading a spooled
+    `.lucid` archive never holds the whole file in memory (`requests` reads `files=`
+    into one bytes object). Its length is known up front, so it is sent with a
+    `Content-Length` instead of chunked encoding, and `seek(0)` rewinds it for a retry.
+
+    - `fields`: List of (name, value) text fields
+    - `files`: List of (name, filename, open binary file, content type)
+    """
+
+    def __init__(self, fields=(), files=()):
+        self.boundary = secrets.token_hex(16)
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._segments = []  # bytes, or (file, size) read from the file's current start
+        for name, filename, fp, content_type in files:
+            start = fp.tell()
+            size = fp.seek(0, os.SEEK_END) - start
+            fp.seek(start)
+            self._segments.append(self._header(name, filename, content_type))
+            self._segments.append((fp, start, size))
+            self._segments.append(b"\r\n")
+        for name, value in fields:
+            self._segments.append(self._header(name) + str(value).encode("utf-8") + b"\r\n")
+        self._segments.append(f"--{self.boundary}--\r\n".encode())
+        self.length = sum(len(segment) if isinstance(segment, bytes) else segment[2] for segment in self._segments)
+        self.seek(0)
+
+    def _header(self, name, filename=None, content_type=None):
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        lines = [f"--{self.boundary}", f"Content-Disposition: {disposition}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+
+    def __len__(self):
+        return self.length
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if (offset, whence) != (0, os.SEEK_SET):
+            raise ValueError("❌ A multipart stream can only be rewound to the start.")
+        self._position, self._segment, self._offset = 0, 0, 0
+        return 0
+
+    def read(self, size=-1):
+        """Read up to `size` bytes (everything left when negative)."""
+        size = self.length - self._position if size is None or size < 0 else size
+        chunks = []
+        while size > 0 and self._segment < len(self._segments):
+            segment = self._segments[self._segment]
+            if isinstance(segment, bytes):
+                chunk = segment[self._offset:self._offset + size]
+            else:
+                fp, start, total = segment
+                fp.seek(start + self._offset)
+                chunk = fp.read(min(size, total - self._offset))
+                if not chunk and self._offset < total:
+                    raise OSError("❌ Upload file ended early.")
+            chunks.append(chunk)
+            self._offset += len(chunk)
+            self._position += len(chunk)
+            size -= len(chunk)
+            if self._offset == (len(segment) if isinstance(segment, bytes) else segment[2]):
+                self._segment, self._offset = self._segment + 1, 0
+        return b"".join(chunks)
+
+    def __iter__(self):
+        while chunk := self.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+
+### 🚀 Lucid API Client ###
+class LucidClient:
+    """
+    Lucid REST API client sharing one pooled `requests.Session` across threads.
+
+    Every request waits on the token bucket for its endpoint (`RATE_LIMITS`) and is
+    retried on connection errors, `429 Too Many Requests` and 5xx responses with
+    jittered exponential backoff, honouring `Retry-After` when the server sends it.
+    """
+
+    def __init__(self, api_key=None, base_url=LUCID_API_URL, max_retries=5, backoff_base=0.5,
+                 backoff_max=30.0, pool_size=16, rate_limits=None, timeout=60):
+        self.api_key = api_key or LUCIDCHART_API_KEY
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Lucid-Api-Version": "1"
+        })
+
+        limits = {**RATE_LIMITS, **(rate_limits or {})}
+        self.limiters = {endpoint: TokenBucket(*limit) for endpoint, limit in limits.items()}
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _backoff(self, attempt, response=None):
+        """Delay before retry `attempt`: `Retry-After` if given, otherwise full-jitter exponential."""
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, endpoint, method, path, **kwargs):
+        """
+        Send a rate-limited request to `path`, retrying transient failures.
+
+        `endpoint` selects the rate limiter ("search", "contents", "import"). Returns the
+        final `requests.Response`; connection errors are re-raised once retries run out.
+        """
+        limiter = self.limiters.get(endpoint)
+        url = path if path.startswith(("http://", "https://")) else f"{self.base_url}{path}"  # Next-page links are absolute
+        kwargs.setdefault("timeout", self.timeout)
+
+        with metrics.span("lucid_request", endpoint=endpoint, method=method) as current:
+            for attempt in range(self.max_retries + 1):
+                current.set(retries=attempt)
+
+                # Rewind upload streams consumed by a previous attempt
+                for part in (kwargs.get("files") or {}).values():
+                    if hasattr(part[1], "seek"):
+                        part[1].seek(0)
+                if hasattr(kwargs.get("data"), "seek"):
+                    kwargs["data"].seek(0)
+
+                if limiter:
+                    limiter.acquire()
+
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt == self.max_retries:
+                        raise
+                    time.sleep(self._backoff(attempt))
+                    continue
+
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    current.set(status=response.status_code)
+                    return response
+
+                time.sleep(self._backoff(attempt, response))
+                response.close()
+
+    def import_document(self, lucid_file, title="Dynamic Diagram", product="lucidchart"):
+        """
+        Upload an open `.lucid` archive as a new document and return the response. The
+        archive is streamed from its current position (`MultipartStream`), not read into memory.
+        """
+        body = MultipartStream(
+            fields=[("product", product), ("title", title)],
+            files=[("file", "document.lucid", lucid_file, "x-application/vnd.lucid.standardImport")]
+        )
+        return self.request("import", "POST", "/documents", data=body, headers={"Content-Type": body.content_type})
+
+    def search_documents(self, page_size=SEARCH_PAGE_SIZE, **filters):
+        """
+        Lazily page through `POST /documents/search`, yielding one Document resource
+        (`documentId`, `title`, `lastModified`, ...) at a time. The next page is only
+        requested once the current one is used up.
+
+        - `filters`: Search body parameters, e.g. `product=["lucidchart"]`, `keywords="orders"`
+          or `lastModifiedAfter="2024-01-01T00:00:00Z"`
+        Raises `requests.HTTPError` if a page can't be fetched.
+        """
+        path, params = "/documents/search", {"pageSize": page_size}
+        while path:
+            response = self.request("search", "POST", path, json=filters, params=params)
+            response.raise_for_status()
+            yield from response.json()
+            path = response.links.get("next", {}).get("url")  # Carries the page token
+            params = None
+
+    def get_document_contents(self, document_id):
+        """Return the Document Content resource of `GET /documents/{id}/contents`; raises `requests.HTTPError` on failure."""
+        response = self.request("contents", "GET", f"/documents/{document_id}/contents")
+        response.raise_for_status()
+        return response.json()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def default_client():
+    """Return the process-wide client, creating it on first use."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LucidClient()
+        return _default_client
+
+
+### 🚀 Import Index ###
+class ImportIndex:
+    """
+    Thread-safe JSON file mapping document content hashes (`script.document_hash`) to
+    the Lucid document IDs they were imported as, so unchanged diagrams aren't
+    uploaded again.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.documents = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.documents = json.load(f)
+
+    def get(self, content_hash):
+        with self._lock:
+            return self.documents.get(content_hash)
+
+    def put(self, content_hash, document_id):
+        with self._lock:
+            self.documents[content_hash] = document_id
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self.documents, f, indent=2)
+            os.replace(temp_path, self.path)  # Never leave a half-written index behind
+
+
+_default_index = None
+
+def default_index():
+    """Return the process-wide import index, loading it on first use."""
+    global _default_index
+    with _default_client_lock:
+        if _default_index is None:
+            _default_index = ImportIndex()
+        return _default_index
+
+
+### 🚀 Bulk Import ###
+def _import_one(client, index, document, title, import_index):
+    result = {"index": index, "title": title, "document_id": None, "status": None, "error": None}
+
+    if isinstance(document, tuple):
+        result["title"], document = document
+
+    content_hash = None
+    try:
+        if isinstance(document, Diagram):
+            lucid_json = document.to_json()
+            if import_index is not None:
+                content_hash = document_hash(lucid_json, result["title"])
+                result["document_id"] = import_index.get(content_hash)
+                if result["document_id"]:
+                    return result  # Identical document already imported
+            lucid_file = package_document(lucid_json)
+        elif isinstance(document, (str, os.PathLike)):
+            lucid_file = open(document, "rb")
+        else:
+            lucid_file = document  # Already an open binary stream
+
+        with lucid_file:
+            response = client.import_document(lucid_file, title=result["title"])
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    result["status"] = response.status_code
+    if response.status_code == 201:
+        result["document_id"] = response.json()["documentId"]
+        if content_hash:
+            import_index.put(content_hash, result["document_id"])
+    else:
+        result["error"] = response.text
+    return result
+
+
+def bulk_import(documents, client=None, max_workers=8, title="Dynamic Diagram", dedup=True):
+    """
+    Upload many diagrams concurrently and return one result dict per document, in order.
+
+    - `documents`: `Diagram` sessions, `.lucid` file paths or open archives, optionally
+      as `(title, document)` tuples
+    - `client`: `LucidClient` to share (defaults to the process-wide client)
+    - `max_workers`: Maximum number of uploads in flight
+    - `dedup`: Skip `Diagram`s already imported with identical content and title
+      (see `ImportIndex`); their result has the earlier `document_id` and no `status`
+
+    Each result has `index`, `title`, `document_id`, `status` and `error`. Diagrams
+    are packaged inside the workers, so at most `max_workers` archives exist at once.
+    """
+    client = client or default_client()
+    import_index = default_index() if dedup else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_import_one, client, index, document, title, import_index)
+            for index, document in enumerate(documents)
+        ]
+        return [future.result() for future in futures]
+
+
+### 🚀 Document Contents Cache ###
+class ContentsCache:
+    """
+    On-disk cache of fetched document contents, one JSON file per document ID holding
+    the contents and the `lastModified` they were fetched at. A document whose
+    `lastModified` hasn't changed since is served from here instead of downloaded again.
+    """
+
+    def __init__(self, directory=DEFAULT_CONTENTS_DIR):
+        self.directory = directory
+
+    def _path(self, document_id):
+        return os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_-]", "_", document_id) + ".json")
+
+    def get(self, document_id, last_modified):
+        """Return the cached contents if they were fetched at `last_modified`, otherwise None."""
+        if not last_modified:
+            return None
+        try:
+            with open(self._path(document_id), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry["contents"] if entry.get("lastModified") == last_modified else None
+
+    def put(self, document_id, last_modified, contents):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(document_id)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"documentId": document_id, "lastModified": last_modified, "contents": contents}, f)
+        os.replace(temp_path, path)  # Atomic, so readers never see a partial entry
+
+
+### 🚀 Fetch Document Contents ###
+def _fetch_one(client, cache, document):
+    if isinstance(document, dict):
+        document_id, last_modified = document["documentId"], document.get("lastModified")
+    else:
+        document_id, last_modified = document, None
+    result = {
+        "document_id": document_id,
+        "title": document.get("title") if isinstance(document, dict) else None,
+        "last_modified": last_modified,
+        "contents": None,
+        "cached": False,
+        "error": None
+    }
+
+    if cache is not None:
+        result["contents"] = cache.get(document_id, last_modified)
+        if result["contents"] is not None:
+            result["cached"] = True
+            return result
+
+    try:
+        result["contents"] = client.get_document_contents(document_id)
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    if cache is not None and last_modified:
+        cache.put(document_id, last_modified, result["contents"])
+    return result
+
+
+def fetch_contents(documents, client=None, max_workers=8, cache=None):
+    """
+    Fetch the contents of many documents concurrently, yielding one result dict per
+    document in input order.
+
+    - `documents`: Document resources (e.g. straight from `LucidClient.search_documents`)
+      or bare document IDs; consumed lazily, so a search generator is paged as needed
+    - `client`: `LucidClient` to share (defaults to the process-wide client); its
+      "contents" limiter keeps requests within 100 per 5 seconds
+    - `max_workers`: Maximum number of downloads in flight
+    - `cache`: `ContentsCache`; documents whose `lastModified` matches the cached copy
+      aren't downloaded again (bare IDs carry no `lastModified` and are always fetched)
+
+    Each result has `document_id`, `title`, `last_modified`, `contents`, `cached` and `error`.
+    """
+    client = client or default_client()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        documents = iter(documents)
+        while True:
+            # Keep a bounded window in flight, so huge searches never queue up at once
+            for document in documents:
+                pending.append(executor.submit(_fetch_one, client, cache, document))
+                if len(pending) >= max_workers * 2:
+                    break
+            if not pending:
+                return
+            yield pending.popleft().result()
+
+
+### 🚀 Load Contents into a Diagram ###
+def _block_type(lucid_class):
+    """Builder shape type for a Lucid shape class, e.g. "ProcessBlock" -> "process"."""
+    name = re.sub(r"Block$", "", lucid_class or "")
+    return name[:1].lower() + name[1:]
+
+
+def _endpoint_style(endpoint):
+    style = str(endpoint.get("style") or "").lower()
+    if "many" in style or "more" in style:
+        return "many"
+    return "one" if "one" in style else "none"
+
+
+def _texts(item):
+    return [area.get("text", "") for area in item.get("textAreas") or () if area.get("text")]
+
+
+def load_document(contents, diagram=None, pages=None, layout=True):
+    """
+    Rebuild a fetched Document Content resource with the `script.py` builders, so it
+    can be inspected, edited, validated and re-imported.
+
+    - `diagram`: Diagram to build into (a new one with deterministic IDs by default)
+    - `pages`: Indexes of the pages to load (default: all, merged into one diagram)
+    - `layout`: Lay the diagram out with `auto_layout`; the contents carry no coordinates
+
+    Shape classes map to flowchart elements, containers and standard shapes by name
+    (e.g. "ProcessBlock" -> "process"), other shapes become rectangles and tables
+    become one-column tables of their text. Lines keep their label and crow's foot
+    endpoints. Returns the diagram and {Lucid item ID: builder ID}.
+    """
+    diagram = diagram if diagram is not None else Diagram(contents.get("title") or "Dynamic Diagram", deterministic_ids=True)
+    line_types = {styles: line_type for line_type, styles in LINE_ENDPOINT_STYLES.items()}
+    ids = {}
+
+    with metrics.span("load_document") as current:
+        selected = [page for i, page in enumerate(contents.get("pages", [])) if pages is None or i in pages]
+        for page in selected:
+            for shape in page.get("items", {}).get("shapes", []):
+                texts = _texts(shape)
+                name = texts[0] if texts else ""
+                shape_type = _block_type(shape.get("class"))
+                if shape_type in FLOWCHART_TYPES:
+                    ids[shape["id"]] = diagram.create_flowchart_element(name, flowchart_type=shape_type)
+                elif shape_type in CONTAINER_TYPES:
+                    ids[shape["id"]] = diagram.create_container(name, container_type=shape_type)
+                elif "table" in shape_type.lower() and texts:
+                    cell_data = [{"x": 0, "y": row, "text": text} for row, text in enumerate(texts)]
+                    ids[shape["id"]] = diagram.create_table(name, rows=len(texts), cols=1, cell_data=cell_data)
+                else:
+                    standard = shape_type if shape_type in STANDARD_SHAPE_TYPES - {"image"} else "rectangle"
+                    ids[shape["id"]] = diagram.create_standard_shape(standard, name, text=name)
+
+        skipped = 0
+        for page in selected:
+            for line in page.get("items", {}).get("lines", []):
+                ends = [ids.get(line.get(key, {}).get("connectedTo")) for key in ("endpoint1", "endpoint2")]
+                if None in ends:
+                    skipped += 1  # Dangling, or attached to another line
+                    continue
+                styles = (_endpoint_style(line["endpoint1"]), _endpoint_style(line["endpoint2"]))
+                texts = _texts(line)
+                ids[line["id"]] = diagram.create_line(
+                    ends[0], ends[1], texts[0] if texts else "", line_types.get(styles),
+                    start_side="auto", end_side="auto"
+                )
+
+        current.set(pages=len(selected), shapes=len(diagram.shapes), lines=len(diagram.lines), skipped_lines=skipped)
+
+    if layout:
+        diagram.auto_layout()
+    return diagram, ids
@@ -0,0 +1,92 @@
+import re
+import inspect
+import hashlib
+import script
+
+# Public builder API, in the order it is presented to the model
+BUILDER_FUNCTIONS = [
+    "create_flowchart_element",
+    "create_entity",
+    "create_line",
+    "create_container",
+    "create_shape",
+    "create_standard_shape",
+    "create_table",
+    "infer_relationships",
+    "auto_layout",
+    "generate_lucidchart_json",
+    "import_to_lucidchart"
+]
+
+ENUMS = {
+    "flowchart_type": "FLOWCHART_TYPES",
+    "container_type": "CONTAINER_TYPES",
+    "standard shape_type": "STANDARD_SHAPE_TYPES",
+    "line_type": "LINE_ENDPOINT_STYLES",
+    "start_side / end_side": "LINE_SIDES"
+}
+
+USAGE_EXAMPLE = '''\
+from script import *
+import webbrowser
+
+def main():
+    customer = create_flowchart_element("Customer", flowchart_type="terminator")
+    system = create_flowchart_element("Ordering System", flowchart_type="process")
+    create_line(customer, system, "Places Order", start_side="auto", end_side="auto")
+
+    create_entity("Users", [("UserID", True), ("Name", False)])
+    create_entity("Orders", [("OrderID", True), ("UserID", False)])
+    infer_relationships()  # Adds the Users → Orders line from the shared UserID
+
+    auto_layout()
+    document_id = import_to_lucidchart()
+    if document_id:
+        url = f"https://lucid.app/lucidchart/{document_id}/edit"
+        print(f"🌍 Open the Lucidchart DFD + ERD: {url}")
+        webbrowser.open(url)
+
+if __name__ == "__main__":
+    main()
+'''
+
+_manifests = {}  # script.py source hash -> manifest
+
+
+# Docstring lines that only enumerate values already listed under "Allowed values"
+ENUM_DOC_LINE = re.compile(r'^(Supported .* types:|- "\w+")$')
+
+
+def _docstring(module, name):
+    """The fuller `Diagram` method docstring when there is one, else the function's own."""
+    method = getattr(module.Diagram, name, None)
+    doc = (method and inspect.getdoc(method)) or inspect.getdoc(getattr(module, name)) or ""
+    lines = [line for line in doc.splitlines() if not ENUM_DOC_LINE.match(line)]
+    return "\n".join(lines).strip()
+
+
+def render_manifest(module=script):
+    """Describe the builder API from signatures, enum constants and docstrings only."""
+    parts = ["# `script.py` API (use `from script import *`)", "", "## Allowed values"]
+    for label, constant in ENUMS.items():
+        parts.append(f"- {label}: {', '.join(sorted(getattr(module, constant)))}")
+
+    parts += ["", "## Functions"]
+    for name in BUILDER_FUNCTIONS:
+        function = getattr(module, name)
+        parts.append(f"def {name}{inspect.signature(function)}")
+        doc = _docstring(module, name)
+        if doc:
+            parts.extend(f"    {line}" if line else "" for line in doc.splitlines())
+        parts.append("")
+
+    parts += ["## Example", USAGE_EXAMPLE]
+    return "\n".join(parts)
+
+
+def api_manifest(module=script):
+    """Return the API manifest, regenerated only when the module's source changes."""
+    source_hash = hashlib.sha256(inspect.getsource(module).encode("utf-8")).hexdigest()
+    if source_hash not in _manifests:
+        _manifests[source_hash] = render_manifest(module)
+    return _manifests[source_hash]
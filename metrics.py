@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import atexit
+import itertools
+import threading
+import contextvars
+from functools import wraps
+
+# Set either variable to record metrics from startup, without calling `enable` (e.g. for a saved `generated_main.py` run by hand)
+JSONL_ENV = "LUCID_METRICS_JSONL"
+PROMETHEUS_ENV = "LUCID_METRICS_PROMETHEUS"
+
+# Numeric span attributes that identify a result rather than add up, exported as labels
+LABEL_ATTRIBUTES = {"status"}
+
+PROMETHEUS_PREFIX = "lucid"
+
+
+class _State:
+    enabled = False
+    jsonl = None  # Open JSON Lines file, or None
+    prometheus_path = None
+
+
+_state = _State()
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Aggregates for the Prometheus export
+_durations = {}  # (span, labels) -> [sum of seconds, count]
+_errors = {}  # span -> count
+_totals = {}  # (span, attribute) -> sum
+
+
+### 🚀 Spans ###
+class Span:
+    """A timed operation. Attach sizes, counts and results to it with `set`."""
+    __slots__ = ("name", "id", "parent", "attributes", "start", "token")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.id = next(_ids)
+        parent = _current_span.get()
+        self.parent = parent.id if parent is not None else None
+        self.attributes = attributes
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.token = _current_span.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        _current_span.reset(self.token)
+        _record(self, seconds, exc)
+        return False
+
+
+class _NoopSpan:
+    """Stands in for `Span` while metrics are disabled."""
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, **attributes):
+    """
+    Time a block as a named span:
+
+        with metrics.span("import_to_lucidchart") as current:
+            ...
+            current.set(status=response.status_code, bytes=size)
+
+    Numeric attributes are summed per span for the Prometheus export. While metrics
+    are disabled this returns a shared no-op span.
+    """
+    if not _state.enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def timed(name):
+    """
+    Decorator adding each call's duration to the `name` span totals without writing a
+    JSON line per call, for hot functions such as the shape builders.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return function(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _aggregate(name, (), time.perf_counter() - start, {})
+        return wrapper
+    return decorator
+
+
+def enabled():
+    return _state.enabled
+
+
+### 🚀 Recording ###
+def _aggregate(name, labels, seconds, attributes, failed=False):
+    with _lock:
+        entry = _durations.setdefault((name, labels), [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+        if failed:
+            _errors[name] = _errors.get(name, 0) + 1
+        for key, value in attributes.items():
+            if key not in LABEL_ATTRIBUTES and isinstance(value, (int, float)) and not isinstance(value, bool):
+                _totals[name, key] = _totals.get((name, key), 0) + value
+
+
+def _record(current, seconds, exc):
+    labels = tuple(sorted((key, str(current.attributes[key])) for key in LABEL_ATTRIBUTES if key in current.attributes))
+    _aggregate(current.name, labels, seconds, current.attributes, failed=exc is not None)
+
+    if _state.jsonl is None:
+        return
+    event = {
+        "span": current.name,
+        "id": current.id,
+        "parent": current.parent,
+        "pid": os.getpid(),
+        "time": time.time(),
+        "seconds": round(seconds, 6),
+        **current.attributes
+    }
+    if exc is not None:
+        event["error"] = f"{type(exc).__name__}: {exc}"
+    line = json.dumps(event, default=str)
+    with _lock:
+        _state.jsonl.write(line + "\n")
+        _state.jsonl.flush()
+
+
+### 🚀 Export ###
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render_prometheus():
+    """Render the aggregated spans in the Prometheus text exposition format."""
+    with _lock:
+        durations, errors, totals = dict(_durations), dict(_errors), dict(_totals)
+
+    duration = f"{PROMETHEUS_PREFIX}_span_duration_seconds"
+    lines = [f"# HELP {duration} Time spent in each span.", f"# TYPE {duration} summary"]
+    for (name, labels), (seconds, count) in sorted(durations.items()):
+        label_text = _labels((("span", name),) + labels)
+        lines.append(f"{duration}_sum{label_text} {seconds:.6f}")
+        lines.append(f"{duration}_count{label_text} {count}")
+
+    failures = f"{PROMETHEUS_PREFIX}_span_errors_total"
+    lines += [f"# HELP {failures} Spans that ended with an exception.", f"# TYPE {failures} counter"]
+    for name, count in sorted(errors.items()):
+        lines.append(f"{failures}{_labels([('span', name)])} {count}")
+
+    for attribute in sorted({attribute for _, attribute in totals}):
+        metric = f"{PROMETHEUS_PREFIX}_{attribute}_total"
+        lines += [f"# HELP {metric} Sum of the `{attribute}` span attribute.", f"# TYPE {metric} counter"]
+        for (name, key), value in sorted(totals.items()):
+            if key == attribute:
+                lines.append(f"{metric}{_labels([('span', name)])} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path=None):
+    """Write `render_prometheus()` to `path` (default: the configured file), atomically."""
+    path = path or _state.prometheus_path
+    if not path:
+        return
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        f.write(render_prometheus())
+    os.replace(temp_path, path)  # Scrapers never see a half-written file
+
+
+### 🚀 Configuration ###
+def enable(jsonl_path=None, prometheus_path=None):
+    """
+    Start recording spans.
+
+    - `jsonl_path`: Append one JSON line per span to this file
+    - `prometheus_path`: Write aggregated metrics here on `flush()` and at exit
+    """
+    disable()
+    with _lock:
+        _state.jsonl = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+        _state.prometheus_path = prometheus_path
+        _state.enabled = True
+
+
+def flush():
+    """Write the Prometheus file now."""
+    if _state.enabled:
+        write_prometheus()
+
+
+def disable():
+    """Stop recording, write the Prometheus file and close the JSON Lines file."""
+    flush()
+    with _lock:
+        _state.enabled = False
+        if _state.jsonl is not None:
+            _state.jsonl.close()
+            _state.jsonl = None
+
+
+def reset():
+    """Drop the aggregated metrics."""
+    with _lock:
+        _durations.clear()
+        _errors.clear()
+        _totals.clear()
+
+
+atexit.register(disable)
+
+if os.getenv(JSONL_ENV) or os.getenv(PROMETHEUS_ENV):
+    enable(os.getenv(JSONL_ENV), os.getenv(PROMETHEUS_ENV))
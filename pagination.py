@@ -0,0 +1,380 @@
+import bisect
+import math
+from collections import deque
+from script import is_container, fill_style, stroke_style, _materialize
+
+# Top-left corner of each page's content
+PAGE_ORIGIN = (100, 100)
+
+# Stub shapes standing in for shapes on other pages, in a column right of the page
+STUB_WIDTH = 240
+STUB_HEIGHT = 60
+STUB_GAP = 20
+STUB_MARGIN = 120
+
+# Greedy boundary-refinement passes after each min-cut bisection
+REFINE_PASSES = 4
+
+
+### 🚀 Shape Groups ###
+def _label(shape):
+    """A shape's visible name: its text, or the title cell of a table."""
+    cells = shape.get("cells")
+    if cells is not None and len(cells):
+        text = cells.text[0] if hasattr(cells, "text") else cells[0].get("text")
+    else:
+        text = shape.get("text")
+    return text if isinstance(text, str) and text else shape["id"]
+
+
+def _box(shape):
+    bb = shape["boundingBox"]
+    return bb["x"], bb["y"], bb["x"] + bb["w"], bb["y"] + bb["h"]
+
+
+def _containers(shapes):
+    """
+    Map each shape index to the index of the outermost container around its center,
+    and each swim lane container's members to their lane number.
+    """
+    containers = sorted(
+        (i for i, shape in enumerate(shapes) if is_container(shape)),
+        key=lambda i: -shapes[i]["boundingBox"]["w"] * shapes[i]["boundingBox"]["h"]
+    )
+    owner, lane = {}, {}
+    if not containers:
+        return owner, lane
+
+    for i, shape in enumerate(shapes):
+        x1, y1, x2, y2 = _box(shape)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        for c in containers:  # Largest first, so the first hit is the outermost
+            if c == i:
+                continue
+            left, top, right, bottom = _box(shapes[c])
+            if left <= cx <= right and top <= cy <= bottom:
+                owner[i] = c
+                break
+
+    for c in containers:
+        lanes = shapes[c].get("lanes")
+        if shapes[c]["type"] != "swimLanes" or not lanes:
+            continue
+        left, top, _, _ = _box(shapes[c])
+        vertical = shapes[c].get("vertical", False)
+        edges = list(_cumulative(item.get("width", 0) for item in lanes))
+        for i, outer in owner.items():
+            if outer == c:
+                x1, y1, x2, y2 = _box(shapes[i])
+                offset = (x1 + x2) / 2 - left if vertical else (y1 + y2) / 2 - top
+                lane[i] = min(bisect.bisect_right(edges, offset), len(lanes) - 1)
+    return owner, lane
+
+
+def _cumulative(values):
+    total = 0
+    for value in values:
+        total += value
+        yield total
+
+
+### 🚀 Split Strategies ###
+# Each takes a piece (label, [shape index, ...]) and returns its parts the same way;
+# a single part means the strategy doesn't apply.
+def _by_kind(graph, label, members):
+    """Data flows and entity tables (ERD) on separate pages."""
+    shapes, owner = graph["shapes"], graph["owner"]
+    tables = {i for i in members if shapes[i]["type"] == "table"}
+    for c in {owner[i] for i in tables if i in owner}:  # Containers holding only tables go with them
+        if all(shapes[i]["type"] == "table" for i in members if owner.get(i) == c):
+            tables.add(c)
+    parts = [
+        ("Data Flows", [i for i in members if i not in tables]),
+        ("Entities", [i for i in members if i in tables])
+    ]
+    return [part for part in parts if part[1]]
+
+
+def _by_container(graph, label, members):
+    """Each top-level container with its contents, plus the uncontained shapes."""
+    shapes, owner = graph["shapes"], graph["owner"]
+    groups = {}
+    for i in members:
+        c = owner.get(i, i if is_container(shapes[i]) else None)
+        groups.setdefault(c, []).append(i)
+    return [(_label(shapes[c]) if c is not None else label, group) for c, group in groups.items()]
+
+
+def _by_lane(graph, label, members):
+    """The lanes of a swim lane container; the container itself goes with its first lane."""
+    shapes, lane = graph["shapes"], graph["lane"]
+    groups = {}
+    for i in members:
+        groups.setdefault(lane.get(i, 0), []).append(i)
+    parts = []
+    for number, group in sorted(groups.items()):
+        container = next((i for i in group if shapes[i]["type"] == "swimLanes"), None)
+        container = container if container is not None else graph["owner"].get(group[0])
+        lanes = shapes[container].get("lanes", []) if container is not None else []
+        title = lanes[number].get("title") if number < len(lanes) else None
+        parts.append((f"{label}: {title}" if title else label, group))
+    return parts
+
+
+def _by_component(graph, label, members):
+    """Connected components of the lines between the members."""
+    inside = set(members)
+    seen, parts = set(), []
+    for start in members:
+        if start in seen:
+            continue
+        seen.add(start)
+        component, queue = [], deque([start])
+        while queue:
+            node = queue.popleft()
+            component.append(node)
+            for neighbour in graph["adjacency"][node]:
+                if neighbour in inside and neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        parts.append((label, sorted(component)))
+    return parts
+
+
+def _bfs_order(adjacency, members, inside):
+    """Members in breadth-first order from a far-away (pseudo-peripheral) node."""
+    def sweep(start):
+        order, seen, queue = [], {start}, deque([start])
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for neighbour in adjacency[node]:
+                if neighbour in inside and neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        return order
+
+    order = sweep(sweep(members[0])[-1])
+    if len(order) < len(members):  # Disconnected leftovers keep their order
+        reached = set(order)
+        order += [i for i in members if i not in reached]
+    return order
+
+
+def _by_min_cut(graph, label, members):
+    """
+    Bisect into two sides sized for whole pages, cutting few lines: split the
+    breadth-first order, then move boundary shapes to the side holding most of their
+    neighbours (Fiduccia–Mattheyses style) while both sides stay within their budget.
+    """
+    adjacency, budget = graph["adjacency"], graph["budget"]
+    inside = set(members)
+    pages = math.ceil(len(members) / budget)
+    left_pages = (pages + 1) // 2
+    capacity = (left_pages * budget, (pages - left_pages) * budget)
+
+    order = _bfs_order(adjacency, members, inside)
+    cut = min(max(round(len(members) * left_pages / pages), 1), len(members) - 1)
+    side = {node: 0 if position < cut else 1 for position, node in enumerate(order)}
+    sizes = [cut, len(members) - cut]
+
+    for _ in range(REFINE_PASSES):
+        moved = False
+        for node in order:
+            here = side[node]
+            there = 1 - here
+            if sizes[there] >= capacity[there] or sizes[here] <= 1:
+                continue
+            neighbours = [side[n] for n in adjacency[node] if n in inside]
+            if neighbours.count(there) > neighbours.count(here):
+                side[node] = there
+                sizes[here] -= 1
+                sizes[there] += 1
+                moved = True
+        if not moved:
+            break
+
+    return [
+        (label, [i for i in members if side[i] == 0]),
+        (label, [i for i in members if side[i] == 1])
+    ]
+
+
+STRATEGIES = (_by_kind, _by_container, _by_lane, _by_component, _by_min_cut)
+
+
+### 🚀 Partitioning ###
+def _pack(parts, budget, label, fill_oversized=False):
+    """
+    Combine parts onto as few pages as possible (best fit, largest first). A part
+    larger than `budget` needs several pages; with `fill_oversized`, small parts may
+    fill the room left on its last one. Returns (label, members) pairs; oversized
+    ones still need splitting.
+    """
+    pages = []
+    free = []  # Sorted (room left, page index) of pages that still have room
+    for part_label, members in sorted(parts, key=lambda part: -len(part[1])):
+        position = bisect.bisect_left(free, (len(members), -1))
+        if len(members) <= budget and position < len(free):
+            room, page = free.pop(position)
+            pages[page][0].append(part_label)
+            pages[page][1].extend(members)
+        else:
+            room, page = math.ceil(len(members) / budget) * budget, len(pages)
+            pages.append(([part_label], list(members)))
+        if room > len(members) and (len(members) <= budget or fill_oversized):
+            bisect.insort(free, (room - len(members), page))
+
+    return [(labels[0] if len(set(labels)) == 1 else label, sorted(members)) for labels, members in pages]
+
+
+def _split(graph, label, members, strategies):
+    if len(members) <= graph["budget"]:
+        return [(label, members)]
+    for position, strategy in enumerate(strategies):
+        # Disconnected leftovers may share an oversized component's pages; containers and lanes stay apart
+        packed = _pack(strategy(graph, label, members), graph["budget"], label, fill_oversized=strategy is _by_component)
+        if len(packed) > 1:  # Otherwise the parts all fit back together; try the next strategy
+            pages = []
+            for part_label, part in packed:
+                pages += _split(graph, part_label, part, strategies[position:])
+            return pages
+    return [(label, members)]
+
+
+def _stub_count(adjacency, members):
+    """Stubs a page of `members` needs: one per shape on another page that a line reaches."""
+    inside = set(members)
+    return len({neighbour for i in members for neighbour in adjacency[i]} - inside)
+
+
+def _fit(graph, pending, max_shapes):
+    """Split the pages whose stubs don't fit in `max_shapes` again, shrinking the budget by their overflow."""
+    pages = []
+    while pending:
+        label, members = pending.pop()
+        stubs = _stub_count(graph["adjacency"], members)
+        if len(members) + stubs <= max_shapes or len(members) == 1:
+            pages.append((label, members))
+            continue
+        budget = max(len(members) * max_shapes // (len(members) + stubs), 1)
+        pending += _split({**graph, "budget": budget}, label, members, STRATEGIES)
+    return pages
+
+
+def partition(shapes, lines, max_shapes):
+    """
+    Group shape indexes into pages of at most `max_shapes` shapes, counting the stubs
+    `paginate` adds for lines to other pages. Oversized groups are split, in order,
+    into data flows vs entities, top-level containers, swim lanes, connected components
+    and finally min-cut bisections; a page whose stubs don't fit is split again with a
+    smaller budget. Only a single shape with more neighbours on other pages than the
+    budget allows can overflow. Returns [(label, [index, ...]), ...] in the order of
+    each page's first shape.
+    """
+    index = {shape["id"]: i for i, shape in enumerate(shapes)}
+    adjacency = [[] for _ in shapes]
+    for line in lines:
+        a, b = index.get(line["endpoint1"].get("shapeId")), index.get(line["endpoint2"].get("shapeId"))
+        if a is not None and b is not None and a != b:
+            adjacency[a].append(b)
+            adjacency[b].append(a)
+
+    owner, lane = _containers(shapes)
+    graph = {"shapes": shapes, "adjacency": adjacency, "owner": owner, "lane": lane, "budget": max_shapes}
+    members = list(range(len(shapes)))
+    pages = _fit(graph, _split(graph, None, members, STRATEGIES), max_shapes)
+    totals = [(len(part), _stub_count(adjacency, part)) for _, part in pages]
+    size, stubs = sum(size for size, _ in totals), sum(stubs for _, stubs in totals)
+    if stubs:
+        # ✅ Also try reserving room for the average page's stubs up front, and keep the fewer pages
+        budget = max(max_shapes * size // (size + stubs), 1)
+        reserved = _fit(graph, _split({**graph, "budget": budget}, None, members, STRATEGIES), max_shapes)
+        pages = min(pages, reserved, key=len)
+    return sorted(pages, key=lambda page: page[1][0])
+
+
+### 🚀 Pages ###
+def _names(labels):
+    """Page names from their labels, numbering repeated labels ("" for an unlabelled page)."""
+    counts, seen, names = {}, {}, []
+    for label in labels:
+        counts[label] = counts.get(label, 0) + 1
+    for label in labels:
+        seen[label] = seen.get(label, 0) + 1
+        if counts[label] == 1:
+            names.append(label or "")
+        else:
+            names.append(f"{label} ({seen[label]})" if label else f"Part {seen[label]}")
+    return names
+
+
+def _stub(stub_id, text, x, y, style):
+    return {
+        "id": stub_id,
+        "type": "rectangle",
+        "boundingBox": {"x": x, "y": y, "w": STUB_WIDTH, "h": STUB_HEIGHT},
+        "style": style,
+        "text": text
+    }
+
+
+def paginate(shapes, lines, title, max_shapes, styles=None):
+    """
+    Split shapes and lines into Lucid pages of at most `max_shapes` shapes, stubs
+    included (see `partition`). Each page's content is moved to `PAGE_ORIGIN`. A line between shapes
+    on different pages appears on both: on each page its far end connects to a
+    dashed stub shape naming the shape and the page it is on. Table cells share styles
+    through the `styles` registry (see `script.FrozenStyle`).
+    """
+    pages = partition(shapes, lines, max_shapes)
+    names = _names([label for label, _ in pages])
+
+    page_of, moved = {}, {}
+    content = []
+    for number, (_, members) in enumerate(pages):
+        page_shapes = [shapes[i] for i in members]
+        dx = PAGE_ORIGIN[0] - min(shape["boundingBox"]["x"] for shape in page_shapes)
+        dy = PAGE_ORIGIN[1] - min(shape["boundingBox"]["y"] for shape in page_shapes)
+        placed = []
+        for shape in page_shapes:
+            if dx or dy:
+                bb = shape["boundingBox"]
+                shape = {**shape, "boundingBox": {**bb, "x": bb["x"] + dx, "y": bb["y"] + dy}}
+            page_of[shape["id"]] = number
+            moved[shape["id"]] = shape
+            placed.append(_materialize(shape, styles))
+        content.append({"shapes": placed, "lines": [], "stubs": {}})
+
+    for line in lines:
+        ends = (line["endpoint1"].get("shapeId"), line["endpoint2"].get("shapeId"))
+        first, second = page_of.get(ends[0]), page_of.get(ends[1])
+        if first is None or second is None or first == second:
+            content[first if first is not None else second or 0]["lines"].append(line)
+            continue
+
+        # Keep the line on both pages, each with its far end on a stub
+        for number, here, there, key, suffix in ((first, ends[0], ends[1], "endpoint2", ""), (second, ends[1], ends[0], "endpoint1", "_ref")):
+            stubs = content[number]["stubs"]
+            if there not in stubs:
+                other = page_of[there]
+                where = f"page {other + 1}: {names[other]}" if names[other] else f"page {other + 1}"
+                stubs[there] = (f"stub{number + 1}_{there}", f"{_label(moved[there])} ({where})", here)
+            endpoint = {**line[key], "shapeId": stubs[there][0], "position": {"x": 0, "y": 0.5}}
+            content[number]["lines"].append({**line, "id": line["id"] + suffix, key: endpoint})
+
+    stub_style = {"fill": fill_style("#F5F5F5"), "stroke": stroke_style(style="dashed")}  # Shared by every stub
+    result = []
+    for number, page in enumerate(content):
+        shapes_on_page = page["shapes"]
+        if page["stubs"]:
+            right = max(shape["boundingBox"]["x"] + shape["boundingBox"]["w"] for shape in shapes_on_page) + STUB_MARGIN
+            bottom = None
+            for stub_id, text, near in sorted(page["stubs"].values(), key=lambda stub: moved[stub[2]]["boundingBox"]["y"]):
+                y = moved[near]["boundingBox"]["y"]
+                y = y if bottom is None else max(y, bottom + STUB_GAP)  # Stack stubs without overlaps
+                shapes_on_page.append(_stub(stub_id, text, right, y, stub_style))
+                bottom = y + STUB_HEIGHT
+        page_title = f"{title}: {names[number]}" if names[number] else title
+        result.append({"id": f"page{number + 1}", "title": page_title, "shapes": shapes_on_page, "lines": page["lines"]})
+    return result
@@ -0,0 +1,99 @@
+import re
+import metrics
+
+
+def normalize(name):
+    """Lowercase alphanumerics only, so `user_id`, `UserID` and `User ID` compare equal."""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def name_variants(name):
+    """Singular and plural forms of an entity name, normalized."""
+    name = normalize(name)
+    variants = {name}
+    if name.endswith("ies"):
+        variants.add(name[:-3] + "y")
+    elif name.endswith(("ses", "xes", "ches", "shes")):
+        variants.add(name[:-2])
+    elif name.endswith("s") and not name.endswith("ss"):
+        variants.add(name[:-1])
+    elif name.endswith("y") and name[-2:-1] not in "aeiou":
+        variants.add(name[:-1] + "ies")
+    elif name.endswith(("s", "x", "ch", "sh")):
+        variants.add(name + "es")
+    else:
+        variants.add(name + "s")
+    return variants
+
+
+def primary_key_index(entities):
+    """
+    Map each attribute name a foreign key may use to the entities it identifies.
+
+    Only entities with a single primary key are indexed, under the key's own name
+    (unless it is a bare `id`) and `<Entity>ID` for the singular and plural entity name.
+    """
+    index = {}
+    for entity_id, entity in entities.items():
+        keys = [attribute[0] for attribute in entity["attributes"] if attribute[1]]
+        if len(keys) != 1:
+            continue
+        names = {normalize(keys[0])} - {"id"}
+        names.update(f"{variant}id" for variant in name_variants(entity["name"]))
+        for name in names:
+            index.setdefault(name, []).append(entity_id)
+    return index
+
+
+def find_relationships(entities, connected=()):
+    """
+    Return the relationships implied by foreign-key-looking attributes, in entity order:
+    [{"parent": entity ID, "child": entity ID, "attribute": ..., "line_type": ...}, ...].
+
+    An attribute matching exactly one other entity's primary key (see `primary_key_index`)
+    makes that entity the "one" side. The child's side is "many", or "one" when the
+    attribute is the child's only primary key. Pairs in `connected` (frozensets of two
+    entity IDs) and ambiguous matches are skipped. Runs in time linear in the attributes.
+    """
+    index = primary_key_index(entities)
+    connected = set(connected)
+    relationships = []
+
+    for child_id, entity in entities.items():
+        keys = [attribute[0] for attribute in entity["attributes"] if attribute[1]]
+        for attribute in entity["attributes"]:
+            parents = [parent for parent in index.get(normalize(attribute[0]), ()) if parent != child_id]
+            if len(parents) != 1:
+                continue  # No match, or ambiguous
+
+            pair = frozenset((parents[0], child_id))
+            if pair in connected:
+                continue
+            connected.add(pair)
+
+            relationships.append({
+                "parent": parents[0],
+                "child": child_id,
+                "attribute": attribute[0],
+                "line_type": "one-to-one" if keys == [attribute[0]] else "one-to-many"
+            })
+    return relationships
+
+
+def infer_relationships(diagram):
+    """Add crow's foot lines for the relationships `find_relationships` finds among the diagram's entities."""
+    with diagram._lock:
+        entities = dict(diagram.entities)
+        connected = {
+            frozenset((line["endpoint1"].get("shapeId"), line["endpoint2"].get("shapeId"))) for line in diagram.lines
+        }
+
+    with metrics.span("infer_relationships", entities=len(entities)) as current:
+        relationships = find_relationships(entities, connected)
+        for relationship in relationships:
+            relationship["line_id"] = diagram.create_line(
+                relationship["parent"], relationship["child"], relationship["attribute"], relationship["line_type"],
+                start_side="auto", end_side="auto"
+            )
+        current.set(relationships=len(relationships))
+    return relationships
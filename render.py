@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import argparse
+from xml.sax.saxutils import escape
+from script import CONTAINER_TYPES
+
+# Space around the drawing
+MARGIN = 40
+
+FONT = 'font-family="Helvetica, Arial, sans-serif"'
+FONT_SIZE = 14
+
+STICKY_NOTE_COLOR = "#FFF59D"
+SWIM_LANE_HEADER = 40  # Width of each lane's title strip
+
+# Crow's foot endpoint markers, drawn pointing into the shape at (0, 0)
+MARKERS = {
+    "one": "M -10 -7 L -10 7",
+    "many": "M -14 0 L 0 -8 M -14 0 L 0 8 M -14 0 L 0 0",
+    "arrow": "M -12 -6 L 0 0 L -12 6"
+}
+
+
+### 🚀 Helpers ###
+def _style(shape, fill_default="#FFFFFF"):
+    """SVG fill and stroke attributes for a Lucid shape style."""
+    style = shape.get("style") or {}
+    fill = (style.get("fill") or {}).get("color", fill_default)
+    return f'fill="{fill}" {_stroke(style.get("stroke"))}'
+
+
+def _stroke(stroke):
+    """SVG stroke attributes for a Lucid stroke dict (no stroke if None)."""
+    if stroke is None:
+        return 'stroke="none"'
+    attributes = f'stroke="{stroke.get("color", "#000000")}" stroke-width="{stroke.get("width", 1)}"'
+    if stroke.get("style") == "dashed":
+        attributes += ' stroke-dasharray="6 4"'
+    elif stroke.get("style") == "dotted":
+        attributes += ' stroke-dasharray="2 3"'
+    return attributes
+
+
+def _text(text, cx, cy, anchor="middle", size=FONT_SIZE, weight=None):
+    """Centered (or `anchor`ed) text, one `tspan` per line."""
+    if not isinstance(text, str) or not text:
+        return ""
+    lines = text.split("\n")
+    bold = f' font-weight="{weight}"' if weight else ""
+    head = f'<text x="{cx:g}" y="{cy - (len(lines) - 1) * size * 0.6:g}" {FONT} font-size="{size}" text-anchor="{anchor}" dominant-baseline="middle"{bold}>'
+    if len(lines) == 1:
+        return f"{head}{escape(text)}</text>"
+    spans = "".join(
+        f'<tspan x="{cx:g}" dy="{0 if i == 0 else size * 1.2:g}">{escape(line)}</tspan>' for i, line in enumerate(lines)
+    )
+    return f"{head}{spans}</text>"
+
+
+def _polygon(points, attributes):
+    return f'<polygon points="{" ".join(f"{x:g},{y:g}" for x, y in points)}" {attributes}/>'
+
+
+### 🚀 Shapes ###
+def _flowchart_outline(kind, x, y, w, h, attributes):
+    """The outline of a flowchart element (or standard rectangle) as an SVG element."""
+    if kind == "terminator":
+        return f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" rx="{h / 2:g}" {attributes}/>'
+    if kind == "decision":
+        return _polygon(((x + w / 2, y), (x + w, y + h / 2), (x + w / 2, y + h), (x, y + h / 2)), attributes)
+    if kind == "data":
+        return _polygon(((x + w * 0.15, y), (x + w, y), (x + w * 0.85, y + h), (x, y + h)), attributes)
+    if kind == "manualInput":
+        return _polygon(((x, y + h * 0.25), (x + w, y), (x + w, y + h), (x, y + h)), attributes)
+    if kind == "manualOperation":
+        return _polygon(((x, y), (x + w, y), (x + w * 0.85, y + h), (x + w * 0.15, y + h)), attributes)
+    if kind == "merge":
+        return _polygon(((x, y), (x + w, y), (x + w / 2, y + h)), attributes)
+    if kind == "connector":
+        return f'<ellipse cx="{x + w / 2:g}" cy="{y + h / 2:g}" rx="{w / 2:g}" ry="{h / 2:g}" {attributes}/>'
+    if kind == "document":
+        d = f"M {x:g} {y:g} H {x + w:g} V {y + h * 0.85:g} Q {x + w * 0.75:g} {y + h * 1.05:g} {x + w / 2:g} {y + h * 0.85:g} T {x:g} {y + h * 0.85:g} Z"
+        return f'<path d="{d}" {attributes}/>'
+    if kind == "database":
+        e = min(h * 0.15, 20)
+        d = (f"M {x:g} {y + e:g} A {w / 2:g} {e:g} 0 0 1 {x + w:g} {y + e:g} V {y + h - e:g} "
+             f"A {w / 2:g} {e:g} 0 0 1 {x:g} {y + h - e:g} Z M {x:g} {y + e:g} A {w / 2:g} {e:g} 0 0 0 {x + w:g} {y + e:g}")
+        return f'<path d="{d}" {attributes}/>'
+    if kind == "storedData":
+        d = f"M {x + w * 0.1:g} {y:g} H {x + w:g} Q {x + w * 0.9:g} {y + h / 2:g} {x + w:g} {y + h:g} H {x + w * 0.1:g} Q {x:g} {y + h / 2:g} {x + w * 0.1:g} {y:g} Z"
+        return f'<path d="{d}" {attributes}/>'
+    if kind == "display":
+        d = f"M {x:g} {y + h / 2:g} L {x + w * 0.15:g} {y:g} H {x + w * 0.85:g} Q {x + w:g} {y + h / 2:g} {x + w * 0.85:g} {y + h:g} H {x + w * 0.15:g} Z"
+        return f'<path d="{d}" {attributes}/>'
+    if kind == "delay":
+        d = f"M {x:g} {y:g} H {x + w / 2:g} A {w / 2:g} {h / 2:g} 0 0 1 {x + w / 2:g} {y + h:g} H {x:g} Z"
+        return f'<path d="{d}" {attributes}/>'
+    if kind == "braceNote":
+        return f'<path d="M {x + 12:g} {y:g} H {x:g} V {y + h:g} H {x + 12:g}" fill="none" stroke="#000000"/>'
+    return f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" {attributes}/>'
+
+
+def _container(shape, x, y, w, h, out):
+    kind = shape["type"]
+    attributes = _style(shape, "#D3D3D3")
+    if kind == "swimLanes":
+        out.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" fill="#FFFFFF" stroke="#000000"/>')
+        title = (shape.get("titleBar") or {}).get("height", 0)
+        if title:
+            out.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{title:g}" {attributes}/>')
+            out.append(_text(shape.get("text"), x + w / 2, y + title / 2, weight="bold"))
+        vertical = shape.get("vertical", False)
+        offset = 0
+        for lane in shape.get("lanes") or ():
+            size = lane.get("width", 0)
+            if vertical:  # Lanes side by side, headers on top
+                lx, ly, lw, lh = x + offset, y + title, size, h - title
+                header = (lx, ly, lw, SWIM_LANE_HEADER)
+            else:  # Lanes stacked, headers on the left
+                lx, ly, lw, lh = x, y + title + offset, w, size
+                header = (lx, ly, SWIM_LANE_HEADER, lh)
+            out.append(f'<rect x="{lx:g}" y="{ly:g}" width="{lw:g}" height="{lh:g}" fill="{lane.get("laneFill", "#F2F3F5")}" stroke="#000000"/>')
+            out.append(f'<rect x="{header[0]:g}" y="{header[1]:g}" width="{header[2]:g}" height="{header[3]:g}" fill="{lane.get("headerFill", "#635DFF")}" stroke="#000000"/>')
+            out.append(_text(lane.get("title"), header[0] + header[2] / 2, header[1] + header[3] / 2, size=12))
+            offset += size
+        return
+
+    if kind == "circleContainer":
+        out.append(f'<ellipse cx="{x + w / 2:g}" cy="{y + h / 2:g}" rx="{w / 2:g}" ry="{h / 2:g}" {attributes}/>')
+    elif kind == "diamondContainer":
+        out.append(_polygon(((x + w / 2, y), (x + w, y + h / 2), (x + w / 2, y + h), (x, y + h / 2)), attributes))
+    elif kind in ("braceContainer", "bracketContainer"):
+        out.append(f'<path d="M {x + 15:g} {y:g} H {x:g} V {y + h:g} H {x + 15:g} M {x + w - 15:g} {y:g} H {x + w:g} V {y + h:g} H {x + w - 15:g}" fill="none" stroke="#000000"/>')
+    else:
+        radius = {"roundedRectangleContainer": 12, "pillContainer": min(w, h) / 2}.get(kind, 0)
+        out.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" rx="{radius:g}" {attributes}/>')
+    out.append(_text(shape.get("text"), x + w / 2, y + 20, weight="bold"))
+
+
+def _table(shape, x, y, w, h, out):
+    rows, cols = shape.get("rowCount") or 1, shape.get("colCount") or 1
+    cell_w, cell_h = w / cols, h / rows
+    out.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" {_style(shape)}/>')
+    for cell in shape.get("cells") or ():
+        cx, cy = x + cell["xPosition"] * cell_w, y + cell["yPosition"] * cell_h
+        cw, ch = cell_w * (1 + cell.get("mergeCellsRight", 0)), cell_h * (1 + cell.get("mergeCellsDown", 0))
+        fill = ((cell.get("style") or {}).get("fill") or {}).get("color", "#FFFFFF")
+        out.append(f'<rect x="{cx:g}" y="{cy:g}" width="{cw:g}" height="{ch:g}" fill="{fill}" stroke="#000000"/>')
+        out.append(_text(cell.get("text"), cx + cw / 2, cy + ch / 2, size=12))
+
+
+def _shape(shape, out):
+    bb = shape["boundingBox"]
+    x, y, w, h = bb["x"], bb["y"], bb["w"], bb["h"]
+    kind = shape["type"]
+
+    if kind == "table":
+        _table(shape, x, y, w, h, out)
+        return
+    if kind == "text":
+        out.append(_text(shape.get("text"), x + w / 2, y + h / 2))
+        return
+    if kind == "hotspot":
+        out.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" fill="none" stroke="#808080" stroke-dasharray="6 4"/>')
+        return
+    if kind == "image":
+        url = escape((shape.get("image") or {}).get("url", ""), {'"': "&quot;"})
+        out.append(f'<image href="{url}" x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" preserveAspectRatio="xMidYMid meet"/>')
+        out.append(f'<rect x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" fill="none" {_stroke(shape.get("stroke"))}/>')
+        return
+
+    attributes = _style(shape, STICKY_NOTE_COLOR if kind == "stickyNote" else "#FFFFFF")
+    out.append(_flowchart_outline(kind, x, y, w, h, attributes))
+    out.append(_text(shape.get("text"), x + w / 2, y + h / 2))
+
+
+### 🚀 Lines ###
+def _line(line, boxes, out):
+    points = []
+    for key in ("endpoint1", "endpoint2"):
+        endpoint = line.get(key) or {}
+        box = boxes.get(endpoint.get("shapeId"))
+        if box is None:
+            return  # Dangling line
+        position = endpoint.get("position") or {"x": 0.5, "y": 0.5}
+        points.append((box[0] + box[2] * position["x"], box[1] + box[3] * position["y"]))
+
+    (x1, y1), (x2, y2) = points
+    markers = ""
+    for attribute, key in (("marker-start", "endpoint1"), ("marker-end", "endpoint2")):
+        style = str(line[key].get("style", "none")).lower()
+        if style in MARKERS:
+            markers += f' {attribute}="url(#{style})"'
+    out.append(f'<line x1="{x1:g}" y1="{y1:g}" x2="{x2:g}" y2="{y2:g}" {_stroke(line.get("stroke") or {})}{markers}/>')
+
+    for label in line.get("text") or ():
+        t = label.get("position", 0.5)
+        lx, ly = x1 + (x2 - x1) * t, y1 + (y2 - y1) * t
+        ly += -10 if label.get("side", "top") == "top" else 10 if label.get("side") == "bottom" else 0
+        out.append(_text(label.get("text"), lx, ly, size=12))
+
+
+### 🚀 Render ###
+def render_svg(document, page=0):
+    """
+    Render one page of a Lucid standard import document (`generate_lucidchart_json`
+    output) as an SVG string: flowchart elements, containers and swim lanes, standard
+    shapes, tables with their cells, and lines with crow's foot endpoints and labels.
+    """
+    content = document["pages"][page]
+    shapes, lines = content.get("shapes", []), content.get("lines", [])
+
+    boxes = {}
+    left = top = float("inf")
+    right = bottom = float("-inf")
+    for shape in shapes:
+        bb = shape["boundingBox"]
+        boxes[shape["id"]] = (bb["x"], bb["y"], bb["w"], bb["h"])
+        left, top = min(left, bb["x"]), min(top, bb["y"])
+        right, bottom = max(right, bb["x"] + bb["w"]), max(bottom, bb["y"] + bb["h"])
+    if not shapes:
+        left = top = right = bottom = 0
+
+    width, height = right - left + 2 * MARGIN, bottom - top + 2 * MARGIN
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{left - MARGIN:g} {top - MARGIN:g} {width:g} {height:g}" '
+        f'width="{width:g}" height="{height:g}">',
+        f"<title>{escape(content.get('title', ''))}</title>",
+        "<defs>" + "".join(
+            f'<marker id="{name}" orient="auto-start-reverse" markerUnits="userSpaceOnUse" markerWidth="1" markerHeight="1" overflow="visible">'
+            f'<path d="{path}" fill="none" stroke="#000000" stroke-width="1.5"/></marker>'
+            for name, path in MARKERS.items()
+        ) + "</defs>",
+        f'<rect x="{left - MARGIN:g}" y="{top - MARGIN:g}" width="{width:g}" height="{height:g}" fill="#FFFFFF"/>'
+    ]
+
+    # ✅ Containers underneath, then shapes, then lines on top
+    for shape in shapes:
+        if shape["type"] in CONTAINER_TYPES:
+            bb = shape["boundingBox"]
+            _container(shape, bb["x"], bb["y"], bb["w"], bb["h"], out)
+    for shape in shapes:
+        if shape["type"] not in CONTAINER_TYPES:
+            _shape(shape, out)
+    for line in lines:
+        _line(line, boxes, out)
+
+    out.append("</svg>")
+    return "\n".join(out)
+
+
+def render_png(document, path, page=0):
+    """Render a page to a PNG file. Needs the optional `cairosvg` package."""
+    try:
+        import cairosvg
+    except ImportError as e:
+        raise RuntimeError("❌ PNG output needs `cairosvg` (pip install cairosvg); SVG output works without it.") from e
+    cairosvg.svg2png(bytestring=render_svg(document, page).encode("utf-8"), write_to=path)
+
+
+def save_preview(document, path="preview.svg", page=0):
+    """Write a page as SVG, or PNG when `path` ends in `.png`."""
+    if path.lower().endswith(".png"):
+        render_png(document, path, page)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(render_svg(document, page))
+
+
+### 🚀 Preview Sources ###
+def load_document(path):
+    """
+    Lucid JSON for a preview source: a document JSON file (`document.json`), or a
+    diagram spec (`generated_spec.json`), which is built and laid out first.
+    """
+    from spec import build_from_spec
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "pages" in data:
+        return data
+    diagram, _ = build_from_spec(data)
+    return diagram.to_json()
+
+
+def generate_document(problem_path, spec_path):
+    """Generate (or reuse from the LLM cache) a validated spec for a problem file, save it and return its Lucid JSON."""
+    from generate import read_problem_description, generate_valid_diagram, save_spec
+
+    diagram, diagram_spec = generate_valid_diagram(read_problem_description(problem_path))
+    save_spec(diagram_spec, spec_path)
+    return diagram.to_json()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def watch(source, output, spec_path="generated_spec.json", page=0, interval=0.5):
+    """
+    Re-render `output` whenever `source` changes, until interrupted. A problem `.txt`
+    source is turned into a spec (saved to `spec_path`) first, and hand edits to that
+    spec are re-rendered too without calling the model again.
+    """
+    from_problem = source.lower().endswith(".txt")
+    seen = {}
+    print(f"👀 Watching {source}{' and ' + spec_path if from_problem else ''} (Ctrl+C to stop)")
+    try:
+        while True:
+            changed = [path for path in ([source, spec_path] if from_problem else [source]) if _mtime(path) != seen.get(path)]
+            if changed:
+                try:
+                    if from_problem and source in changed:
+                        document = generate_document(source, spec_path)
+                    else:
+                        document = load_document(spec_path if from_problem else source)
+                    save_preview(document, output, page)
+                    print(f"✅ Rendered {output} ({time.strftime('%H:%M:%S')})")
+                except Exception as e:  # Half-saved files, invalid specs, API errors: keep watching
+                    print(f"⚠️ {e}")
+                for path in ([source, spec_path] if from_problem else [source]):
+                    seen[path] = _mtime(path)  # Includes the spec just written
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a diagram to SVG/PNG locally, without uploading it to Lucid.")
+    parser.add_argument("source", nargs="?", default="generated_spec.json",
+                        help="Document JSON, diagram spec JSON, or a problem .txt file (generates a spec)")
+    parser.add_argument("--output", default="preview.svg", help="Where to write the preview (.svg or .png)")
+    parser.add_argument("--spec", default="generated_spec.json", help="Where specs generated from a problem file are saved")
+    parser.add_argument("--page", type=int, default=0, help="Page to render, for multi-page documents")
+    parser.add_argument("--watch", action="store_true", help="Re-render whenever the source (or generated spec) changes")
+    args = parser.parse_args()
+
+    if args.watch:
+        watch(args.source, args.output, args.spec, args.page)
+        return
+
+    if args.source.lower().endswith(".txt"):
+        document = generate_document(args.source, args.spec)
+    else:
+        document = load_document(args.source)
+    save_preview(document, args.output, args.page)
+    print(f"✅ Rendered {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import math
+from collections import defaultdict
+from script import is_container
+
+SIDES = ("right", "left", "top", "bottom")
+
+# Outward normal of each side
+NORMALS = {"right": (1, 0), "left": (-1, 0), "top": (0, -1), "bottom": (0, 1)}
+
+# Cost of a candidate route, on top of its length in pixels
+BLOCKED_PENALTY = 10000  # Per shape the line passes through
+FACING_AWAY_PENALTY = 1000  # Per endpoint leaving its shape away from the other end
+
+# Clearance kept around obstacles, so lines running along a shape's edge count as blocked
+OBSTACLE_MARGIN = 10
+
+
+def side_anchor(box, side, t=0.5):
+    """Absolute point at relative position `t` along `side` of box (x1, y1, x2, y2)."""
+    x1, y1, x2, y2 = box
+    if side == "right":
+        return x2, y1 + (y2 - y1) * t
+    if side == "left":
+        return x1, y1 + (y2 - y1) * t
+    if side == "top":
+        return x1 + (x2 - x1) * t, y1
+    return x1 + (x2 - x1) * t, y2
+
+
+def side_position(side, t=0.5):
+    """Relative endpoint position for `side`, as used by Lucid shape endpoints."""
+    if side == "right":
+        return {"x": 1, "y": t}
+    if side == "left":
+        return {"x": 0, "y": t}
+    if side == "top":
+        return {"x": t, "y": 0}
+    return {"x": t, "y": 1}
+
+
+def segment_hits_box(p, q, box):
+    """Liang-Barsky test for whether segment p→q passes through the interior of box."""
+    x1, y1, x2, y2 = box
+    t0, t1 = 0.0, 1.0
+    dx, dy = q[0] - p[0], q[1] - p[1]
+    for delta, low, high, start in ((dx, x1, x2, p[0]), (dy, y1, y2, p[1])):
+        if delta == 0:
+            if not low < start < high:
+                return False
+            continue
+        a, b = (low - start) / delta, (high - start) / delta
+        if a > b:
+            a, b = b, a
+        t0, t1 = max(t0, a), min(t1, b)
+        if t0 >= t1:
+            return False
+    return True
+
+
+### 🚀 Uniform Grid Spatial Index ###
+class SpatialGrid:
+    """Uniform grid over bounding boxes (x1, y1, x2, y2) for fast segment queries. `None` boxes are skipped."""
+
+    def __init__(self, boxes, cell_size=None):
+        self.boxes = boxes
+        if cell_size is None:
+            sizes = sorted(max(b[2] - b[0], b[3] - b[1]) for b in boxes if b) or [100]
+            cell_size = max(sizes[len(sizes) // 2], 1)  # Cells the size of a median shape
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+
+        for index, box in enumerate(boxes):
+            if box is None:
+                continue
+            x1, y1, x2, y2 = box
+            for cx in range(self._cell(x1), self._cell(x2) + 1):
+                for cy in range(self._cell(y1), self._cell(y2) + 1):
+                    self.cells[cx, cy].append(index)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def _walk(self, p, q):
+        """Cells crossed by segment p→q (Amanatides-Woo traversal)."""
+        cx, cy = self._cell(p[0]), self._cell(p[1])
+        end_x, end_y = self._cell(q[0]), self._cell(q[1])
+        dx, dy = q[0] - p[0], q[1] - p[1]
+        step_x, step_y = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+
+        def first_crossing(start, delta, cell, step):
+            if step == 0:
+                return math.inf, math.inf
+            boundary = (cell + (step > 0)) * self.cell_size
+            return (boundary - start) / delta, self.cell_size / abs(delta)
+
+        t_x, delta_x = first_crossing(p[0], dx, cx, step_x)
+        t_y, delta_y = first_crossing(p[1], dy, cy, step_y)
+
+        yield cx, cy
+        while (cx, cy) != (end_x, end_y) and min(t_x, t_y) <= 1:
+            if t_x < t_y:
+                cx, t_x = cx + step_x, t_x + delta_x
+            else:
+                cy, t_y = cy + step_y, t_y + delta_y
+            yield cx, cy
+
+    def query_segment(self, p, q, ignore=(), limit=None):
+        """Indexes of boxes whose interior segment p→q passes through, stopping after `limit` hits."""
+        hits, seen = [], set(ignore)
+        cells, boxes = self.cells, self.boxes
+        px, py = p
+        dx, dy = q[0] - px, q[1] - py
+        for cell in self._walk(p, q):
+            for index in cells.get(cell, ()):
+                if index in seen:
+                    continue
+                seen.add(index)
+
+                # ✅ `segment_hits_box` inlined, with the segment's deltas computed once per query
+                x1, y1, x2, y2 = boxes[index]
+                if dx:
+                    a, b = (x1 - px) / dx, (x2 - px) / dx
+                    t0, t1 = (a, b) if a < b else (b, a)
+                elif x1 < px < x2:
+                    t0, t1 = 0.0, 1.0
+                else:
+                    continue
+                if dy:
+                    a, b = (y1 - py) / dy, (y2 - py) / dy
+                    if a > b:
+                        a, b = b, a
+                    if a > t0:
+                        t0 = a
+                    if b < t1:
+                        t1 = b
+                elif not y1 < py < y2:
+                    continue
+                if max(t0, 0.0) >= min(t1, 1.0):
+                    continue
+
+                hits.append(index)
+                if len(hits) == limit:
+                    return hits
+        return hits
+
+
+### 🚀 Automatic Endpoint Sides ###
+def _facing_away(box, side, target):
+    anchor = side_anchor(box, side)
+    nx, ny = NORMALS[side]
+    return (target[0] - anchor[0]) * nx + (target[1] - anchor[1]) * ny <= 0
+
+
+def facing_sides(box, other):
+    """The horizontal and vertical side of `box` facing box `other`; the only ones an auto endpoint tries."""
+    dx = (other[0] + other[2]) - (box[0] + box[2])
+    dy = (other[1] + other[3]) - (box[1] + box[3])
+    return ("right" if dx >= 0 else "left", "bottom" if dy >= 0 else "top")
+
+
+def route_lines(diagram, pending):
+    """
+    Resolve "auto" endpoint sides of `diagram`'s lines from the shapes' current
+    bounding boxes.
+
+    - `pending`: {line_id: (start_side, end_side)} as passed to `create_line`
+
+    Each auto endpoint tries the two sides facing the other end and gets the pair
+    that keeps the line out of other shapes (queried through a `SpatialGrid`, so
+    cost grows with line length, not shape count), preferring shorter lines. Auto
+    endpoints that share a shape side are then spread along it in the order of their
+    other ends.
+
+    Resolved sides are kept in `diagram._routes` with the boxes they were resolved
+    against, so later calls only route new lines, or all of them once a shape moved.
+    """
+    with diagram._lock:
+        shapes, lines = list(diagram.shapes), [line for line in diagram.lines if line["id"] in pending]
+
+    boxes, index = [], {}
+    for shape in shapes:
+        bb = shape["boundingBox"]
+        box = (bb["x"], bb["y"], bb["x"] + bb["w"], bb["y"] + bb["h"])
+        index[shape["id"]] = (len(boxes), box)
+        if is_container(shape):
+            boxes.append(None)  # Lines may cross containers
+        else:
+            boxes.append((box[0] - OBSTACLE_MARGIN, box[1] - OBSTACLE_MARGIN, box[2] + OBSTACLE_MARGIN, box[3] + OBSTACLE_MARGIN))
+
+    # ✅ A moved, added or removed shape invalidates every cached route
+    if diagram._routes.get(None) != boxes:
+        diagram._routes = {None: boxes}
+    routes, grid = diagram._routes, None
+    spread = defaultdict(list)  # (shape_id, side) -> [(sort key, endpoint), ...]
+
+    for line in lines:
+        endpoint1, endpoint2 = line["endpoint1"], line["endpoint2"]
+        if endpoint1.get("shapeId") not in index or endpoint2.get("shapeId") not in index:
+            continue
+        (index1, box1), (index2, box2) = index[endpoint1["shapeId"]], index[endpoint2["shapeId"]]
+        start_side, end_side = (side if side in SIDES or side == "auto" else "right" for side in pending[line["id"]])
+
+        key = (line["id"], endpoint1["shapeId"], endpoint2["shapeId"], start_side, end_side)
+        if key not in routes:
+            # ✅ Try side pairs cheapest-first; the index is only queried until no pair can win
+            candidates = []
+            for side1 in facing_sides(box1, box2) if start_side == "auto" else (start_side,):
+                for side2 in facing_sides(box2, box1) if end_side == "auto" else (end_side,):
+                    p, q = side_anchor(box1, side1), side_anchor(box2, side2)
+                    cost = math.dist(p, q)
+                    cost += FACING_AWAY_PENALTY * (_facing_away(box1, side1, q) + _facing_away(box2, side2, p))
+                    candidates.append((cost, side1, side2, p, q))
+            candidates.sort(key=lambda candidate: candidate[0])
+
+            if grid is None:
+                grid = SpatialGrid(boxes)
+            best = None
+            for cost, side1, side2, p, q in candidates:
+                if best is not None and cost >= best[0]:
+                    break
+                # Blocked beyond `limit` shapes, this pair can no longer beat the best one
+                limit = None if best is None else math.ceil((best[0] - cost) / BLOCKED_PENALTY)
+                hits = len(grid.query_segment(p, q, ignore=(index1, index2), limit=limit))
+                if best is None or cost + BLOCKED_PENALTY * hits < best[0]:
+                    best = (cost + BLOCKED_PENALTY * hits, side1, side2)
+                if not hits:
+                    break  # Later pairs cost at least as much
+            routes[key] = best[1:]
+
+        side1, side2 = routes[key]
+        endpoint1["position"] = side_position(side1)
+        endpoint2["position"] = side_position(side2)
+
+        p, q = side_anchor(box1, side1), side_anchor(box2, side2)
+        if start_side == "auto":
+            spread[endpoint1["shapeId"], side1].append((q, endpoint1))
+        if end_side == "auto":
+            spread[endpoint2["shapeId"], side2].append((p, endpoint2))
+
+    # ✅ Spread endpoints sharing a side, ordered by where their other end lies
+    for (_, side), endpoints in spread.items():
+        if len(endpoints) < 2:
+            continue
+        axis = 1 if side in ("left", "right") else 0
+        endpoints.sort(key=lambda item: item[0][axis])
+        for i, (_, endpoint) in enumerate(endpoints):
+            endpoint["position"] = side_position(side, round((i + 1) / (len(endpoints) + 1), 4))
@@ -1,20 +1,18 @@
 import os
+import io
 import json
 import zipfile
-import requests
-from dotenv import load_dotenv
+import tempfile
 import uuid
+import hashlib
 import re
+import threading
+from array import array
+import contextvars
+from contextlib import contextmanager
+import metrics
 
-# Load API key
-load_dotenv()
-LUCIDCHART_API_KEY = os.getenv("LUCIDCHART_API_KEY")
-
-# Global storage for shapes and lines
-shapes = []
-lines = []
-
-### 🚀 Create a Shape Dynamically ###
+# The Lucid API key (and `.env`) is only loaded by `lucid_api`, when something is uploaded
 
 
 # Standard color name to hex mapping
@@ -31,348 +29,709 @@ COLOR_MAP = {
     "magenta": "#FF00FF"
 }
 
+CONTAINER_TYPES = {
+    "braceContainer", "bracketContainer", "circleContainer", "diamondContainer",
+    "pillContainer", "rectangleContainer", "roundedRectangleContainer", "swimLanes"
+}
+
+FLOWCHART_TYPES = {
+    "braceNote", "connector", "database", "data", "decision", "delay",
+    "display", "document", "manualInput", "manualOperation", "merge",
+    "process", "storedData", "terminator"
+}
+
+STANDARD_SHAPE_TYPES = {"rectangle", "text", "hotspot", "image", "stickyNote"}
+
+# Crow's foot endpoint styles (start, end) for each relationship type
+LINE_ENDPOINT_STYLES = {
+    "one-to-one": ("one", "one"),
+    "one-to-many": ("one", "many"),
+    "many-to-one": ("many", "one"),
+    "many-to-many": ("many", "many")
+}
+
+# Sides accepted by `create_line`; "auto" is resolved when the JSON is generated
+LINE_SIDES = {"right", "left", "top", "bottom", "auto"}
+
+# "#RGB", "#RGBA", "#RRGGBB" or "#RRGGBBAA"
+HEX_COLOR_PATTERN = re.compile(r'^#(?:[0-9a-fA-F]{3,4}){1,2}$')
+
 def validate_hex_color(color):
     """Ensure the color is in a valid hex format or convert color names to hex."""
-    hex_pattern = r'^#(?:[0-9a-fA-F]{3,4}){1,2}$'
-
     # If color is a named color, convert it to hex
     if color.lower() in COLOR_MAP:
         return COLOR_MAP[color.lower()]
 
     # Check if color is a valid hex code
-    if re.match(hex_pattern, color):
+    if HEX_COLOR_PATTERN.match(color):
         return color
 
     # Invalid color → Default to black
     print(f"⚠️ Invalid color `{color}`. Defaulting to black (#000000).")
     return "#000000"
 
-def create_shape(name, x, y, shape_type="rectangle", width=200, height=100, color="#00FF00", extra_properties=None):
-    """Create a shape with a specified type, position, size, and color."""
-    
-    color = validate_hex_color(color)  # ✅ Fix color before using it
-
-    shape_id = f"shape_{uuid.uuid4().hex[:8]}"  # Unique ID
-
-    shape = {
-        "id": shape_id,
-        "type": shape_type,  
-        "boundingBox": {"x": x, "y": y, "w": width, "h": height},
-        "style": {
-            "fill": {"type": "color", "color": color},
-            "stroke": {"color": "#000000", "width": 1, "style": "solid"}
-        },
-        "text": name
-    }
 
-    # Add extra properties (e.g., star points, arrow direction, etc.)
-    if extra_properties:
-        shape.update(extra_properties)
+def is_container(shape):
+    """Whether a shape dict is a container (including swim lanes)."""
+    return shape["type"] in CONTAINER_TYPES
 
-    shapes.append(shape)  # Store the shape
-    return shape_id  # Return shape ID for reference
 
+### 🚀 Interned Styles ###
+# Each `Diagram` keeps a registry (style key -> style) shared by every shape, line and
+# cell using that style. Shared styles are frozen, so restyling one item can't restyle
+# the others: give it a new style instead, e.g. `{**shape["style"], "fill": ...}`.
+class FrozenStyle(dict):
+    """A style dict that can't be changed in place. Still a `dict`, so `json` encodes it as one."""
+    __slots__ = ()
 
+    def _frozen(self, *args, **kwargs):
+        raise TypeError("❌ Styles are shared between items and can't be edited. Assign a new style dict instead.")
 
+    __setitem__ = __delitem__ = __ior__ = _frozen
+    clear = pop = popitem = setdefault = update = _frozen
 
+    def __reduce__(self):
+        return FrozenStyle, (dict(self),)
 
-def create_container(name, x, y, container_type="rectangleContainer", width=400, height=200, color="#D3D3D3", magnetize=True, extra_properties=None):
-    """
-    Create a container with specified type, position, size, and color.
-
-    Supported container types:
-    - "braceContainer"
-    - "bracketContainer"
-    - "circleContainer"
-    - "diamondContainer"
-    - "pillContainer"
-    - "rectangleContainer"
-    - "roundedRectangleContainer"
-    - "swimLanes"
-    """
+def _intern_style(key, build, styles):
+    """The style for `key` from the `styles` registry, built and frozen on first use (always, without a registry)."""
+    style = styles.get(key) if styles is not None else None
+    if style is None:
+        style = FrozenStyle(build())
+        if styles is not None:
+            style = styles.setdefault(key, style)
+    return style
 
-    # Ensure valid container type
-    valid_containers = {
-        "braceContainer", "bracketContainer", "circleContainer", "diamondContainer",
-        "pillContainer", "rectangleContainer", "roundedRectangleContainer", "swimLanes"
-    }
+def fill_style(color, styles=None):
+    """Frozen `{"type": "color", "color": color}` fill, shared through the `styles` registry."""
+    return _intern_style(("fill", color), lambda: {"type": "color", "color": color}, styles)
 
-    if container_type not in valid_containers:
-        raise ValueError(f"❌ Invalid container type: {container_type}. Must be one of {valid_containers}.")
-
-    container_id = f"container_{uuid.uuid4().hex[:8]}"  # Generate unique ID
-
-    container = {
-        "id": container_id,
-        "type": container_type,
-        "boundingBox": {"x": x, "y": y, "w": width, "h": height},
-        "style": {
-            "fill": {"type": "color", "color": color},
-            "stroke": {"color": "#000000", "width": 1, "style": "solid"}
-        },
-        "text": name,
-        "magnetize": magnetize
-    }
+def stroke_style(color="#000000", width=1, style="solid", styles=None):
+    """Frozen stroke, solid black 1px by default, shared through the `styles` registry."""
+    return _intern_style(("stroke", color, width, style), lambda: {"color": color, "width": width, "style": style}, styles)
 
-    # Handle Swim Lanes (special properties)
-    if container_type == "swimLanes":
-        container["vertical"] = False  # Default to horizontal swim lanes
-        container["titleBar"] = {
-            "height": 50,
-            "verticalText": False
+def shape_style(color=None, stroke=True, styles=None):
+    """Frozen shape style with a `color` fill (if given) and the default stroke (if `stroke`)."""
+    def build():
+        style = {}
+        if color is not None:
+            style["fill"] = fill_style(color, styles)
+        if stroke:
+            style["stroke"] = stroke_style(styles=styles)
+        return style
+    return _intern_style(("shape", color, stroke), build, styles)
+
+
+### 🚀 Compact Table Cells ###
+class TableCells:
+    """
+    Array-backed storage for a table's cells, one column per cell field. Cells only
+    become Lucid cell dicts (sharing interned styles) when the JSON is generated,
+    so large tables hold no per-cell dicts.
+    """
+    __slots__ = ("x", "y", "merge_right", "merge_down", "text", "color")
+
+    def __init__(self):
+        self.x = array("l")
+        self.y = array("l")
+        self.merge_right = array("l")
+        self.merge_down = array("l")
+        self.text = []
+        self.color = []
+
+    def append(self, x, y, merge_right=0, merge_down=0, text="", color="#FFFFFF"):
+        self.x.append(x)
+        self.y.append(y)
+        self.merge_right.append(merge_right)
+        self.merge_down.append(merge_down)
+        self.text.append(text)
+        self.color.append(color)
+
+    def __len__(self):
+        return len(self.text)
+
+    def __iter__(self):
+        return iter(self.to_json())
+
+    def to_json(self, styles=None):
+        """The cells as Lucid cell dicts, in storage order, with styles from the `styles` registry."""
+        styles = {} if styles is None else styles  # Shared within the table at least
+        cell_styles = {
+            color: _intern_style(("cell", color), lambda: {"fill": fill_style(color, styles)}, styles)
+            for color in set(self.color)
         }
-        container["lanes"] = [
-            {
-                "title": "Lane 1",
-                "width": width // 2,
-                "headerFill": "#635DFF",
-                "laneFill": "#F2F3F5"
-            },
+        return [
             {
-                "title": "Lane 2",
-                "width": width // 2,
-                "headerFill": "#FF6347",
-                "laneFill": "#F2F3F5"
+                "xPosition": x,
+                "yPosition": y,
+                "mergeCellsRight": merge_right,
+                "mergeCellsDown": merge_down,
+                "text": text,
+                "style": cell_styles[color]
             }
+            for x, y, merge_right, merge_down, text, color in zip(
+                self.x, self.y, self.merge_right, self.merge_down, self.text, self.color
+            )
         ]
 
-    # Add extra properties if provided (e.g., swim lanes customization)
-    if extra_properties:
-        container.update(extra_properties)
 
-    shapes.append(container)  # Store the container as part of shapes
-    return container_id  # Return the container ID for reference
+def _jsonable(value):
+    """`json` fallback for the compact model's non-JSON containers."""
+    return value.to_json() if isinstance(value, TableCells) else str(value)
 
 
-def create_flowchart_element(name, x, y, flowchart_type="process", width=200, height=100, color="#ADD8E6", extra_properties=None):
-    """
-    Create a flowchart element with specified type, position, size, and color.
-
-    Supported flowchart types:
-    - "braceNote"
-    - "connector"
-    - "database"
-    - "data"
-    - "decision"
-    - "delay"
-    - "display"
-    - "document"
-    - "manualInput"
-    - "manualOperation"
-    - "merge"
-    - "process"
-    - "storedData"
-    - "terminator"
+def _materialize(shape, styles=None):
+    """The shape as plain Lucid JSON, expanding compact table cells (styles from the `styles` registry)."""
+    if isinstance(shape.get("cells"), TableCells):
+        return {**shape, "cells": shape["cells"].to_json(styles)}
+    return shape
+
+
+### 🚀 Diagram Sessions ###
+class Diagram:
     """
+    A diagram session that owns its own shapes and lines.
 
-    valid_flowchart_types = {
-        "braceNote", "connector", "database", "data", "decision", "delay", 
-        "display", "document", "manualInput", "manualOperation", "merge", 
-        "process", "storedData", "terminator"
-    }
+    Every builder function is available as a method. Sessions are isolated from
+    each other and safe to build from several threads at once, so one process can
+    build many diagrams concurrently:
 
-    if flowchart_type not in valid_flowchart_types:
-        raise ValueError(f"❌ Invalid flowchart type: {flowchart_type}. Must be one of {valid_flowchart_types}.")
+        diagram = Diagram()
+        users = diagram.create_entity("Users", [("UserID", True)], x=100, y=100)
 
-    element_id = f"flowchart_{uuid.uuid4().hex[:8]}"  # Generate a unique ID
+    The module-level functions (`create_shape`, `create_line`, ...) build into the
+    active session, see `use_diagram`. With `max_page_shapes`, diagrams with more
+    shapes are split onto several pages when the JSON is generated (see `pagination.py`).
+    """
 
-    flowchart_element = {
-        "id": element_id,
-        "type": flowchart_type,
-        "boundingBox": {"x": x, "y": y, "w": width, "h": height},
-        "style": {
-            "fill": {"type": "color", "color": color},
-            "stroke": {"color": "#000000", "width": 1, "style": "solid"}
-        },
-        "text": name
-    }
+    def __init__(self, title="Dynamic Diagram", deterministic_ids=False, max_page_shapes=None):
+        if max_page_shapes is not None and max_page_shapes < 1:
+            raise ValueError(f"❌ Invalid page budget: {max_page_shapes}. Must be at least 1 shape per page.")
+        self.title = title
+        self.deterministic_ids = deterministic_ids
+        self.max_page_shapes = max_page_shapes  # Split the JSON onto several pages past this many shapes
+        self._sequence = 0  # Creation order, part of deterministic IDs
+        self.shapes = []
+        self.lines = []
+        self._auto_sides = {}  # line_id -> (start_side, end_side) for lines with "auto" sides
+        self._routes = {}  # Sides resolved for "auto" lines, see `routing.route_lines`
+        self.entities = {}  # Entity table ID -> {"name": ..., "attributes": [...]} as passed to `create_entity`
+        self._styles = {}  # Interned styles of this session, see `FrozenStyle`
+        self._lock = threading.Lock()
+
+    def _mint_id(self, prefix, item):
+        """
+        A unique ID for a new shape or line. Random by default; with `deterministic_ids`
+        it is a hash of the item's content and creation order, so identical diagrams
+        get identical IDs. Call with the lock held.
+        """
+        self._sequence += 1
+        if not self.deterministic_ids:
+            return f"{prefix}_{uuid.uuid4().hex[:8]}"
+
+        content = json.dumps([self._sequence, item], sort_keys=True, default=_jsonable)
+        return f"{prefix}_{hashlib.sha256(content.encode('utf-8')).hexdigest()[:8]}"
+
+    def _add_shape(self, prefix, shape):
+        """Assign the shape its ID, store it, and return the ID."""
+        with self._lock:
+            shape_id = shape["id"] = self._mint_id(prefix, shape)
+            self.shapes.append(shape)
+        return shape_id
+
+    def clear(self):
+        """Remove all shapes and lines from the session."""
+        with self._lock:
+            self.shapes.clear()
+            self.lines.clear()
+            self._auto_sides.clear()
+            self._routes = {}
+            self.entities.clear()
+            self._styles = {}
+            self._sequence = 0
+
+    ### 🚀 Create a Shape Dynamically ###
+    @metrics.timed("create_shape")
+    def create_shape(self, name, x=0, y=0, shape_type="rectangle", width=200, height=100, color="#00FF00", extra_properties=None):
+        """Create a shape with a specified type, position, size, and color."""
+
+        color = validate_hex_color(color)  # ✅ Fix color before using it
+
+        shape = {
+            "id": None,  # Assigned when stored
+            "type": shape_type,
+            "boundingBox": {"x": x, "y": y, "w": width, "h": height},
+            "style": shape_style(color, styles=self._styles),
+            "text": name
+        }
 
-    # Handle special cases like Brace Note
-    if flowchart_type == "braceNote":
-        flowchart_element["rightFacing"] = False  # Default to left-facing
-        flowchart_element["braceWidth"] = 60  # Default width
+        # Add extra properties (e.g., star points, arrow direction, etc.)
+        if extra_properties:
+            shape.update(extra_properties)
+
+        shape_id = self._add_shape("shape", shape)  # Store the shape
+        return shape_id  # Return shape ID for reference
+
+    @metrics.timed("create_container")
+    def create_container(self, name, x=0, y=0, container_type="rectangleContainer", width=400, height=200, color="#D3D3D3", magnetize=True, extra_properties=None):
+        """
+        Create a container with specified type, position, size, and color.
+
+        Supported container types:
+        - "braceContainer"
+        - "bracketContainer"
+        - "circleContainer"
+        - "diamondContainer"
+        - "pillContainer"
+        - "rectangleContainer"
+        - "roundedRectangleContainer"
+        - "swimLanes"
+        """
+
+        # Ensure valid container type
+        if container_type not in CONTAINER_TYPES:
+            raise ValueError(f"❌ Invalid container type: {container_type}. Must be one of {CONTAINER_TYPES}.")
+
+        container = {
+            "id": None,  # Assigned when stored
+            "type": container_type,
+            "boundingBox": {"x": x, "y": y, "w": width, "h": height},
+            "style": shape_style(color, styles=self._styles),
+            "text": name,
+            "magnetize": magnetize
+        }
 
-    # Add extra properties if needed
-    if extra_properties:
-        flowchart_element.update(extra_properties)
+        # Handle Swim Lanes (special properties)
+        if container_type == "swimLanes":
+            container["vertical"] = False  # Default to horizontal swim lanes
+            container["titleBar"] = {
+                "height": 50,
+                "verticalText": False
+            }
+            container["lanes"] = [
+                {
+                    "title": "Lane 1",
+                    "width": width // 2,
+                    "headerFill": "#635DFF",
+                    "laneFill": "#F2F3F5"
+                },
+                {
+                    "title": "Lane 2",
+                    "width": width // 2,
+                    "headerFill": "#FF6347",
+                    "laneFill": "#F2F3F5"
+                }
+            ]
+
+        # Add extra properties if provided (e.g., swim lanes customization)
+        if extra_properties:
+            container.update(extra_properties)
+
+        container_id = self._add_shape("container", container)  # Store the container as part of shapes
+        return container_id  # Return the container ID for reference
+
+    @metrics.timed("create_flowchart_element")
+    def create_flowchart_element(self, name, x=0, y=0, flowchart_type="process", width=200, height=100, color="#ADD8E6", extra_properties=None):
+        """
+        Create a flowchart element with specified type, position, size, and color.
+
+        Supported flowchart types:
+        - "braceNote"
+        - "connector"
+        - "database"
+        - "data"
+        - "decision"
+        - "delay"
+        - "display"
+        - "document"
+        - "manualInput"
+        - "manualOperation"
+        - "merge"
+        - "process"
+        - "storedData"
+        - "terminator"
+        """
+
+        if flowchart_type not in FLOWCHART_TYPES:
+            raise ValueError(f"❌ Invalid flowchart type: {flowchart_type}. Must be one of {FLOWCHART_TYPES}.")
+
+        flowchart_element = {
+            "id": None,  # Assigned when stored
+            "type": flowchart_type,
+            "boundingBox": {"x": x, "y": y, "w": width, "h": height},
+            "style": shape_style(color, styles=self._styles),
+            "text": name
+        }
 
-    shapes.append(flowchart_element)  # Store the flowchart element
-    return element_id  # Return the ID for reference
+        # Handle special cases like Brace Note
+        if flowchart_type == "braceNote":
+            flowchart_element["rightFacing"] = False  # Default to left-facing
+            flowchart_element["braceWidth"] = 60  # Default width
+
+        # Add extra properties if needed
+        if extra_properties:
+            flowchart_element.update(extra_properties)
+
+        element_id = self._add_shape("flowchart", flowchart_element)  # Store the flowchart element
+        return element_id  # Return the ID for reference
+
+    @metrics.timed("create_table")
+    def create_table(self, name, x=0, y=0, rows=3, cols=2, width=300, height=200, color="#FFFFFF", cell_data=None, compact=False):
+        """
+        Create a `rows` x `cols` table.
+
+        - `cell_data`: List of cells [{"x": col, "y": row, "text": ..., "color": ..., "merge_right": ..., "merge_down": ...}, ...]
+        - `compact`: Only emit the cells listed in `cell_data` instead of every cell of the grid
+        """
+
+        table = {
+            "id": None,  # Assigned when stored
+            "type": "table",
+            "boundingBox": {"x": x, "y": y, "w": width, "h": height},
+            "style": shape_style(color, styles=self._styles),
+            "rowCount": rows,
+            "colCount": cols,
+            "cells": TableCells(),  # Expanded to cell dicts in `to_json`
+            "verticalBorder": True,
+            "horizontalBorder": True
+        }
 
+        # ✅ Index cell data by (x, y) so each cell is found in O(1); the first entry wins
+        cells_by_position = {}
+        for cell in cell_data or ():
+            cells_by_position.setdefault((cell["x"], cell["y"]), cell)
+
+        if compact:
+            positions = sorted(
+                ((c, r) for c, r in cells_by_position if 0 <= c < cols and 0 <= r < rows),
+                key=lambda position: (position[1], position[0])
+            )
+        else:
+            positions = ((c, r) for r in range(rows) for c in range(cols))
+
+        # ✅ Populate table cells
+        for c, r in positions:
+            cell = cells_by_position.get((c, r), {})
+            table["cells"].append(
+                c, r, cell.get("merge_right", 0), cell.get("merge_down", 0), cell.get("text", ""), cell.get("color", "#FFFFFF")
+            )
+
+        table_id = self._add_shape("table", table)  # Store table
+        return table_id  # Return the table ID
+
+    @metrics.timed("create_standard_shape")
+    def create_standard_shape(self, shape_type, name, x=0, y=0, width=200, height=100, text=None, image_url=None, color="#FFFFFF"):
+        """
+        Create a standard shape from Lucidchart's standard library.
+
+        - `shape_type`: Type of shape (rectangle, text, hotspot, image, stickyNote)
+        - `text`: For text-based shapes
+        - `image_url`: URL for images (if using an image block)
+        """
+        shape = {
+            "id": None,  # Assigned when stored
+            "type": shape_type,
+            "boundingBox": {"x": x, "y": y, "w": width, "h": height}
+        }
 
-def create_table(name, x, y, rows=3, cols=2, width=300, height=200, color="#FFFFFF", cell_data=None):
-    """
-    Create a valid square table by adding extra cells to make `rows == cols`.
-    """
+        # ✅ Handle Specific Shape Properties
+        if shape_type in ["rectangle", "stickyNote"]:
+            shape["style"] = shape_style(color, styles=self._styles)
+            shape["text"] = text if text else name
+
+        elif shape_type == "text":
+            shape["text"] = text if text else name  # Text Blocks don't support styles
+
+        elif shape_type == "hotspot":
+            shape["style"] = shape_style(styles=self._styles)  # No text
+
+        elif shape_type == "image":
+            shape["stroke"] = stroke_style(styles=self._styles)
+            shape["image"] = {"type": "image", "url": image_url}  # Must pass image_url
+
+        shape_id = self._add_shape("shape", shape)  # Store the shape
+        return shape_id  # Return the shape ID for reference
+
+    @metrics.timed("create_entity")
+    def create_entity(self, name, attributes, x=0, y=0):
+        """
+        Auto-generates an entity table with attributes.
+
+        - `name`: Entity name (e.g., "Users")
+        - `attributes`: List of tuples [(name, is_primary_key), ...], or
+          [(name, is_primary_key, data_type), ...] to add a "Type" column
+        - `x, y`: Position on the canvas
+        """
+
+        # ✅ A "Type" column is added when any attribute carries a data type
+        typed = any(len(attribute) > 2 for attribute in attributes)
+
+        # Auto-calculate rows (1 extra row for the header)
+        rows = len(attributes) + 1
+        cols = 3 if typed else 2  # Attribute Name, [Data Type,] PK indicator
+        pk_col = cols - 1
+
+        cell_data = []
+
+        # ✅ Add Header Row
+        cell_data.append({"x": 0, "y": 0, "text": name, "color": "#4682B4"})  # Table title
+        if typed:
+            cell_data.append({"x": 1, "y": 0, "text": "Type", "color": "#4682B4"})  # Data Type Column Header
+        cell_data.append({"x": pk_col, "y": 0, "text": "PK?", "color": "#4682B4"})  # PK Column Header
+
+        # ✅ Add Attributes
+        for index, (attr_name, is_primary_key, *data_type) in enumerate(attributes):
+            row = index + 1  # Offset by 1 because of the header
+            cell_data.append({"x": 0, "y": row, "text": attr_name})  # Attribute Name
+            if typed:
+                cell_data.append({"x": 1, "y": row, "text": data_type[0] if data_type else ""})  # Data Type
+            cell_data.append({"x": pk_col, "y": row, "text": "✔" if is_primary_key else ""})  # PK Indicator
+
+        table_id = self.create_table(name, x, y, rows=rows, cols=cols, cell_data=cell_data, compact=True)
+        with self._lock:
+            self.entities[table_id] = {"name": name, "attributes": list(attributes)}  # For `infer_relationships`
+        return table_id
+
+    ### 🚀 Create a Line Dynamically ###
+    @metrics.timed("create_line")
+    def create_line(self, shape1_id, shape2_id, relationship="relationship", line_type="one-to-one",
+                    start_side="right", end_side="left", text_position=0.5, text_side="top"):
+        """
+        Connect two shapes with a line.
+
+        - `line_type`: "one-to-one", "one-to-many", "many-to-one" or "many-to-many"
+        - `start_side`, `end_side`: "right", "left", "top", "bottom", or "auto" to pick the side
+          from the shapes' positions when the JSON is generated (after `auto_layout`)
+        """
+        start_style, end_style = LINE_ENDPOINT_STYLES.get(line_type, ("none", "none"))
+
+        line = {
+            "id": None,  # Assigned when stored
+            "lineType": "straight",
+            "endpoint1": {
+                "type": "shapeEndpoint",
+                "style": start_style,
+                "shapeId": shape1_id,
+                "position": get_endpoint_position(start_side)
+            },
+            "endpoint2": {
+                "type": "shapeEndpoint",
+                "style": end_style,
+                "shapeId": shape2_id,
+                "position": get_endpoint_position(end_side)
+            },
+            "stroke": stroke_style(width=2, styles=self._styles),
+            "text": [
+                {
+                    "text": relationship,
+                    "position": text_position,  # Stagger text placement
+                    "side": text_side           # Adjust text side
+                }
+            ]
+        }
+        with self._lock:
+            line_id = line["id"] = self._mint_id("line", line)
+            self.lines.append(line)
+            if "auto" in (start_side, end_side):
+                self._auto_sides[line_id] = (start_side, end_side)
+        return line_id
+
+    ### 🚀 Bulk Builders ###
+    def create_flowchart_elements(self, name, x=0, y=0, flowchart_type="process", width=200, height=100, color="#ADD8E6",
+                                  pause_gc=False):
+        """
+        Create many flowchart elements in one call, with the same JSON as calling
+        `create_flowchart_element` per row but several times faster (see `bulk.py`).
+        Each argument is a column (list, NumPy array, pandas Series) or one value for
+        every row; `name` can also be a DataFrame whose columns are named like the
+        arguments. Returns the IDs in row order.
+
+        - `pause_gc`: Turn off cyclic garbage collection while the batch is allocated, about
+          twice as fast for large batches. It is process-wide, so only use it when no other
+          thread depends on collection running.
+        """
+        from bulk import create_flowchart_elements
+
+        return create_flowchart_elements(self, name, x, y, flowchart_type, width, height, color, pause_gc)
+
+    def create_entities(self, name, attributes, x=0, y=0, pause_gc=False):
+        """
+        Create many entity tables in one call, like `create_entity` per row.
+
+        - `attributes`: A column of attribute lists, or a long DataFrame with one row per
+          attribute and columns `entity`, `attribute`, `is_primary_key` (and `data_type`)
+        - `pause_gc`: See `create_flowchart_elements`
+        """
+        from bulk import create_entities
+
+        return create_entities(self, name, attributes, x, y, pause_gc)
+
+    def create_lines(self, shape1_id, shape2_id=None, relationship="relationship", line_type="one-to-one",
+                     start_side="right", end_side="left", text_position=0.5, text_side="top", pause_gc=False):
+        """
+        Create many lines in one call, like `create_line` per row. `shape1_id` can be a
+        DataFrame of line columns. See `create_flowchart_elements` for `pause_gc`.
+        """
+        from bulk import create_lines
+
+        return create_lines(self, shape1_id, shape2_id, relationship, line_type, start_side, end_side, text_position, text_side, pause_gc)
+
+    ### 🚀 Infer ERD Relationships ###
+    def infer_relationships(self):
+        """
+        Connect entities whose attributes reference another entity's primary key
+        (e.g. `Orders.UserID` → `Users.UserID`, or `Users.ID`) with crow's foot lines,
+        skipping entity pairs that are already connected. Returns the inferred relationships.
+        """
+        from relationships import infer_relationships
+
+        return infer_relationships(self)
+
+    ### 🚀 Lay Out the Diagram ###
+    def auto_layout(self, erd_layout="grid"):
+        """
+        Replace the x/y of every shape with an automatic layout: a layered layout for
+        flowchart elements and a "grid" or "force" layout for entity tables below them.
+        Call it after all shapes and lines are created.
+        """
+        from layout import auto_layout  # NumPy is only needed when laying out
+
+        auto_layout(self, erd_layout=erd_layout)
+
+    ### 🚀 Generate Lucidchart JSON ###
+    def to_json(self):
+        """Return the Lucid standard import JSON for this session."""
+        with metrics.span("generate_lucidchart_json") as current:
+            with self._lock:
+                auto_sides = dict(self._auto_sides)
+
+            if auto_sides:
+                from routing import route_lines  # Resolve "auto" sides against the final positions
+
+                with metrics.span("route_lines", lines=len(auto_sides)):
+                    route_lines(self, auto_sides)
+
+            with self._lock:
+                shapes, lines = list(self.shapes), list(self.lines)
+            current.set(shapes=len(shapes), lines=len(lines))
+
+            if self.max_page_shapes and len(shapes) > self.max_page_shapes:
+                from pagination import paginate
+
+                with metrics.span("paginate", shapes=len(shapes)) as paging:
+                    pages = paginate(shapes, lines, self.title, self.max_page_shapes, self._styles)
+                    paging.set(pages=len(pages))
+                return {"version": 1, "pages": pages}
+
+            return {
+                "version": 1,
+                "pages": [
+                    {
+                        "id": "page1",
+                        "title": self.title,
+                        "shapes": [_materialize(shape, self._styles) for shape in shapes],  # Use stored shapes
+                        "lines": lines  # Use stored lines
+                    }
+                ]
+            }
 
-    # 🔥 Force square table (make rows = cols by adding empty cells)
-    max_dim = max(rows, cols)  # Find the larger dimension
-    rows, cols = max_dim, max_dim  # Force table to be square
-
-    table_id = f"table_{uuid.uuid4().hex[:8]}"  # Unique ID
-
-    table = {
-        "id": table_id,
-        "type": "table",
-        "boundingBox": {"x": x, "y": y, "w": width, "h": height},
-        "style": {
-            "fill": {"type": "color", "color": color},
-            "stroke": {"color": "#000000", "width": 1, "style": "solid"}
-        },
-        "rowCount": rows,
-        "colCount": cols,
-        "cells": [],
-        "verticalBorder": True,
-        "horizontalBorder": True
-    }
 
-    # ✅ Populate table cells
-    for r in range(rows):
-        for c in range(cols):
-            cell_text = ""
-            cell_color = "#FFFFFF"
-            merge_right = 0
-            merge_down = 0
-
-            if cell_data:
-                for cell in cell_data:
-                    if cell["x"] == c and cell["y"] == r:
-                        cell_text = cell.get("text", "")
-                        cell_color = cell.get("color", "#FFFFFF")
-                        merge_right = cell.get("merge_right", 0)
-                        merge_down = cell.get("merge_down", 0)
-                        break
-
-            # ✅ If cell is outside original dimensions, make it "hidden"
-            if c >= cols or r >= rows:
-                cell_text = ""
-                merge_right = 0
-                merge_down = 0
-
-            table["cells"].append({
-                "xPosition": c,
-                "yPosition": r,
-                "mergeCellsRight": merge_right,
-                "mergeCellsDown": merge_down,
-                "text": cell_text,
-                "style": {"fill": {"type": "color", "color": cell_color}}
-            })
+# The default session backs the module-level functions unless another one is active.
+# Set LUCID_DETERMINISTIC_IDS=1 to give it deterministic IDs (e.g. for generated scripts),
+# and LUCID_MAX_PAGE_SHAPES to split it onto pages of at most that many shapes, stubs included.
+_default_diagram = Diagram(
+    deterministic_ids=os.getenv("LUCID_DETERMINISTIC_IDS") == "1",
+    max_page_shapes=int(os.getenv("LUCID_MAX_PAGE_SHAPES", "0")) or None
+)
+_active_diagram = contextvars.ContextVar("active_diagram", default=_default_diagram)
 
-    shapes.append(table)  # Store table
-    return table_id  # Return the table ID
+# Kept for code that reads the default session's storage directly
+shapes = _default_diagram.shapes
+lines = _default_diagram.lines
 
 
-def create_standard_shape(shape_type, name, x, y, width=200, height=100, text=None, image_url=None, color="#FFFFFF"):
+def current_diagram():
+    """Return the diagram session the module-level functions currently build into."""
+    return _active_diagram.get()
+
+
+@contextmanager
+def use_diagram(diagram=None):
     """
-    Create a standard shape from Lucidchart's standard library.
-    
-    - `shape_type`: Type of shape (rectangle, text, hotspot, image, stickyNote)
-    - `text`: For text-based shapes
-    - `image_url`: URL for images (if using an image block)
+    Route the module-level builder functions into `diagram` for the current thread
+    (or asyncio task) until the block exits. A fresh `Diagram` is created if none is given.
+
+        with use_diagram() as diagram:
+            create_flowchart_element("Customer", x=100, y=100)
     """
-    shape_id = f"shape_{uuid.uuid4().hex[:8]}"  # Unique ID
+    diagram = diagram if diagram is not None else Diagram()
+    token = _active_diagram.set(diagram)
+    try:
+        yield diagram
+    finally:
+        _active_diagram.reset(token)
 
-    shape = {
-        "id": shape_id,
-        "type": shape_type,
-        "boundingBox": {"x": x, "y": y, "w": width, "h": height}
-    }
 
-    # ✅ Handle Specific Shape Properties
-    if shape_type in ["rectangle", "stickyNote"]:
-        shape["style"] = {
-            "fill": {"type": "color", "color": color},
-            "stroke": {"color": "#000000", "width": 1, "style": "solid"}
-        }
-        shape["text"] = text if text else name
+### 🚀 Builder Functions (active session) ###
+def create_shape(name, x=0, y=0, shape_type="rectangle", width=200, height=100, color="#00FF00", extra_properties=None):
+    """Create a shape with a specified type, position, size, and color."""
+    return current_diagram().create_shape(name, x, y, shape_type, width, height, color, extra_properties)
 
-    elif shape_type == "text":
-        shape["text"] = text if text else name  # Text Blocks don't support styles
 
-    elif shape_type == "hotspot":
-        shape["style"] = {"stroke": {"color": "#000000", "width": 1, "style": "solid"}}  # No text
+def create_container(name, x=0, y=0, container_type="rectangleContainer", width=400, height=200, color="#D3D3D3", magnetize=True, extra_properties=None):
+    """Create a container in the active diagram. See `Diagram.create_container` for supported types."""
+    return current_diagram().create_container(name, x, y, container_type, width, height, color, magnetize, extra_properties)
 
-    elif shape_type == "image":
-        shape["stroke"] = {"color": "#000000", "width": 1, "style": "solid"}
-        shape["image"] = {"type": "image", "url": image_url}  # Must pass image_url
 
-    shapes.append(shape)  # Store the shape
-    return shape_id  # Return the shape ID for reference
+def create_flowchart_element(name, x=0, y=0, flowchart_type="process", width=200, height=100, color="#ADD8E6", extra_properties=None):
+    """Create a flowchart element in the active diagram. See `Diagram.create_flowchart_element` for supported types."""
+    return current_diagram().create_flowchart_element(name, x, y, flowchart_type, width, height, color, extra_properties)
 
 
-def create_entity(name, attributes, x, y):
+def create_table(name, x=0, y=0, rows=3, cols=2, width=300, height=200, color="#FFFFFF", cell_data=None, compact=False):
+    """Create a `rows` x `cols` table in the active diagram. With `compact`, only the cells in `cell_data` are emitted."""
+    return current_diagram().create_table(name, x, y, rows, cols, width, height, color, cell_data, compact)
+
+
+def create_standard_shape(shape_type, name, x=0, y=0, width=200, height=100, text=None, image_url=None, color="#FFFFFF"):
+    """Create a standard Lucidchart shape (rectangle, text, hotspot, image, stickyNote) in the active diagram."""
+    return current_diagram().create_standard_shape(shape_type, name, x, y, width, height, text, image_url, color)
+
+
+def create_entity(name, attributes, x=0, y=0):
     """
     Auto-generates an entity table with attributes.
-    
+
     - `name`: Entity name (e.g., "Users")
-    - `attributes`: List of tuples [(name, is_primary_key), ...]
+    - `attributes`: List of tuples [(name, is_primary_key), ...], or
+      [(name, is_primary_key, data_type), ...] to add a "Type" column
     - `x, y`: Position on the canvas
     """
+    return current_diagram().create_entity(name, attributes, x, y)
 
-    # Auto-calculate rows (1 extra row for the header)
-    rows = len(attributes) + 1
-    cols = 2  # First column = Attribute Name, Second column = PK indicator
-
-    cell_data = []
 
-    # ✅ Add Header Row
-    cell_data.append({"x": 0, "y": 0, "text": name, "color": "#4682B4"})  # Table title
-    cell_data.append({"x": 1, "y": 0, "text": "PK?", "color": "#4682B4"})  # PK Column Header
+### 🚀 Create a Line Dynamically ###
+def create_line(shape1_id, shape2_id, relationship="relationship", line_type="one-to-one",
+                start_side="right", end_side="left", text_position=0.5, text_side="top"):
+    return current_diagram().create_line(shape1_id, shape2_id, relationship, line_type,
+                                         start_side, end_side, text_position, text_side)
 
-    # ✅ Add Attributes
-    for index, (attr_name, is_primary_key) in enumerate(attributes):
-        row = index + 1  # Offset by 1 because of the header
-        cell_data.append({"x": 0, "y": row, "text": attr_name})  # Attribute Name
-        cell_data.append({"x": 1, "y": row, "text": "✔" if is_primary_key else ""})  # PK Indicator
+### 🚀 Bulk Builders (active session) ###
+def create_flowchart_elements(name, x=0, y=0, flowchart_type="process", width=200, height=100, color="#ADD8E6", pause_gc=False):
+    """Create many flowchart elements in the active diagram from columns or a DataFrame. See `Diagram.create_flowchart_elements`."""
+    return current_diagram().create_flowchart_elements(name, x, y, flowchart_type, width, height, color, pause_gc)
 
-    return create_table(name, x, y, rows=rows, cols=2, cell_data=cell_data)
 
+def create_entities(name, attributes, x=0, y=0, pause_gc=False):
+    """Create many entity tables in the active diagram. See `Diagram.create_entities`."""
+    return current_diagram().create_entities(name, attributes, x, y, pause_gc)
 
 
-### 🚀 Create a Line Dynamically ###
-def create_line(shape1_id, shape2_id, relationship="relationship", line_type="one-to-one", 
-                start_side="right", end_side="left", text_position=0.5, text_side="top"):
-    line_id = f"line_{uuid.uuid4().hex[:8]}"  
-
-    endpoint_styles = {
-        "one-to-one": ("one", "one"),
-        "one-to-many": ("one", "many"),
-        "many-to-one": ("many", "one"),
-        "many-to-many": ("many", "many")
-    }
-    
-    start_style, end_style = endpoint_styles.get(line_type, ("none", "none"))
-
-    line = {
-        "id": line_id,
-        "lineType": "straight",
-        "endpoint1": {
-            "type": "shapeEndpoint",
-            "style": start_style,
-            "shapeId": shape1_id,
-            "position": get_endpoint_position(start_side)
-        },
-        "endpoint2": {
-            "type": "shapeEndpoint",
-            "style": end_style,
-            "shapeId": shape2_id,
-            "position": get_endpoint_position(end_side)
-        },
-        "stroke": {
-            "color": "#000000",
-            "width": 2,
-            "style": "solid"
-        },
-        "text": [
-            {
-                "text": relationship,
-                "position": text_position,  # Stagger text placement
-                "side": text_side           # Adjust text side
-            }
-        ]
-    }
-    lines.append(line)
-    return line_id
+def create_lines(shape1_id, shape2_id=None, relationship="relationship", line_type="one-to-one",
+                 start_side="right", end_side="left", text_position=0.5, text_side="top", pause_gc=False):
+    """Create many lines in the active diagram from columns or a DataFrame. See `Diagram.create_lines`."""
+    return current_diagram().create_lines(shape1_id, shape2_id, relationship, line_type,
+                                          start_side, end_side, text_position, text_side, pause_gc)
 
 def get_endpoint_position(side):
     """Helper function to return relative positions for endpoints."""
@@ -386,56 +745,125 @@ def get_endpoint_position(side):
 
 
 
+### 🚀 Infer ERD Relationships ###
+def infer_relationships():
+    """
+    Add one-to-many (or one-to-one) lines between entities of the active diagram wherever an
+    attribute matches another entity's primary key, e.g. `Orders.UserID` → `Users.UserID`.
+    Entity pairs that are already connected are left alone.
+    """
+    return current_diagram().infer_relationships()
+
+
+### 🚀 Lay Out the Diagram ###
+def auto_layout(erd_layout="grid"):
+    """Automatically position every shape of the active diagram. Call it after creating all shapes and lines."""
+    current_diagram().auto_layout(erd_layout)
+
+
 ### 🚀 Generate Lucidchart JSON ###
-def generate_lucidchart_json():
-    return {
-        "version": 1,
-        "pages": [
-            {
-                "id": "page1",
-                "title": "Dynamic Diagram",
-                "shapes": shapes,  # Use stored shapes
-                "lines": lines  # Use stored lines
-            }
-        ]
-    }
+def generate_lucidchart_json(diagram=None):
+    """Return the Lucid standard import JSON of the active diagram (or `diagram`)."""
+    return (diagram or current_diagram()).to_json()
 
-### 🚀 Save JSON and Create `.lucid` File ###
-def save_lucidchart_file():
-    lucidchart_json = generate_lucidchart_json()
-    
-    with open("document.json", "w") as json_file:
-        json.dump(lucidchart_json, json_file)
+### 🚀 Canonical Serialization ###
+# Sorted keys and no insignificant whitespace, so identical diagrams serialize to identical bytes
+CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
 
-    with zipfile.ZipFile("document.lucid", "w", zipfile.ZIP_DEFLATED) as zip_file:
-        zip_file.write("document.json")
+def canonical_json(document):
+    """Canonical JSON text of a Lucid document."""
+    return CANONICAL_ENCODER.encode(document)
 
-    return "document.lucid"
+def document_hash(document, title="Dynamic Diagram"):
+    """
+    SHA-256 of the upload title and the document's canonical JSON. The JSON is encoded
+    in one C-accelerated `encode` call; `iterencode` falls back to pure Python and is
+    several times slower.
+    """
+    digest = hashlib.sha256(title.encode("utf-8") + b"\0")
+    digest.update(canonical_json(document).encode("utf-8"))
+    return digest.hexdigest()
+
+### 🚀 Package the `.lucid` File ###
+# Archives up to this size stay in memory; larger ones spill to a temporary file
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+def package_document(document, path=None):
+    """Zip a Lucid document (as returned by `generate_lucidchart_json`); see `package_lucidchart_file`."""
+    with metrics.span("package_lucidchart_file") as current:
+        archive = open(path, "w+b") if path else tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_file:
+                with zip_file.open("document.json", "w") as entry, io.TextIOWrapper(entry, encoding="utf-8") as text:
+                    for chunk in CANONICAL_ENCODER.iterencode(document):
+                        text.write(chunk)
+                current.set(json_bytes=zip_file.getinfo("document.json").file_size)
+        except BaseException:
+            archive.close()
+            raise
+
+        current.set(bytes=archive.tell())
+        archive.seek(0)
+        return archive
+
+def package_lucidchart_file(diagram=None, path=None):
+    """
+    Serialize the diagram straight into a `.lucid` (zip) archive and return it as an
+    open binary file positioned at the start, ready to be streamed into an upload.
 
-### 🚀 Import the File to Lucidchart ###
-def import_to_lucidchart():
-    lucid_file = save_lucidchart_file()
+    The page JSON is encoded incrementally (in canonical form) into the zip entry, so
+    no intermediate `document.json` is written. The archive is kept in memory and
+    spills to a temporary file past `SPOOL_MAX_SIZE`; pass `path` to write it to disk
+    instead. The caller is responsible for closing the returned file.
+    """
+    return package_document(generate_lucidchart_json(diagram), path=path)
 
-    url = "https://api.lucid.co/documents"
-    headers = {
-        "Authorization": f"Bearer {LUCIDCHART_API_KEY}",
-        "Lucid-Api-Version": "1"
-    }
-    files = {
-        "file": ("document.lucid", open(lucid_file, "rb"), "x-application/vnd.lucid.standardImport"),
-        "product": (None, "lucidchart"),
-        "title": (None, "Dynamic Diagram")
-    }
+### 🚀 Save JSON and Create `.lucid` File ###
+def save_lucidchart_file(diagram=None, path="document.lucid"):
+    with metrics.span("save_lucidchart_file", path=path), package_lucidchart_file(diagram, path=path):
+        pass
 
-    response = requests.post(url, headers=headers, files=files)
+    return path
 
-    if response.status_code == 201:
-        document_id = response.json()["documentId"]
-        print(f"✅ Document imported successfully! Document ID: {document_id}")
-        return document_id
-    else:
-        print(f"❌ Error importing document: {response.text}")
-        return None
+### 🚀 Import the File to Lucidchart ###
+def import_to_lucidchart(diagram=None, path=None, dedup=True, client=None):
+    """
+    Upload the diagram to Lucidchart. Pass `path` to also keep the `.lucid` file on disk,
+    and `client` to upload through a specific `lucid_api.LucidClient`.
+
+    With `dedup`, a document identical to one imported before (same canonical JSON,
+    see `Diagram(deterministic_ids=True)`) is not uploaded again; the earlier
+    document ID from the local import index is returned instead.
+    """
+    from lucid_api import default_client, default_index  # Shared pooled, rate-limited client
+
+    with metrics.span("import_to_lucidchart", dedup=dedup) as current:
+        diagram = diagram or current_diagram()
+        title = diagram.title  # Names the upload and is part of the dedup key
+        document = generate_lucidchart_json(diagram)
+        content_hash = document_hash(document, title) if dedup else None
+
+        document_id = default_index().get(content_hash) if dedup else None
+        current.set(reused=bool(document_id))
+        if document_id:
+            if path:
+                package_document(document, path=path).close()
+            print(f"♻️ Identical document already imported. Document ID: {document_id}")
+            return document_id
+
+        with package_document(document, path=path) as lucid_file:
+            response = (client or default_client()).import_document(lucid_file, title=title)
+        current.set(status=response.status_code)
+
+        if response.status_code == 201:
+            document_id = response.json()["documentId"]
+            if dedup:
+                default_index().put(content_hash, document_id)
+            print(f"✅ Document imported successfully! Document ID: {document_id}")
+            return document_id
+        else:
+            print(f"❌ Error importing document: {response.text}")
+            return None
 
 
 def main():
@@ -495,4 +923,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,393 @@
+import json
+import inspect
+from script import (
+    Diagram, CONTAINER_TYPES, FLOWCHART_TYPES, STANDARD_SHAPE_TYPES, LINE_ENDPOINT_STYLES, LINE_SIDES
+)
+
+# Spec record kind -> `Diagram` builder method
+BUILDERS = {
+    "container": "create_container",
+    "flowchart": "create_flowchart_element",
+    "shape": "create_shape",
+    "standard_shape": "create_standard_shape",
+    "table": "create_table",
+    "entity": "create_entity",
+    "line": "create_line"
+}
+
+# Record kinds `auto_layout` positions. It leaves containers where they are and a spec
+# doesn't say what a container holds, so specs that rely on automatic layout can't have them
+LAYOUT_KINDS = [kind for kind in BUILDERS if kind != "container"]
+
+# Top-level spec sections and the kind their records default to
+SECTIONS = {
+    "containers": "container",
+    "shapes": "flowchart",
+    "entities": "entity",
+    "lines": "line"
+}
+
+# Parameters holding builder IDs, which a spec fills with record `id`s instead
+REFERENCE_PARAMETERS = {"shape1_id", "shape2_id"}
+
+# Allowed values and JSON types the signatures can't express
+PARAMETER_SCHEMAS = {
+    "container_type": {"type": "string", "enum": sorted(CONTAINER_TYPES)},
+    "flowchart_type": {"type": "string", "enum": sorted(FLOWCHART_TYPES)},
+    "line_type": {"type": "string", "enum": sorted(LINE_ENDPOINT_STYLES)},
+    "start_side": {"type": "string", "enum": sorted(LINE_SIDES)},
+    "end_side": {"type": "string", "enum": sorted(LINE_SIDES)},
+    "attributes": {
+        "type": "array",
+        "description": "[attribute name, is primary key] pairs, optionally with a data type third",
+        "items": {
+            "type": "array",
+            "prefixItems": [{"type": "string"}, {"type": "boolean"}, {"type": "string"}],
+            "minItems": 2,
+            "maxItems": 3
+        }
+    },
+    "rows": {"type": "integer", "minimum": 1},
+    "cols": {"type": "integer", "minimum": 1},
+    "cell_data": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "x": {"type": "integer", "description": "Column"},
+                "y": {"type": "integer", "description": "Row"},
+                "text": {"type": "string"},
+                "color": {"type": "string"},
+                "merge_right": {"type": "integer"},
+                "merge_down": {"type": "integer"}
+            },
+            "required": ["x", "y"]
+        }
+    },
+    "extra_properties": {"type": "object"},
+    "image_url": {"type": "string"},
+    "text": {"type": "string"},
+    "shape1_id": {"type": "string", "description": "`id` of the source record"},
+    "shape2_id": {"type": "string", "description": "`id` of the target record"}
+}
+
+# How a parameter is typed when it has no entry above, by its default value
+DEFAULT_TYPES = {bool: "boolean", int: "number", float: "number", str: "string"}
+
+JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "array": (list, tuple),
+    "object": dict
+}
+
+
+class SpecError(ValueError):
+    """Raised when a diagram spec fails validation; `errors` lists every problem found."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("❌ Invalid diagram spec:\n" + "\n".join(f"- {error}" for error in errors))
+
+
+### 🚀 Schema Derived from the Builder Functions ###
+def builder_parameters(kind):
+    """Map of parameter name -> `inspect.Parameter` for the builder behind `kind`."""
+    signature = inspect.signature(getattr(Diagram, BUILDERS[kind]))
+    return {name: parameter for name, parameter in signature.parameters.items() if name != "self"}
+
+
+def parameter_schema(name, parameter):
+    if name in PARAMETER_SCHEMAS:
+        return dict(PARAMETER_SCHEMAS[name])
+    if parameter.default is inspect.Parameter.empty:
+        return {"type": "string"}  # `name` and `shape_type`
+    if parameter.default is None:
+        return {}
+    return {"type": DEFAULT_TYPES[type(parameter.default)]}
+
+
+def record_schema(kind):
+    properties = {
+        "kind": {"const": kind},
+        "id": {"type": "string", "description": "Unique key that lines use to reference this record"}
+    }
+    required = []
+    for name, parameter in builder_parameters(kind).items():
+        properties[name] = parameter_schema(name, parameter)
+        if parameter.default is inspect.Parameter.empty:
+            required.append(name)
+    if kind == "standard_shape":
+        properties["shape_type"]["enum"] = sorted(STANDARD_SHAPE_TYPES)
+    return {"type": "object", "properties": properties, "required": required, "additionalProperties": False}
+
+
+def spec_schema(kinds=BUILDERS):
+    """
+    JSON Schema for diagram specs, generated from the `Diagram` builder signatures.
+
+    - `kinds`: Record kinds to allow, e.g. `LAYOUT_KINDS` for specs that will be auto-laid out
+    """
+    schemas = {kind: record_schema(kind) for kind in kinds}
+    properties = {"title": {"type": "string"}}
+    if "container" in schemas:
+        properties["containers"] = {"type": "array", "items": schemas["container"]}
+    properties["shapes"] = {"type": "array", "items": {"anyOf": [
+        schemas[kind] for kind in ("flowchart", "shape", "standard_shape", "table") if kind in schemas
+    ]}}
+    properties["entities"] = {"type": "array", "items": schemas["entity"]}
+    properties["lines"] = {"type": "array", "items": schemas["line"]}
+    return {"type": "object", "properties": properties, "additionalProperties": False}
+
+
+### 🚀 Validation ###
+def spec_records(spec):
+    """Yield (location, kind, record) for every record of the spec, in build order."""
+    for section, default_kind in SECTIONS.items():
+        for i, record in enumerate(spec.get(section) or ()):
+            kind = record.get("kind", default_kind) if isinstance(record, dict) else default_kind
+            yield f"{section}[{i}]", kind, record
+
+
+def validate_record(location, kind, record, known_ids=None):
+    """Return the problems with a single spec record. Line references are checked against `known_ids` when given."""
+    if not isinstance(record, dict):
+        return [f"{location}: must be an object"]
+    if kind not in BUILDERS:
+        return [f"{location}: unknown kind `{kind}`. Must be one of {sorted(BUILDERS)}"]
+
+    errors = []
+    parameters = builder_parameters(kind)
+
+    for name, value in record.items():
+        if name in ("kind", "id"):
+            continue
+        if name not in parameters:
+            errors.append(f"{location}: unknown field `{name}` for {kind}. Allowed: {sorted(parameters)}")
+            continue
+
+        schema = parameter_schema(name, parameters[name])
+        expected = JSON_TYPES.get(schema.get("type"))
+        if expected and (not isinstance(value, expected) or (schema["type"] in ("integer", "number") and isinstance(value, bool))):
+            errors.append(f"{location}.{name}: expected {schema['type']}, got {json.dumps(value)}")
+        elif "minimum" in schema and value < schema["minimum"]:
+            errors.append(f"{location}.{name}: must be at least {schema['minimum']}, got {json.dumps(value)}")
+        elif "enum" in schema and value not in schema["enum"]:
+            errors.append(f"{location}.{name}: invalid value {json.dumps(value)}. Must be one of {schema['enum']}")
+        elif name in REFERENCE_PARAMETERS and known_ids is not None and value not in known_ids:
+            errors.append(f"{location}.{name}: references unknown id `{value}`")
+
+    for name, parameter in parameters.items():
+        if parameter.default is inspect.Parameter.empty and name not in record:
+            errors.append(f"{location}: missing required field `{name}`")
+
+    if kind == "standard_shape" and record.get("shape_type") not in STANDARD_SHAPE_TYPES:
+        errors.append(f"{location}.shape_type: must be one of {sorted(STANDARD_SHAPE_TYPES)}")
+
+    if kind == "entity" and isinstance(record.get("attributes"), list):
+        for j, attribute in enumerate(record["attributes"]):
+            if not (
+                isinstance(attribute, (list, tuple)) and len(attribute) in (2, 3) and isinstance(attribute[0], str)
+                and isinstance(attribute[1], bool) and (len(attribute) == 2 or isinstance(attribute[2], str))
+            ):
+                errors.append(f"{location}.attributes[{j}]: expected [name, is_primary_key] or [name, is_primary_key, data_type]")
+
+    if kind == "table" and isinstance(record.get("cell_data"), list):
+        for j, cell in enumerate(record["cell_data"]):
+            if not isinstance(cell, dict):
+                errors.append(f"{location}.cell_data[{j}]: must be an object")
+                continue
+            for key in ("x", "y"):
+                if not isinstance(cell.get(key), int) or isinstance(cell.get(key), bool):
+                    errors.append(f"{location}.cell_data[{j}].{key}: expected integer, got {json.dumps(cell.get(key))}")
+
+    return errors
+
+
+def validate_spec(spec):
+    """Return a list of every problem with the spec (empty when it is valid)."""
+    if not isinstance(spec, dict):
+        return ["spec: must be a JSON object"]
+
+    errors = [
+        f"spec: unknown section `{key}`. Allowed: {['title', *SECTIONS]}"
+        for key in spec if key != "title" and key not in SECTIONS
+    ]
+    errors += [f"spec.{section}: must be an array" for section in SECTIONS if not isinstance(spec.get(section, []), list)]
+    if errors:
+        return errors
+
+    known_ids = set()
+    for location, kind, record in spec_records(spec):
+        if kind != "line" and isinstance(record, dict) and "id" in record:
+            if record["id"] in known_ids:
+                errors.append(f"{location}.id: duplicate id `{record['id']}`")
+            known_ids.add(record["id"])
+
+    for location, kind, record in spec_records(spec):
+        errors.extend(validate_record(location, kind, record, known_ids))
+    return errors
+
+
+### 🚀 Execution ###
+def builder_error(location, error):
+    """A record error for an exception its builder raised, so a bad record is reported instead of crashing the build."""
+    if isinstance(error, KeyError):
+        return f"{location}: missing key {error}"
+    return f"{location}: {error}" if isinstance(error, ValueError) else f"{location}: {type(error).__name__}: {error}"
+
+
+def apply_record(diagram, kind, record, ids):
+    """Build one validated record into `diagram`, recording its builder ID in `ids`. Returns the builder ID."""
+    kwargs = {name: value for name, value in record.items() if name not in ("kind", "id")}
+
+    if kind == "line":
+        kwargs["shape1_id"] = ids[kwargs["shape1_id"]]
+        kwargs["shape2_id"] = ids[kwargs["shape2_id"]]
+        kwargs.setdefault("start_side", "auto")  # Specs carry no coordinates to pick sides from
+        kwargs.setdefault("end_side", "auto")
+    if kind == "entity":
+        kwargs["attributes"] = [tuple(attribute) for attribute in kwargs["attributes"]]
+
+    builder_id = getattr(diagram, BUILDERS[kind])(**kwargs)
+    if "id" in record:
+        ids[record["id"]] = builder_id
+    return builder_id
+
+
+def build_from_spec(spec, diagram=None, layout=True, infer=True):
+    """
+    Validate a diagram spec and build it into `diagram` (a new `Diagram` by default).
+
+    Raises `SpecError` listing every problem if the spec is invalid, including records
+    whose builder raised (`builder_error`). With `infer`,
+    foreign-key lines between entities are added (`Diagram.infer_relationships`).
+    Unless a record gives explicit x/y coordinates, the diagram is auto-laid out; such a
+    spec can't have containers (see `LAYOUT_KINDS`). Returns the diagram
+    and the mapping of spec ids to builder IDs. New diagrams use deterministic IDs, so
+    the same spec always yields the same document.
+    """
+    errors = validate_spec(spec)
+    if errors:
+        raise SpecError(errors)
+
+    positioned = any("x" in record or "y" in record for _, _, record in spec_records(spec))
+    if layout and not positioned:
+        errors = [
+            f"{location}: containers aren't placed by automatic layout. Give records x/y coordinates or leave containers out"
+            for location, kind, _ in spec_records(spec) if kind not in LAYOUT_KINDS
+        ]
+        if errors:
+            raise SpecError(errors)
+
+    diagram = diagram if diagram is not None else Diagram(spec.get("title", "Dynamic Diagram"), deterministic_ids=True)
+    ids = {}
+    for location, kind, record in spec_records(spec):
+        try:
+            apply_record(diagram, kind, record, ids)
+        except Exception as e:
+            errors.append(builder_error(location, e))
+    if errors:
+        raise SpecError(errors)
+
+    if infer:
+        diagram.infer_relationships()
+    if layout and not positioned:
+        diagram.auto_layout()
+    return diagram, ids
+
+
+def parse_spec(text):
+    """Parse a JSON spec from model output, tolerating a surrounding Markdown code fence."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return json.loads(text)
+
+
+### 🚀 Incremental Construction from Streamed JSON Lines ###
+class StreamingSpecBuilder:
+    """
+    Build a diagram from a stream of JSON Lines spec records as they arrive.
+
+    Each line is one record with a `kind` (see `BUILDERS`), e.g.
+    `{"kind": "entity", "id": "users", "name": "Users", "attributes": [["UserID", true]]}`.
+    Complete lines are validated and built immediately; lines referencing ids that
+    have not arrived yet wait in a queue until those records do. Invalid records are
+    collected in `errors` instead of stopping the stream. Only records of `kinds` are
+    accepted (`LAYOUT_KINDS` when the diagram will be auto-laid out).
+    """
+
+    def __init__(self, diagram=None, kinds=BUILDERS):
+        self.diagram = diagram if diagram is not None else Diagram(deterministic_ids=True)
+        self.kinds = kinds
+        self.ids = {}
+        self.errors = []
+        self.waiting = {}  # Missing id -> [(location, record), ...] of lines waiting for it
+        self.records = 0
+        self._buffer = ""
+
+    def feed(self, text):
+        """Consume a chunk of streamed text, building every record it completes."""
+        self._buffer += text
+        *complete, self._buffer = self._buffer.split("\n")
+        for line in complete:
+            self._handle(line)
+
+    def close(self):
+        """Flush the final line and report lines whose shapes never arrived. Returns the diagram."""
+        if self._buffer:
+            self._handle(self._buffer)
+            self._buffer = ""
+
+        for missing, queued in self.waiting.items():
+            for location, record in queued:
+                self.errors.append(f"{location}: references unknown id `{missing}`")
+        self.waiting.clear()
+        return self.diagram
+
+    def _handle(self, line):
+        line = line.strip()
+        if not line or line.startswith("```"):
+            return
+
+        self.records += 1
+        location = f"line {self.records}"
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            self.errors.append(f"{location}: invalid JSON ({e})")
+            return
+
+        kind = record.get("kind") if isinstance(record, dict) else None
+        if kind in BUILDERS and kind not in self.kinds:
+            self.errors.append(f"{location}: `{kind}` records aren't accepted here. Must be one of {sorted(self.kinds)}")
+            return
+        errors = validate_record(location, kind, record)
+        if not errors and kind != "line" and record.get("id") in self.ids:
+            errors.append(f"{location}.id: duplicate id `{record['id']}`")
+        if errors:
+            self.errors.extend(errors)
+            return
+
+        self._apply(location, kind, record)
+
+    def _apply(self, location, kind, record):
+        if kind == "line":
+            missing = next((record[name] for name in ("shape1_id", "shape2_id") if record[name] not in self.ids), None)
+            if missing is not None:
+                self.waiting.setdefault(missing, []).append((location, record))
+                return
+
+        try:
+            apply_record(self.diagram, kind, record, self.ids)
+        except Exception as e:
+            self.errors.append(builder_error(location, e))
+            return
+
+        # Release lines that were waiting for this record
+        for queued_location, queued in self.waiting.pop(record.get("id"), ()):
+            self._apply(queued_location, "line", queued)
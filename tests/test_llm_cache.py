@@ -0,0 +1,118 @@
+"""
+The OpenAI response cache behind `generate.chat_completion`, checked offline with a
+stand-in OpenAI client that counts its calls: hits, misses, `refresh` and LRU eviction.
+
+    python -m unittest tests.test_llm_cache
+"""
+import io
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from contextlib import redirect_stdout
+
+import generate
+from llm_cache import ResponseCache
+
+
+class FakeOpenAI:
+    """Stand-in for `OpenAI()`: answers `reply N` to the Nth call and counts the calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=f"reply {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class ChatCompletionCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(directory.name)
+        self.client = FakeOpenAI()
+
+    def complete(self, user_prompt="An online shop", **kwargs):
+        with redirect_stdout(io.StringIO()):  # "♻️ Using cached OpenAI response."
+            return generate.chat_completion("system", user_prompt, llm_client=self.client, cache=self.cache, **kwargs)
+
+    def test_miss_calls_the_model_and_stores_the_reply(self):
+        self.assertEqual(self.complete(), "reply 1")
+        self.assertEqual(self.client.calls, 1)
+        self.assertEqual(self.cache.get(generate.completion_key("system", "An online shop")), "reply 1")
+
+    def test_hit_is_served_without_calling_the_model(self):
+        self.complete()
+        self.assertEqual(self.complete(), "reply 1")
+        self.assertEqual(self.client.calls, 1)
+
+    def test_key_covers_model_prompts_and_candidate(self):
+        self.complete()
+        self.complete("A library")
+        self.complete(model="gpt-4o-mini")
+        self.complete(candidate=1)
+        self.assertEqual(self.client.calls, 4)
+        self.assertEqual(self.complete(candidate=1), "reply 4")
+
+    def test_refresh_calls_the_model_and_overwrites_the_entry(self):
+        self.complete()
+        self.assertEqual(self.complete(refresh=True), "reply 2")
+        self.assertEqual(self.complete(), "reply 2")
+        self.assertEqual(self.client.calls, 2)
+
+    def test_no_cache_always_calls_the_model(self):
+        generate.chat_completion("system", "An online shop", llm_client=self.client, cache=None)
+        generate.chat_completion("system", "An online shop", llm_client=self.client, cache=None)
+        self.assertEqual(self.client.calls, 2)
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_rejected_candidates_are_not_replayed(self):
+        check = lambda content: (content, [] if content == "reply 2" else ["bad"])
+        generate.first_valid("system", "An online shop", check, candidates=1, llm_client=self.client, cache=self.cache)
+        result, errors, _ = generate.first_valid("system", "An online shop", check, candidates=1, llm_client=self.client, cache=self.cache)
+        self.assertEqual((result, errors), ("reply 2", []))
+        self.assertEqual(self.client.calls, 2)
+
+
+class ResponseCacheEvictionTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def age(self, cache, key, seconds):
+        """Make an entry look last used `seconds` ago."""
+        path = cache._path(key)
+        used = os.stat(path).st_mtime - seconds
+        os.utime(path, (used, used))
+
+    def test_least_recently_used_entry_is_evicted_first(self):
+        cache = ResponseCache(self.directory)
+        for key in ("a", "b"):
+            cache.put(key, "x" * 100)
+        entry_bytes = os.path.getsize(cache._path("a"))
+        cache.max_bytes = 2 * entry_bytes + entry_bytes // 2  # Room for two entries, whatever the length of their timestamps
+
+        self.age(cache, "a", 20)
+        self.age(cache, "b", 10)
+        cache.get("a")  # Now the most recently used
+        cache.put("c", "x" * 100)
+
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(cache.get("a"), "x" * 100)
+        self.assertEqual(cache.get("c"), "x" * 100)
+
+    def test_cache_stays_under_its_size_cap(self):
+        cache = ResponseCache(self.directory, max_bytes=1_000)
+        for i in range(50):
+            cache.put(f"key{i}", "x" * 100)
+        total = sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory))
+        self.assertLessEqual(total, 1_000)
+        self.assertEqual(cache.get("key49"), "x" * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+`LucidClient.request` retries against a local stub Lucid server that answers with a
+scripted list of responses (201/429/5xx). Backoff sleeps are recorded, not slept.
+
+    python -m unittest tests.test_lucid_api
+"""
+import io
+import json
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lucid_api import LucidClient
+
+
+class ScriptedLucidHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, headers) of the server's script; the last one repeats."""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.bodies.append(body)
+            status, headers = self.server.script[min(len(self.server.bodies), len(self.server.script)) - 1]
+
+        payload = json.dumps({"documentId": "doc1"} if status == 201 else {"error": status}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class LucidClientRetryTest(unittest.TestCase):
+    def serve(self, *script):
+        """Start a stub server answering with `script` and return a client pointed at it."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedLucidHandler)
+        server.script, server.bodies, server.lock = script, [], threading.Lock()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+
+        client = LucidClient(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}", max_retries=3, backoff_base=0.5)
+        self.addCleanup(client.close)
+        sleep = mock.patch("lucid_api.time.sleep").start()
+        self.addCleanup(mock.patch.stopall)
+        return client, sleep
+
+    def test_429_honours_retry_after(self):
+        client, sleep = self.serve((429, {"Retry-After": "7"}), (201, {}))
+        response = client.import_document(io.BytesIO(b"archive"))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.server.bodies), 2)
+        sleep.assert_called_once_with(7.0)
+
+    def test_retry_after_is_capped_at_backoff_max(self):
+        client, sleep = self.serve((429, {"Retry-After": "3600"}), (201, {}))
+        client.import_document(io.BytesIO(b"archive"))
+        sleep.assert_called_once_with(client.backoff_max)
+
+    def test_5xx_retried_with_exponential_backoff(self):
+        client, sleep = self.serve((503, {}), (500, {}), (502, {}), (201, {}))
+        response = client.import_document(io.BytesIO(b"archive"))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.server.bodies), 4)
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), 3)
+        for attempt, delay in enumerate(delays):
+            self.assertTrue(0 <= delay <= client.backoff_base * 2 ** attempt, (attempt, delay))
+
+    def test_retries_resend_the_rewound_file(self):
+        client, _ = self.serve((503, {}), (429, {"Retry-After": "0"}), (201, {}))
+        archive = io.BytesIO(b"PK\x03\x04 whole archive")
+        client.import_document(archive, title="Orders")
+        self.assertEqual(len(self.server.bodies), 3)
+        self.assertEqual(len(set(self.server.bodies)), 1)  # Every attempt sent the whole body again, byte for byte
+        self.assertIn(b"PK\x03\x04 whole archive", self.server.bodies[-1])
+        self.assertIn(b"Orders", self.server.bodies[-1])
+
+    def test_final_response_returned_when_retries_run_out(self):
+        client, sleep = self.serve((503, {}))
+        response = client.import_document(io.BytesIO(b"archive"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.bodies), client.max_retries + 1)
+        self.assertEqual(sleep.call_count, client.max_retries)
+
+    def test_non_retryable_status_is_returned_at_once(self):
+        client, sleep = self.serve((400, {}), (201, {}))
+        response = client.import_document(io.BytesIO(b"archive"))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.server.bodies), 1)
+        sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
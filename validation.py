@@ -0,0 +1,224 @@
+import heapq
+import bisect
+import numbers
+import metrics
+from script import TableCells, HEX_COLOR_PATTERN, is_container
+
+# Overlaps reported individually before the rest are only counted
+MAX_OVERLAP_ERRORS = 20
+
+
+class DiagramError(ValueError):
+    """Raised when a built diagram fails validation; `errors` lists every problem found."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("❌ Invalid diagram:\n" + "\n".join(f"- {error}" for error in errors))
+
+
+def _describe(item, labels):
+    """How an item is named in messages: its label (e.g. the spec id) or ID, plus its text."""
+    name = f"`{labels.get(item.get('id'), item.get('id'))}`"
+    text = item.get("text")
+    if isinstance(item.get("cells"), TableCells) and item["cells"].text:
+        text = item["cells"].text[0]  # The title cell of a table
+    return f'{name} "{text}"' if isinstance(text, str) and text else name
+
+
+class _Location:
+    """An item's place in messages, formatted only when an error actually mentions it."""
+    __slots__ = ("kind", "item", "number", "labels")
+
+    def __init__(self, kind, item, number, labels):
+        self.kind, self.item, self.number, self.labels = kind, item, number, labels
+
+    def __str__(self):
+        if not self.item.get("id"):
+            return f"{self.kind} #{self.number}"
+        where = f"{self.kind} {_describe(self.item, self.labels)}"
+        relationship = (self.item.get("text") or [{}])[0].get("text") if self.kind == "line" else None
+        return f'{where} "{relationship}"' if relationship else where
+
+
+def _is_number(value):
+    return value.__class__ in (int, float) or (isinstance(value, numbers.Real) and not isinstance(value, bool))
+
+
+def _color_error(color):
+    """Problem with a color value, or None if it is a valid hex code."""
+    if isinstance(color, str) and HEX_COLOR_PATTERN.match(color):
+        return None
+    return f"invalid color {color!r}, expected a hex code like #1A2B3C"
+
+
+def _check_style(where, style, errors):
+    for part in ("fill", "stroke"):
+        if isinstance(style.get(part), dict) and "color" in style[part]:
+            problem = _color_error(style[part]["color"])
+            if problem:
+                errors.append(f"{where} {part}: {problem}")
+
+
+### 🚀 Shapes ###
+def _bounding_box(where, shape, errors):
+    """The shape's (x1, y1, x2, y2), or None (with an error) if its bounding box is malformed."""
+    try:
+        bb = shape["boundingBox"]
+        x, y, w, h = bb["x"], bb["y"], bb["w"], bb["h"]
+    except (KeyError, TypeError):
+        x = y = w = h = None
+    if not (_is_number(x) and _is_number(y) and _is_number(w) and _is_number(h)):
+        errors.append(f"{where}: boundingBox needs numeric x, y, w and h")
+        return None
+    if w <= 0 or h <= 0:
+        errors.append(f"{where}: boundingBox width and height must be positive, got {w}x{h}")
+        return None
+    return x, y, x + w, y + h
+
+
+def _check_table(where, table, errors):
+    rows, cols = table.get("rowCount"), table.get("colCount")
+    if not (isinstance(rows, int) and isinstance(cols, int) and rows > 0 and cols > 0):
+        errors.append(f"{where}: rowCount and colCount must be positive integers, got {rows!r} x {cols!r}")
+        return
+
+    cells = table.get("cells")
+    if isinstance(cells, TableCells):
+        cells = zip(cells.x, cells.y, cells.merge_right, cells.merge_down, cells.color)
+    else:
+        cells = (
+            (c.get("xPosition"), c.get("yPosition"), c.get("mergeCellsRight", 0), c.get("mergeCellsDown", 0),
+             c.get("style", {}).get("fill", {}).get("color", "#FFFFFF"))
+            for c in cells or ()
+        )
+
+    seen = set()
+    for x, y, merge_right, merge_down, color in cells:
+        if not (isinstance(x, int) and isinstance(y, int) and 0 <= x < cols and 0 <= y < rows):
+            errors.append(f"{where} cell ({x}, {y}): outside the {cols}x{rows} table")
+            continue
+        if (x, y) in seen:
+            errors.append(f"{where} cell ({x}, {y}): defined more than once")
+        seen.add((x, y))
+        if not (0 <= merge_right < cols - x and 0 <= merge_down < rows - y):  # Counts of extra cells merged in
+            errors.append(f"{where} cell ({x}, {y}): merges {merge_right} right / {merge_down} down, past the table edge")
+        problem = _color_error(color)
+        if problem:
+            errors.append(f"{where} cell ({x}, {y}): {problem}")
+
+
+def _check_shape(where, shape, errors):
+    shape_type = shape.get("type")
+    if not isinstance(shape_type, str) or not shape_type:
+        errors.append(f"{where}: missing shape type")
+
+    if isinstance(shape.get("style"), dict):
+        _check_style(where, shape["style"], errors)
+
+    if shape_type == "table":
+        _check_table(where, shape, errors)
+    elif shape_type == "image":
+        image = shape.get("image")
+        if not isinstance(image, dict) or not image.get("url"):
+            errors.append(f"{where}: image shapes need an `image_url`")
+        if isinstance(shape.get("stroke"), dict):
+            _check_style(where, shape, errors)  # Image shapes carry their stroke at the top level
+    elif shape_type == "swimLanes":
+        lanes = shape.get("lanes")
+        if not isinstance(lanes, list) or not lanes:
+            errors.append(f"{where}: swim lanes need at least one lane")
+        for i, lane in enumerate(lanes or ()):
+            for key in ("headerFill", "laneFill"):
+                problem = _color_error(lane[key]) if key in lane else None
+                if problem:
+                    errors.append(f"{where} lane {i + 1} {key}: {problem}")
+
+
+### 🚀 Overlaps ###
+def find_overlaps(boxes):
+    """
+    Yield index pairs of boxes (x1, y1, x2, y2) whose interiors overlap, with a sweep
+    line over x. Boxes spanning the sweep position are kept ordered by top edge, so
+    each new box is only compared with those whose top lies within one box height.
+    """
+    max_height = max((box[3] - box[1] for box in boxes), default=0)
+    active = []  # (y1, index) of boxes spanning the sweep position, sorted
+    ending = []  # Heap of (x2, y1, index) for the active boxes
+
+    for i in sorted(range(len(boxes)), key=lambda i: boxes[i][0]):
+        x1, y1, x2, y2 = boxes[i]
+        while ending and ending[0][0] <= x1:
+            _, top, j = heapq.heappop(ending)
+            del active[bisect.bisect_left(active, (top, j))]
+
+        # An active box can only reach below y1 if its top is within `max_height` above it
+        first = bisect.bisect_right(active, (y1 - max_height, len(boxes)))
+        last = bisect.bisect_left(active, (y2, -1))
+        for top, j in active[first:last]:
+            if boxes[j][3] > y1:
+                yield j, i
+
+        bisect.insort(active, (y1, i))
+        heapq.heappush(ending, (x2, y1, i))
+
+
+### 🚀 Validation ###
+def validate_diagram(diagram, labels=None, check_overlaps=True):
+    """
+    Check a diagram before upload and return every problem found (empty when valid):
+    duplicate IDs, lines pointing at missing shapes, missing required fields per shape
+    type, table cells outside `rowCount`/`colCount`, invalid colors and overlapping
+    shapes (containers may overlap what they contain).
+
+    - `labels`: Optional {builder ID: name} used in messages, e.g. spec ids
+    - `check_overlaps`: Set to False for diagrams that haven't been laid out yet
+    """
+    labels = labels or {}
+    with diagram._lock:
+        shapes, lines = list(diagram.shapes), list(diagram.lines)
+
+    with metrics.span("validate_diagram", shapes=len(shapes), lines=len(lines)) as current:
+        errors, index, line_ids = [], {}, set()
+        boxes, boxed = [], []  # Bounding boxes of non-container shapes, and their shapes
+
+        for i, shape in enumerate(shapes):
+            where = _Location("shape", shape, i + 1, labels)
+            if shape.get("id") in index:
+                errors.append(f"{where}: duplicate id")
+            index[shape.get("id")] = shape
+
+            _check_shape(where, shape, errors)
+            box = _bounding_box(where, shape, errors)
+            if box is not None and not is_container(shape):
+                boxes.append(box)
+                boxed.append(shape)
+
+        for i, line in enumerate(lines):
+            where = _Location("line", line, i + 1, labels)
+            if line.get("id") in index or line.get("id") in line_ids:
+                errors.append(f"{where}: duplicate id")
+            line_ids.add(line.get("id"))
+
+            for key in ("endpoint1", "endpoint2"):
+                endpoint = line.get(key) or {}
+                shape_id = endpoint.get("shapeId")
+                if shape_id not in index:
+                    errors.append(f"{where}: {key} references unknown shape `{labels.get(shape_id, shape_id)}`")
+                position = endpoint.get("position") or {}
+                if not all(_is_number(position.get(axis)) and 0 <= position[axis] <= 1 for axis in ("x", "y")):
+                    errors.append(f"{where}: {key} position must have x and y between 0 and 1, got {position}")
+
+            if isinstance(line.get("stroke"), dict):
+                _check_style(where, line, errors)
+
+        if check_overlaps:
+            overlaps = 0
+            for i, j in find_overlaps(boxes):
+                overlaps += 1
+                if overlaps <= MAX_OVERLAP_ERRORS:
+                    errors.append(f"shape {_describe(boxed[i], labels)} overlaps shape {_describe(boxed[j], labels)}")
+            if overlaps > MAX_OVERLAP_ERRORS:
+                errors.append(f"... and {overlaps - MAX_OVERLAP_ERRORS} more overlapping shape pairs")
+
+        current.set(errors=len(errors))
+        return errors
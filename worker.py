@@ -0,0 +1,170 @@
+"""
+Long-running diagram worker: pays the interpreter, import and connection setup once,
+then builds diagrams from JSON Lines jobs.
+
+    python worker.py                          # Jobs on stdin, results on stdout
+    python worker.py --socket /tmp/lucid.sock # Jobs over a local Unix socket
+
+A job is one JSON object per line:
+
+    {"id": 1, "problem": "An online shop where ..."}     # Generate a spec with OpenAI, then build it
+    {"id": 2, "spec": {"title": ..., "shapes": [...]}}   # Build a diagram spec directly
+
+Optional job fields: "upload" (default true), "preview" (SVG/PNG path to render to),
+"max_page_shapes". Each job gets one JSON line back with its "id", "ok",
+"document_id", "shapes", "lines", "problems" (validation warnings), "seconds" and "error".
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import socketserver
+from contextlib import redirect_stdout
+import metrics
+from script import generate_lucidchart_json, import_to_lucidchart
+
+
+### 🚀 Warm-up ###
+def warm_up(openai=True):
+    """
+    Import everything a job needs and open the shared clients ahead of the first job:
+    the spec builder, layout (NumPy), validation, the pooled Lucid HTTP session and,
+    with `openai`, the OpenAI client.
+    """
+    with metrics.span("worker_warm_up") as current:
+        import layout, routing, spec, validation, relationships  # Loaded now rather than during the first job
+        from lucid_api import default_client
+
+        default_client()
+        if openai:
+            from generate import openai_client
+
+            try:
+                openai_client()
+            except Exception as e:  # No key: spec jobs still work
+                print(f"⚠️ OpenAI client unavailable: {e}", file=sys.stderr)
+                current.set(openai=False)
+
+
+### 🚀 Jobs ###
+def run_job(job):
+    """Build (and by default upload) one diagram job, returning its result dict."""
+    from spec import build_from_spec
+    from validation import validate_diagram
+
+    result = {"id": job.get("id"), "ok": False, "document_id": None, "shapes": 0, "lines": 0, "problems": [], "error": None}
+    start = time.perf_counter()
+
+    with metrics.span("worker_job") as current:
+        try:
+            if "spec" in job:
+                diagram, _ = build_from_spec(job["spec"])
+            elif "problem" in job:
+                from generate import generate_valid_diagram
+
+                diagram, _ = generate_valid_diagram(job["problem"])
+            else:
+                raise ValueError("❌ A job needs a `spec` or a `problem`.")
+
+            diagram.max_page_shapes = job.get("max_page_shapes")
+            result["shapes"], result["lines"] = len(diagram.shapes), len(diagram.lines)
+            result["problems"] = validate_diagram(diagram)
+
+            if job.get("preview"):
+                from render import save_preview
+
+                save_preview(generate_lucidchart_json(diagram), job["preview"])
+            if job.get("upload", True):
+                result["document_id"] = import_to_lucidchart(diagram)
+                if result["document_id"] is None:
+                    raise RuntimeError("❌ Lucid import failed")
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = str(e)
+
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        current.set(ok=result["ok"], shapes=result["shapes"])
+    return result
+
+
+def handle_line(line):
+    """One JSON Lines job in, one JSON line out (errors included)."""
+    try:
+        job = json.loads(line)
+    except ValueError as e:
+        return json.dumps({"id": None, "ok": False, "error": f"❌ Invalid job JSON: {e}"})
+    if not isinstance(job, dict):
+        return json.dumps({"id": None, "ok": False, "error": "❌ A job must be a JSON object."})
+    return json.dumps(run_job(job))
+
+
+### 🚀 Transports ###
+def serve_stdin(input_stream=None, output_stream=None):
+    """Run jobs from stdin, one result per line on stdout. Anything jobs print goes to stderr."""
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    for line in input_stream:
+        if not line.strip():
+            continue
+        with redirect_stdout(sys.stderr):  # Keep stdout pure JSON Lines
+            response = handle_line(line)
+        output_stream.write(response + "\n")
+        output_stream.flush()
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """Runs the jobs of one socket connection in order; connections run concurrently."""
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write((handle_line(line.decode("utf-8")) + "\n").encode("utf-8"))
+                self.wfile.flush()
+
+
+def serve_socket(path):
+    """Serve jobs on a Unix socket at `path` until interrupted."""
+    if os.path.exists(path):
+        os.remove(path)  # Left over from a previous run
+    server = socketserver.ThreadingUnixStreamServer(path, JobHandler)
+    server.daemon_threads = True
+    print(f"👂 Listening on {path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
+
+
+def submit(job, path):
+    """Send one job to a worker listening on `path` and return its result dict."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        with connection.makefile("rwb") as stream:
+            stream.write((json.dumps(job) + "\n").encode("utf-8"))
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a warm diagram worker running and build diagram jobs.")
+    parser.add_argument("--socket", help="Serve jobs on this Unix socket instead of stdin")
+    parser.add_argument("--no-openai", action="store_true", help="Don't create the OpenAI client (spec jobs only)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    warm_up(openai=not args.no_openai)
+    print(f"✅ Worker ready in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdin()
+
+
+if __name__ == "__main__":
+    main()